@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from abc import abstractmethod
+from collections.abc import Callable
 from enum import Enum
 from pathlib import Path
 from typing import TYPE_CHECKING, cast
@@ -10,6 +11,7 @@ from typing import TYPE_CHECKING, cast
 from pydantic import BaseModel, ConfigDict
 
 from docling_agent.backends import BaseBackend, create_backend
+from docling_agent.backends.base import BaseSession
 from docling_agent.task_model import BackendConfig
 
 if TYPE_CHECKING:
@@ -55,6 +57,8 @@ class BaseDoclingAgent(BaseModel):
     tools: list
 
     max_iteration: int = 16
+    # Applied to every session the agent creates, e.g. to meter the calls of an agent delegated to
+    session_wrapper: Callable[[BaseSession], BaseSession] | None = None
 
     @staticmethod
     def default_backend() -> BaseBackend:
@@ -73,22 +77,31 @@ class BaseDoclingAgent(BaseModel):
         """Return the backend-scoped extraction model id."""
         return cast(str, self.backend.models.extraction)
 
+    def _wrap_session(self, session: BaseSession) -> BaseSession:
+        return self.session_wrapper(session) if self.session_wrapper is not None else session
+
     def _create_reasoning_session(self, *, system_prompt: str | None = None):
-        return self.backend.create_session(
-            model=self.get_reasoning_model_id(),
-            system_prompt=system_prompt,
+        return self._wrap_session(
+            self.backend.create_session(
+                model=self.get_reasoning_model_id(),
+                system_prompt=system_prompt,
+            )
         )
 
     def _create_writing_session(self, *, system_prompt: str | None = None):
-        return self.backend.create_session(
-            model=self.get_writing_model_id(),
-            system_prompt=system_prompt,
+        return self._wrap_session(
+            self.backend.create_session(
+                model=self.get_writing_model_id(),
+                system_prompt=system_prompt,
+            )
         )
 
     def _create_extraction_session(self, *, system_prompt: str | None = None):
-        return self.backend.create_session(
-            model=self.get_extraction_model_id(),
-            system_prompt=system_prompt,
+        return self._wrap_session(
+            self.backend.create_session(
+                model=self.get_extraction_model_id(),
+                system_prompt=system_prompt,
+            )
         )
 
     @abstractmethod
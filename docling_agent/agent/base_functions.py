@@ -1,6 +1,15 @@
+import hashlib
 import json
+import os
 import re
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from contextlib import contextmanager
+from html.parser import HTMLParser
 from io import BytesIO
+from pathlib import Path
+from typing import Any, cast
 
 from docling.datamodel.base_models import ConversionStatus, InputFormat
 from docling.datamodel.document import ConversionResult
@@ -23,6 +32,8 @@ from docling_core.types.doc.document import (
     ListGroup,
     ListItem,
     NodeItem,
+    PictureClassificationMetaField,
+    PictureClassificationPrediction,
     PictureItem,
     RefItem,
     SectionHeaderItem,
@@ -31,10 +42,20 @@ from docling_core.types.doc.document import (
     TitleItem,
 )
 from docling_core.types.io import DocumentStream
+from mellea.stdlib.requirements import Requirement, simple_validate
 
+from docling_agent.backends.base import BaseBackend
 from docling_agent.logging import log_debug, log_error, log_info, log_warning
 
 
+def atomic_write_text(path: Path, text: str) -> None:
+    """Write *text* to *path* via a temporary sibling file so readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    tmp_path.write_text(text, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
 def find_crefs(text: str) -> list[RefItem]:
     """
     Check if a string matches the pattern ```markdown(.*)?```
@@ -97,6 +118,22 @@ def find_json_dicts(text: str) -> list[dict]:
     return calls
 
 
+def load_json_block(text: str) -> Any | None:
+    """Parse the first ```json code block of *text*, or None if there is none or it does not load.
+
+    Unlike :func:`find_json_dicts`, a truncated or malformed block is not skipped,
+    so validators can reject the answer instead of reading it as empty.
+    """
+    match = re.search(r"```json\s*(.*?)\s*```", text, re.DOTALL)
+    if match is None:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except json.JSONDecodeError as exc:
+        log_warning(f"Failed to parse JSON block: {exc}")
+        return None
+
+
 def create_document_outline(
     doc: DoclingDocument, mode: OutlineMode = OutlineMode.TABLE_OF_CONTENTS, format: OutlineFormat = OutlineFormat.JSON
 ) -> str:
@@ -190,88 +227,346 @@ def has_markdown_code_block(text: str) -> bool:
     return find_markdown_code_block(text) is not None
 
 
-def convert_html_to_docling_table(text: str) -> list[TableItem] | None:
-    log_info("convert_html_to_docling_table")
-    text_ = find_html_code_block(text)
-    if text_ is None:
-        text_ = text  # assume the entire text is html
+class _ParseCache:
+    """Thread-safe LRU cache of documents parsed from markdown or HTML strings.
 
-    try:
-        converter = DocumentConverter(allowed_formats=[InputFormat.HTML])
+    Requirement validators parse a generated answer to check it; the caller that
+    accepted the answer converts the same string right after. Validators fill the
+    cache and converters consume (pop) the entry, so each accepted answer is parsed
+    once and no parsed document is shared between two callers.
+    """
+
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[tuple[str, str], DoclingDocument] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(content: str, fmt: InputFormat) -> tuple[str, str]:
+        return fmt.value, hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def get(self, content: str, fmt: InputFormat) -> DoclingDocument | None:
+        key = self.key(content, fmt)
+        with self._lock:
+            document = self._entries.get(key)
+            if document is not None:
+                self._entries.move_to_end(key)
+            return document
+
+    def put(self, content: str, fmt: InputFormat, document: DoclingDocument) -> None:
+        key = self.key(content, fmt)
+        with self._lock:
+            self._entries[key] = document
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, content: str, fmt: InputFormat) -> DoclingDocument | None:
+        with self._lock:
+            return self._entries.pop(self.key(content, fmt), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_parse_cache = _ParseCache()
+
+
+class _ConverterPool:
+    """Thread-safe pool of warm single-format Docling converters.
+
+    Building a ``DocumentConverter`` and initializing its pipeline takes longer than
+    converting a short generated answer, and validators convert on every LLM attempt.
+    Each converter is borrowed by one thread at a time and returned for reuse; at most
+    ``max_idle`` converters per format are kept between calls. Converters borrowed
+    before :meth:`clear` are dropped when they are returned.
+    """
+
+    def __init__(self, max_idle: int = 8):
+        self.max_idle = max_idle
+        self._idle: dict[InputFormat, list[DocumentConverter]] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _create(fmt: InputFormat) -> DocumentConverter:
+        converter = DocumentConverter(allowed_formats=[fmt])
+        converter.initialize_pipeline(fmt)
+        return converter
+
+    @contextmanager
+    def converter(self, fmt: InputFormat) -> Iterator[DocumentConverter]:
+        with self._lock:
+            idle = self._idle.setdefault(fmt, [])
+            converter = idle.pop() if idle else None
+            generation = self._generation
+        if converter is None:
+            converter = self._create(fmt)
+        try:
+            yield converter
+        finally:
+            with self._lock:
+                idle = self._idle.setdefault(fmt, [])
+                if generation == self._generation and len(idle) < self.max_idle:
+                    idle.append(converter)
+
+    def warm_up(self, formats: Iterable[InputFormat] = (InputFormat.MD, InputFormat.HTML)) -> None:
+        """Create one converter per format ahead of the first conversion."""
+        for fmt in formats:
+            with self.converter(fmt):
+                pass
 
-        buff = BytesIO(text.encode("utf-8"))
-        doc_stream = DocumentStream(name="tmp.html", stream=buff)
+    def clear(self) -> None:
+        with self._lock:
+            self._idle.clear()
+            self._generation += 1
 
+
+_converter_pool = _ConverterPool()
+
+
+def warm_up_converters() -> None:
+    """Initialize the markdown and HTML converters used to parse generated content.
+
+    Optional: converters are created on first use; long-running services can call this at startup.
+    """
+    _converter_pool.warm_up()
+
+
+def _parse_string(content: str, fmt: InputFormat) -> DoclingDocument | None:
+    """Convert markdown or HTML *content* with a pooled converter; raises on converter errors."""
+    suffix = "md" if fmt == InputFormat.MD else "html"
+    buff = BytesIO(content.encode("utf-8"))
+    doc_stream = DocumentStream(name=f"tmp.{suffix}", stream=buff)
+
+    with _converter_pool.converter(fmt) as converter:
         conv: ConversionResult = converter.convert(doc_stream)
+    return conv.document if conv.status == ConversionStatus.SUCCESS else None
+
+
+def parse_and_cache(content: str, fmt: InputFormat) -> DoclingDocument | None:
+    """Parse *content* for a validator and keep the result for :func:`take_or_parse`.
+
+    The returned document must not be modified: it is handed to the next converter of the same content.
+    """
+    document = _parse_cache.get(content, fmt)
+    if document is None:
+        document = _parse_string(content, fmt)
+        if document is not None:
+            _parse_cache.put(content, fmt, document)
+    return document
+
+
+def take_or_parse(content: str, fmt: InputFormat) -> DoclingDocument | None:
+    """Return the document a validator already parsed from *content*, or parse it now."""
+    document = _parse_cache.pop(content, fmt)
+    if document is not None:
+        log_debug("Reusing parsed document", format=fmt.value)
+        return document
+    return _parse_string(content, fmt)
+
+
+_FENCE_LINE = re.compile(r"^\s{0,3}(`{3,}|~{3,})")
+_EMPTY_LIST_ITEM = re.compile(r"^\s*(?:[-*+]|\d{1,9}[.)])\s*$")
+_TABLE_TAGS = ("table", "thead", "tbody", "tfoot", "tr", "td", "th")
+# Allowed parent of each table tag; cells and rows may not float outside their container
+_TABLE_TAG_PARENTS: dict[str, tuple[str, ...]] = {
+    "thead": ("table",),
+    "tbody": ("table",),
+    "tfoot": ("table",),
+    "tr": ("table", "thead", "tbody", "tfoot"),
+    "td": ("tr",),
+    "th": ("tr",),
+}
+
+
+class _TableStructureChecker(HTMLParser):
+    """Check the nesting of table tags; other tags are ignored."""
+
+    def __init__(self):
+        super().__init__()
+        self.stack: list[str] = []
+        self.problem: str | None = None
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        if tag not in _TABLE_TAGS or self.problem:
+            return
+        # Cells and rows close implicitly when a sibling opens, as in HTML
+        if tag in ("td", "th") and self.stack and self.stack[-1] in ("td", "th"):
+            self.stack.pop()
+        elif tag == "tr":
+            while self.stack and self.stack[-1] in ("td", "th", "tr"):
+                self.stack.pop()
+        parents = _TABLE_TAG_PARENTS.get(tag)
+        if parents and (not self.stack or self.stack[-1] not in parents):
+            self.problem = f"<{tag}> outside of {' or '.join(f'<{p}>' for p in parents)}"
+            return
+        self.stack.append(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag not in _TABLE_TAGS or self.problem:
+            return
+        if tag not in self.stack:
+            self.problem = f"</{tag}> without <{tag}>"
+            return
+        # Implicitly closed cells and rows are popped with their container
+        while self.stack.pop() != tag:
+            pass
+
 
-        if conv.status == ConversionStatus.SUCCESS:
-            return conv.document.tables
+def precheck_markdown(content: str) -> bool:
+    """Cheap syntactic check that rejects obviously broken markdown before a full conversion.
 
+    Rejects empty content, unbalanced code fences and list markers without text
+    outside of code fences.
+    """
+    if not content.strip():
+        log_debug("Markdown precheck failed", reason="empty content")
+        return False
+    open_fence: str | None = None
+    empty_list_item = False
+    for line in content.splitlines():
+        match = _FENCE_LINE.match(line)
+        if match is None:
+            if open_fence is None and _EMPTY_LIST_ITEM.match(line):
+                empty_list_item = True
+            continue
+        fence = match.group(1)
+        if open_fence is None:
+            open_fence = fence
+        elif fence[0] == open_fence[0] and len(fence) >= len(open_fence) and not line.strip()[len(fence) :]:
+            open_fence = None
+    if open_fence is not None:
+        log_debug("Markdown precheck failed", reason="unclosed code fence")
+        return False
+    if empty_list_item:
+        log_debug("Markdown precheck failed", reason="list item without text")
+        return False
+    return True
+
+
+def precheck_html(content: str, *, require_table: bool = False) -> bool:
+    """Cheap syntactic check that rejects obviously broken HTML before a full conversion.
+
+    Rejects content without any tag, misnested or unclosed table structures and,
+    with *require_table*, content without a table.
+    """
+    if "<" not in content or ">" not in content:
+        log_debug("HTML precheck failed", reason="no markup")
+        return False
+    checker = _TableStructureChecker()
+    try:
+        checker.feed(content)
+        checker.close()
+    except Exception as exc:
+        log_debug("HTML precheck failed", reason=str(exc))
+        return False
+    problem = checker.problem
+    if problem is None and "table" in checker.stack:
+        problem = "unclosed <table>"
+    if problem is None and require_table and not re.search(r"<table[\s>]", content, re.IGNORECASE):
+        problem = "no <table>"
+    if problem is not None:
+        log_debug("HTML precheck failed", reason=problem)
+        return False
+    return True
+
+
+def _markdown_content(text: str) -> str:
+    text_ = find_markdown_code_block(text)
+    return text if text_ is None else text_  # assume the entire text is markdown
+
+
+def _html_content(text: str) -> str:
+    text_ = find_html_code_block(text)
+    return text if text_ is None else text_  # assume the entire text is html
+
+
+def convert_html_to_docling_table(text: str) -> list[TableItem] | None:
+    log_info("convert_html_to_docling_table")
+    try:
+        document = take_or_parse(_html_content(text), InputFormat.HTML)
     except Exception as exc:
         log_error("Failed to convert HTML to docling table", exception=exc)
         return None
 
-    return None
+    return document.tables if document is not None else None
 
 
 def validate_html_to_docling_table(text: str) -> bool:
     log_info("validate_html_to_docling_table")
-    return convert_html_to_docling_table(text) is not None
+    content = _html_content(text)
+    if not precheck_html(content, require_table=True):
+        return False
+    try:
+        return parse_and_cache(content, InputFormat.HTML) is not None
+    except Exception as exc:
+        log_error("Failed to convert HTML to docling table", exception=exc)
+        return False
 
 
 def convert_markdown_to_docling_document(text: str) -> DoclingDocument | None:
     log_info("convert_markdown_to_docling_document")
-    text_ = find_markdown_code_block(text)
-    if text_ is None:
-        text_ = text  # assume the entire text is html
-
     try:
-        converter = DocumentConverter(allowed_formats=[InputFormat.MD])
-
-        buff = BytesIO(text_.encode("utf-8"))
-        doc_stream = DocumentStream(name="tmp.md", stream=buff)
+        return take_or_parse(_markdown_content(text), InputFormat.MD)
+    except Exception:
+        return None
 
-        conv: ConversionResult = converter.convert(doc_stream)
 
-        if conv.status == ConversionStatus.SUCCESS:
-            return conv.document
+def parse_markdown(content: str) -> DoclingDocument | None:
+    """Parse markdown *content* as is, e.g. text patched locally rather than an LLM answer with a code block."""
+    log_info("parse_markdown")
+    try:
+        return take_or_parse(content, InputFormat.MD)
     except Exception:
         return None
 
-    return None
+
+def apply_text_patches(text: str, patches: list[tuple[str, str]]) -> str | None:
+    """Apply find/replace *patches* to *text* in order.
+
+    Every ``find`` string must occur exactly once in the text it is applied to,
+    so that a patch never lands on the wrong occurrence. Returns None if any
+    patch does not apply.
+    """
+    for find, replace in patches:
+        if not find or text.count(find) != 1:
+            return None
+        text = text.replace(find, replace, 1)
+    return text
 
 
 def validate_markdown_to_docling_document(text: str) -> bool:
     log_info("validate_markdown_to_docling_document")
-    return convert_markdown_to_docling_document(text) is not None
+    content = _markdown_content(text)
+    if not precheck_markdown(content):
+        return False
+    try:
+        return parse_and_cache(content, InputFormat.MD) is not None
+    except Exception:
+        return False
 
 
 def convert_html_to_docling_document(text: str) -> DoclingDocument | None:
     log_info("convert_html_to_docling_document")
-    text_ = find_html_code_block(text)
-    if text_ is None:
-        text_ = text  # assume the entire text is html
-
     try:
-        converter = DocumentConverter(allowed_formats=[InputFormat.HTML])
-
-        buff = BytesIO(text_.encode("utf-8"))
-        doc_stream = DocumentStream(name="tmp.html", stream=buff)
-
-        conv: ConversionResult = converter.convert(doc_stream)
-
-        if conv.status == ConversionStatus.SUCCESS:
-            return conv.document
+        return take_or_parse(_html_content(text), InputFormat.HTML)
     except Exception as exc:
         log_error(f"error: {exc}")
         return None
 
-    return None
-
 
 def validate_html_to_docling_document(text: str) -> bool:
     log_info("validate_html_to_docling_document")
-    return convert_html_to_docling_document(text) is not None
+    content = _html_content(text)
+    if not precheck_html(content):
+        return False
+    try:
+        return parse_and_cache(content, InputFormat.HTML) is not None
+    except Exception as exc:
+        log_error(f"error: {exc}")
+        return False
 
 
 def insert_document(*, item: NodeItem, doc: DoclingDocument, updated_doc: DoclingDocument) -> DoclingDocument:
@@ -383,6 +678,166 @@ def collect_subtree_text(node: NodeItem, doc: DoclingDocument) -> str:
     return "\n".join(parts)
 
 
+def collect_section_passages(doc: DoclingDocument, *, max_chars: int = 1500) -> list[tuple[str, str]]:
+    """Split *doc* into section passages of at most about *max_chars* characters.
+
+    Every passage starts with the heading line of its section (and the section
+    summary, if the document was enriched) followed by the section's text, lists,
+    tables (as markdown) and picture summaries in reading order. Long sections are
+    split at item boundaries; each part repeats the heading. Returns
+    ``(section_ref, passage)`` pairs, where the ref is the section heading (or
+    ``#/body`` for text before the first heading).
+    """
+    passages: list[tuple[str, str]] = []
+    section_ref = doc.body.self_ref
+    header = ""
+    parts: list[str] = []
+    size = 0
+
+    def flush() -> None:
+        nonlocal parts, size
+        if parts:
+            passages.append((section_ref, "\n".join([header, *parts]).strip()))
+        parts, size = [], 0
+
+    for item, _ in doc.iterate_items():
+        if isinstance(item, TitleItem | SectionHeaderItem):
+            flush()
+            section_ref = item.self_ref
+            level = item.level if isinstance(item, SectionHeaderItem) else 0
+            header = "#" * (level + 1) + " " + item.text
+            if item.meta and item.meta.summary and item.meta.summary.text:
+                header += "\n" + item.meta.summary.text
+            continue
+
+        if isinstance(item, TableItem):
+            try:
+                text = item.export_to_markdown(doc=doc)
+            except Exception:
+                text = ""
+        elif isinstance(item, PictureItem):
+            text = item.meta.summary.text if item.meta and item.meta.summary else ""
+        elif isinstance(item, TextItem) and item.label != DocItemLabel.CAPTION:
+            text = item.text
+        else:
+            continue
+
+        text = text.strip()[:max_chars]
+        if not text:
+            continue
+        if size and size + len(text) > max_chars:
+            flush()
+        parts.append(text)
+        size += len(text)
+
+    flush()
+    return passages
+
+
+def classification_from_labels(labels: Any, *, created_by: str) -> PictureClassificationMetaField | None:
+    """Picture classification with the distinct string *labels*, or None if there are none."""
+    if not isinstance(labels, list):
+        return None
+
+    deduped = [label for label in dict.fromkeys(labels) if isinstance(label, str)]
+    if not deduped:
+        return None
+
+    return PictureClassificationMetaField(
+        predictions=[PictureClassificationPrediction(class_name=label, created_by=created_by) for label in deduped]
+    )
+
+
+def classify_picture_batch(
+    *,
+    create_session: Callable[[], Any],
+    contexts: dict[str, str],
+    class_names: Sequence[str],
+    loop_budget: int,
+) -> dict[str, list[str]] | None:
+    """Labels of every picture of *contexts* (keyed by ref) from one prompt, or None if the batch failed."""
+
+    def _validate(content: str) -> bool:
+        payload = load_json_block(content)
+        return (
+            isinstance(payload, dict)
+            and set(payload) == set(contexts)
+            and all(
+                isinstance(labels, list) and all(isinstance(label, str) and label in class_names for label in labels)
+                for labels in payload.values()
+            )
+        )
+
+    descriptions = "\n\n".join(f"[{ref}]\n{text}" for ref, text in contexts.items())
+    try:
+        answer = create_session().instruct(
+            (
+                "Classify each of the pictures described below. Every description starts with the picture id "
+                "in square brackets.\n\n"
+                f"{descriptions}\n\n"
+                "Return one JSON object in a ```json``` block that maps every picture id to its labels:\n"
+                '{"<picture-id>": ["<class-name>", "..."], "...": ["..."]}\n'
+                "Choose one to three labels per picture from this closed set only:\n" + ", ".join(class_names)
+            ),
+            requirements=[
+                Requirement(
+                    description=(
+                        "Return one JSON object in a ```json``` block whose keys are exactly the picture ids "
+                        f"({', '.join(contexts)}) and whose values are lists of class names."
+                    ),
+                    validation_fn=simple_validate(_validate),
+                ),
+            ],
+            retry_budget=loop_budget,
+        )
+    except Exception as exc:
+        log_warning("Batched picture classification call failed", pictures=len(contexts), exception=exc)
+        return None
+    if not _validate(answer):
+        return None
+    return cast(dict[str, list[str]], load_json_block(answer))
+
+
+def classify_picture_contexts(
+    *,
+    backend: BaseBackend,
+    contexts: dict[str, str],
+    create_session: Callable[[], Any],
+    classify_single: Callable[[str], PictureClassificationMetaField | None],
+    class_names: Sequence[str],
+    created_by: str,
+    batch_size: int,
+    loop_budget: int,
+    stop_requested: Callable[[], bool] = lambda: False,
+) -> dict[str, PictureClassificationMetaField | None]:
+    """Classify pictures in batches of *batch_size* per prompt, keyed like *contexts*.
+
+    Pictures of a batch that fails (an error or an answer that does not validate)
+    are classified one by one with ``classify_single(ref)``, concurrently.
+    """
+    refs = list(contexts)
+    results: dict[str, PictureClassificationMetaField | None] = {}
+    for start in range(0, len(refs), batch_size):
+        if stop_requested():
+            break
+        batch = {ref: contexts[ref] for ref in refs[start : start + batch_size]}
+        if len(batch) < 2:
+            continue
+        labels = classify_picture_batch(
+            create_session=create_session, contexts=batch, class_names=class_names, loop_budget=loop_budget
+        )
+        if labels is None:
+            log_debug("Batched picture classification failed, falling back to single pictures", pictures=len(batch))
+            continue
+        for ref, picture_labels in labels.items():
+            results[ref] = classification_from_labels(picture_labels, created_by=created_by)
+
+    remaining = [ref for ref in refs if ref not in results]
+    for ref, classification in backend.map_concurrently(classify_single, remaining):
+        results[ref] = classification
+    return results
+
+
 def _copy_list_group(
     source: ListGroup,
     source_doc: DoclingDocument,
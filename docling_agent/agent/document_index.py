@@ -0,0 +1,82 @@
+"""Reading-order position index of the items of a document.
+
+Tree operations of the editor locate items by ref many times per edit batch:
+the items between two headings, the parent of an item, the current title.
+:class:`DocumentPositionIndex` walks the document once and answers these
+lookups in constant time (or in the size of the returned range), instead of
+iterating over the whole document for each of them.
+"""
+
+from docling_core.types.doc.document import DoclingDocument, NodeItem, TitleItem
+
+
+class DocumentPositionIndex:
+    """Map every ref of *document* to its reading-order ordinal, parent and depth.
+
+    The ordinals follow ``iterate_items(with_groups=True)``. The index stays valid
+    while items are replaced in place (same ``self_ref``) through :meth:`replace`;
+    it must be rebuilt after items are added, moved or deleted.
+    """
+
+    def __init__(self, document: DoclingDocument) -> None:
+        self._items: list[NodeItem] = []
+        self._ordinals: dict[str, int] = {}
+        self._depths: dict[str, int] = {}
+        for item, depth in document.iterate_items(with_groups=True):
+            self._ordinals[item.self_ref] = len(self._items)
+            self._depths[item.self_ref] = depth
+            self._items.append(item)
+        # Titles are tracked over all texts, including those outside the body
+        self._titles: set[str] = {item.self_ref for item in document.texts if isinstance(item, TitleItem)}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, ref: str) -> bool:
+        return ref in self._ordinals
+
+    def ordinal(self, ref: str) -> int | None:
+        """Reading-order position of *ref*, or None if it is not in the index."""
+        return self._ordinals.get(ref)
+
+    def depth(self, ref: str) -> int | None:
+        """Nesting depth of *ref* as reported by ``iterate_items``, or None if unknown."""
+        return self._depths.get(ref)
+
+    def parent(self, ref: str) -> str | None:
+        """Ref of the parent of *ref*, or None for the root or an unknown ref."""
+        ordinal = self._ordinals.get(ref)
+        if ordinal is None or self._items[ordinal].parent is None:
+            return None
+        return self._items[ordinal].parent.cref
+
+    def item(self, ref: str) -> NodeItem | None:
+        """Current item at *ref*, or None if it is not in the index."""
+        ordinal = self._ordinals.get(ref)
+        return None if ordinal is None else self._items[ordinal]
+
+    def items_between(self, previous_ref: str, next_ref: str) -> list[NodeItem] | None:
+        """Items strictly between *previous_ref* and *next_ref* in reading order.
+
+        Returns None if either ref is unknown or *previous_ref* does not come first.
+        """
+        start, end = self._ordinals.get(previous_ref), self._ordinals.get(next_ref)
+        if start is None or end is None or start >= end:
+            return None
+        return self._items[start + 1 : end]
+
+    def title_refs(self) -> set[str]:
+        """Refs of the title items of the document."""
+        return set(self._titles)
+
+    def replace(self, old_item: NodeItem, new_item: NodeItem) -> None:
+        """Record that *new_item* replaced *old_item* in place (same ``self_ref``)."""
+        if new_item.self_ref != old_item.self_ref:
+            raise ValueError(f"In-place replacement must keep the ref: {old_item.self_ref} -> {new_item.self_ref}")
+        ordinal = self._ordinals.get(old_item.self_ref)
+        if ordinal is not None:
+            self._items[ordinal] = new_item
+        if isinstance(new_item, TitleItem):
+            self._titles.add(new_item.self_ref)
+        else:
+            self._titles.discard(new_item.self_ref)
@@ -1,6 +1,8 @@
 import re
+from collections import Counter
+from collections.abc import Callable
 from pathlib import Path
-from typing import Annotated, ClassVar, Literal
+from typing import Annotated, ClassVar, Literal, cast
 
 from docling_core.experimental.serializer.outline import OutlineFormat
 from docling_core.types.base import _JSON_POINTER_REGEX
@@ -9,6 +11,7 @@ from docling_core.types.doc.document import (
     DoclingDocument,
     RefItem,
     SectionHeaderItem,
+    TableData,
     TableItem,
     TextItem,
     TitleItem,
@@ -21,17 +24,22 @@ from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 
 from docling_agent.agent.base import BaseDoclingAgent, DoclingAgentType
 from docling_agent.agent.base_functions import (
+    apply_text_patches,
     convert_html_to_docling_table,
     convert_markdown_to_docling_document,
     create_document_outline,
     find_json_dicts,
     has_html_code_block,
     insert_document,
+    load_json_block,
+    parse_markdown,
     serialize_item_to_markdown,
     serialize_table_to_html,
     validate_html_to_docling_table,
 )
+from docling_agent.agent.document_index import DocumentPositionIndex
 from docling_agent.agent_models import view_linear_context
+from docling_agent.backends.base import BaseSession
 from docling_agent.logging import log_debug, log_error, log_info, log_warning
 
 # from examples.smolagents.agent_tools import MCPConfig, setup_mcp_tools
@@ -93,16 +101,36 @@ class DoclingEditingAgent(BaseDoclingAgent):
 
     system_prompt_expert_writer: ClassVar[str] = SYSTEM_PROMPT_EXPERT_WRITER
 
+    # How the outline is shown to identify the items to edit: the whole outline, a collapsed
+    # outline the LLM drills down into, or drill-down only when the whole outline is too long
+    outline_mode: Literal["full", "drilldown", "auto"] = "full"
+    drilldown_outline_chars: int = 8000
+    drilldown_max_rounds: int = 4
+
+    # Edit tasks whose items are identified by one LLM call in run_batch
+    batch_identification_size: int = 10
+
+    # Documents with more headings than one window get their heading levels fixed in
+    # overlapping windows of headings, resolved concurrently
+    heading_window_size: int = 120
+    heading_window_overlap: int = 20
+
+    # "patch": text edits are returned as find/replace patches per ref and applied locally,
+    # with full regeneration as fallback; "full": the model regenerates the edited markdown
+    edit_protocol: Literal["full", "patch"] = "full"
+
     def __init__(
         self,
         *,
         tools: list,
         backend=None,
+        session_wrapper: Callable[[BaseSession], BaseSession] | None = None,
     ):
         super().__init__(
             agent_type=DoclingAgentType.DOCLING_DOCUMENT_EDITOR,
             backend=backend or self.default_backend(),
             tools=tools,
+            session_wrapper=session_wrapper,
         )
 
     def run(
@@ -140,16 +168,296 @@ class DoclingEditingAgent(BaseDoclingAgent):
 
         return document
 
+    def run_batch(
+        self,
+        tasks: list[str],
+        document: DoclingDocument | None = None,
+        loop_budget: int = 3,
+    ) -> DoclingDocument:
+        """Apply many edit *tasks* to *document* in one run.
+
+        The outline is built once and the items of ``batch_identification_size``
+        tasks are identified per LLM call. Heading level changes are applied first,
+        since they replace items in place. The new content of all updated and
+        rewritten items is then generated concurrently and merged from the last
+        item to the first, so that merging an item never shifts the refs of the
+        items still to merge. Tasks on the same single item are merged into one
+        edit; a task whose items overlap another task's, or whose operation could
+        not be identified, is run on its own with :meth:`run` afterwards.
+        """
+        if document is None:
+            raise ValueError("Document must not be None")
+        if not tasks:
+            return document
+
+        outline = self._outline_for_task(task="\n".join(tasks), document=document)
+        operations = self._identify_batch_operations(
+            tasks=tasks, document=document, outline=outline, loop_budget=loop_budget
+        )
+
+        positions = DocumentPositionIndex(document)
+        edits: dict[tuple[str, ...], tuple[str, list[str]]] = {}  # refs -> (operation, tasks)
+        claimed: set[str] = set()
+        deferred: list[str] = []
+        for index, task in enumerate(tasks):
+            op = operations.get(index)
+            if isinstance(op, UpdateSectionHeadingLevelOperation):
+                self._update_section_heading_level(
+                    task=task, document=document, changes=op.changes, insertions=op.insertions, index=positions
+                )
+                continue
+            if op is None:
+                deferred.append(task)
+                continue
+
+            refs = (op.ref,) if isinstance(op, UpdateContentOperation) else tuple(op.refs)
+            if refs in edits and edits[refs][0] == op.operation == "update_content":
+                edits[refs][1].append(task)
+            elif claimed.isdisjoint(refs):
+                edits[refs] = (op.operation, [task])
+                claimed.update(refs)
+            else:
+                deferred.append(task)
+
+        log_info("Batch edit", tasks=len(tasks), edits=len(edits), deferred=len(deferred))
+        proposals = dict(
+            self.backend.map_concurrently(
+                lambda refs: self._propose_batch_edit(
+                    operation=edits[refs][0],
+                    task=self._merge_tasks(edits[refs][1]),
+                    document=document,
+                    refs=list(refs),
+                    loop_budget=loop_budget,
+                ),
+                edits,
+            )
+        )
+
+        # Merging replaces an item by new items appended at the end of its array and
+        # shifts the refs after it: merging from the last item keeps the other refs valid
+        for refs in sorted(edits, key=lambda refs: self._ref_index(refs[0]), reverse=True):
+            proposal = proposals[refs]
+            item = RefItem(cref=refs[0]).resolve(document)
+            if proposal is None:
+                log_warning("No valid content produced for batch edit", ref=refs[0])
+            elif isinstance(proposal, TableData):
+                cast(TableItem, item).data = proposal
+            else:
+                insert_document(item=item, doc=document, updated_doc=proposal)
+
+        for task in deferred:
+            self.run(task=task, document=document)
+
+        return document
+
+    def fix_section_heading_levels(
+        self,
+        *,
+        document: DoclingDocument,
+        refs: list[str] | None = None,
+    ) -> DoclingDocument:
+        """Let the LLM correct section heading levels, restricted to *refs* when given.
+
+        The other headings are presented as already correct and any change the
+        model proposes for them is ignored. Documents with more than
+        ``heading_window_size`` headings are fixed window by window (see
+        :meth:`_windowed_heading_level_changes`), without missing-heading insertions.
+        """
+        task = "Ensure the section headings have the correct level."
+        if refs:
+            task += (
+                " The levels of all other section headings are already correct and must not change;"
+                f" only decide the levels of: {', '.join(refs)}"
+            )
+
+        headings = self._heading_levels(document)
+        if len(headings) > self.heading_window_size:
+            changes = self._windowed_heading_level_changes(headings=headings, refs=refs)
+            self._update_section_heading_level(task=task, document=document, changes=changes, insertions=[])
+            return document
+
+        # Heading levels depend on all headings, so the LLM always sees the whole outline here
+        outline = create_document_outline(doc=document, format=OutlineFormat.MARKDOWN)
+        op = self._identify_document_items(task=task, document=document, outline=outline)
+        if not isinstance(op, UpdateSectionHeadingLevelOperation):
+            log_warning(f"Expected update_section_heading_level, got {op.operation}")
+            return document
+
+        changes, insertions = op.changes, op.insertions
+        if refs:
+            allowed = set(refs)
+            changes = [change for change in changes if change.ref in allowed]
+            insertions = []
+
+        self._update_section_heading_level(task=task, document=document, changes=changes, insertions=insertions)
+        return document
+
+    @staticmethod
+    def _heading_levels(document: DoclingDocument) -> list[tuple[str, str, int]]:
+        """``(ref, text, level)`` of the title (level 0) and section headings, in reading order."""
+        headings = []
+        for item, _ in document.iterate_items():
+            if isinstance(item, TitleItem):
+                headings.append((item.self_ref, item.text, 0))
+            elif isinstance(item, SectionHeaderItem):
+                headings.append((item.self_ref, item.text, item.level))
+        return headings
+
+    def _windowed_heading_level_changes(
+        self,
+        *,
+        headings: list[tuple[str, str, int]],
+        refs: list[str] | None = None,
+    ) -> list[SectionHeadingLevelChange]:
+        """Resolve the levels of *headings* in overlapping windows and merge them into one change set.
+
+        Windows of ``heading_window_size`` headings overlapping by ``heading_window_overlap``
+        are sent concurrently. The windows are reconciled in reading order: a window whose
+        levels are consistently shifted with respect to the previous window on their overlap
+        is shifted back by the most common difference, and each heading keeps the level from
+        the window where it is furthest from the edges. Only one heading may become the title.
+        """
+        size = max(2, self.heading_window_size)
+        step = max(1, size - max(0, min(self.heading_window_overlap, size - 1)))
+        starts = list(range(0, max(1, len(headings) - size + step), step))
+        log_info("Fixing heading levels in windows", headings=len(headings), windows=len(starts))
+
+        proposals = dict(
+            self.backend.map_concurrently(
+                lambda start: self._resolve_heading_window(headings=headings, start=start, size=size, refs=refs),
+                starts,
+            )
+        )
+
+        levels: dict[str, int] = {}
+        owner_margin: dict[str, int] = {}
+        previous: dict[str, int] = {}
+        for start in starts:
+            window = proposals[start]
+            shared = [ref for ref in window if ref in previous and window[ref] > 0 and previous[ref] > 0]
+            shift = Counter(previous[ref] - window[ref] for ref in shared).most_common(1)[0][0] if shared else 0
+            if shift:
+                log_debug("Shifting heading window to match the previous one", start=start, shift=shift)
+                window = {ref: max(1, level + shift) if level > 0 else level for ref, level in window.items()}
+
+            end = min(start + size, len(headings))
+            for position in range(start, end):
+                ref = headings[position][0]
+                margin = min(position - start, end - 1 - position)
+                if ref not in owner_margin or margin > owner_margin[ref]:
+                    levels[ref], owner_margin[ref] = window[ref], margin
+            previous = window
+
+        allowed = set(refs) if refs else None
+        current_title = next((ref for ref, _, level in headings if level == 0), None)
+        changes: list[SectionHeadingLevelChange] = []
+        for ref, _, level in headings:
+            to_level = levels[ref]
+            if to_level == 0 and current_title not in (None, ref):
+                to_level = level
+            elif to_level == 0:
+                current_title = ref
+            if to_level != level and (allowed is None or ref in allowed) and level != 0:
+                changes.append(SectionHeadingLevelChange(ref=ref, to_level=to_level))
+        return changes
+
+    def _resolve_heading_window(
+        self,
+        *,
+        headings: list[tuple[str, str, int]],
+        start: int,
+        size: int,
+        refs: list[str] | None = None,
+        loop_budget: int = 3,
+    ) -> dict[str, int]:
+        """Levels of the headings ``headings[start : start + size]`` after asking the LLM about them."""
+        window = headings[start : start + size]
+        current = {ref: level for ref, _, level in window}
+        decidable = [ref for ref, _, level in window if level != 0 and (not refs or ref in refs)]
+        if not decidable:
+            return current
+
+        lines = "\n".join(f"{'#' * max(1, level)} {text} [ref={ref}] (level {level})" for ref, text, level in window)
+        preceding = headings[start - 1] if start > 0 else None
+        context = (
+            f"The excerpt follows the heading {preceding[1]!r}, which has level {preceding[2]}.\n\n"
+            if preceding
+            else ""
+        )
+        prompt = f"""The following headings are an excerpt of the outline of a long document, in reading order:
+
+```
+{lines}
+```
+
+{context}Determine the correct level of each of these headings: {", ".join(decidable)}.
+Sibling sections have the same level, child sections are one level deeper than their parent. Use level -1 if a
+heading is actually body text and level 0 if it is the document title.
+
+Return a ```json...``` block with a list of JSON objects with the fields "ref" and "to_level", only for the headings
+whose level must change. Return an empty list if all levels are correct.
+"""
+
+        def _parse(content: str) -> dict[str, int] | None:
+            # A truncated block must be retried, not read as "no level changes in this window"
+            changes = load_json_block(content)
+            if isinstance(changes, dict):
+                changes = [changes]
+            if not isinstance(changes, list):
+                return None
+            found: dict[str, int] = {}
+            for change in changes:
+                try:
+                    change = SectionHeadingLevelChange.model_validate(change)
+                except ValidationError:
+                    return None
+                if change.ref not in decidable:
+                    return None
+                found[change.ref] = change.to_level
+            return found
+
+        m = self._create_reasoning_session(system_prompt=self.system_prompt_for_editing_document)
+        answer = m.instruct(
+            prompt,
+            requirements=[
+                Requirement(
+                    description='Return a list of JSON objects with "ref" and "to_level" in ```json...``` format',
+                    validation_fn=simple_validate(lambda content: _parse(content) is not None),
+                ),
+            ],
+            retry_budget=loop_budget,
+        )
+
+        found = _parse(answer)
+        if found is None:
+            log_warning("Could not parse the heading levels of a window; keeping them", start=start)
+            return current
+        return current | found
+
+    def apply_section_heading_level_changes(
+        self,
+        *,
+        document: DoclingDocument,
+        changes: list[SectionHeadingLevelChange],
+    ) -> DoclingDocument:
+        """Apply precomputed heading level *changes* without consulting the LLM."""
+        index = DocumentPositionIndex(document)
+        for change in changes:
+            self._apply_section_heading_change(document=document, change=change, index=index)
+        return document
+
     def _identify_document_items(
         self,
         task: str,
         document: DoclingDocument,
         loop_budget: int = 3,
+        outline: str | None = None,
     ) -> DocumentOperation:
         log_info(f"task: {task}")
 
         # TODO: check best format for describing the outline (MARKDOWN vs JSON) for short and long documents
-        outline = create_document_outline(doc=document, format=OutlineFormat.MARKDOWN)
+        if outline is None:
+            outline = self._outline_for_task(task=task, document=document)
         log_debug(f"outline: {outline}")
 
         context = rf"""Given the current outline of the document:
@@ -240,6 +548,264 @@ Now, provide me with the operation to execute the task using the exact field nam
         except ValidationError as e:
             raise ValueError(f"Operation validation failed: {e}") from e
 
+    def _identify_batch_operations(
+        self,
+        *,
+        tasks: list[str],
+        document: DoclingDocument,
+        outline: str,
+        loop_budget: int = 3,
+    ) -> dict[int, DocumentOperation]:
+        """Operation of each of *tasks* (by index), identified in concurrent calls of a few tasks each."""
+        size = max(1, self.batch_identification_size)
+        chunks = {start: list(range(start, min(start + size, len(tasks)))) for start in range(0, len(tasks), size)}
+
+        operations: dict[int, DocumentOperation] = {}
+        for _, found in self.backend.map_concurrently(
+            lambda start: self._identify_operations_of_tasks(
+                tasks={index: tasks[index] for index in chunks[start]},
+                outline=outline,
+                loop_budget=loop_budget,
+            ),
+            chunks,
+        ):
+            operations.update(found)
+        return operations
+
+    def _identify_operations_of_tasks(
+        self,
+        *,
+        tasks: dict[int, str],
+        outline: str,
+        loop_budget: int = 3,
+    ) -> dict[int, DocumentOperation]:
+        numbered = "\n".join(f"{index}. {task}" for index, task in tasks.items())
+        prompt = rf"""Given the current outline of the document:
+
+```
+{outline}
+```
+
+To accomplish each of the following numbered tasks:
+
+{numbered}
+
+Analyze the document outline above and, for every task, identify the document items that are relevant to it
+and the operation needed (update_content, rewrite_content, or update_section_heading_level).
+
+Return a ```json...``` block with a list containing one JSON object per task, with the fields:
+    - "task": the number of the task
+    - "operation" (not "action") set to one of: update_content, rewrite_content, update_section_heading_level
+    - "ref", "refs", or "changes", depending on the operation
+    - For update_section_heading_level: provide a complete "changes" list and, when needed, an "insertions" list
+"""
+        log_debug(f"prompt: {prompt}")
+
+        def _parse(content: str) -> dict[int, DocumentOperation] | None:
+            found: dict[int, DocumentOperation] = {}
+            for op in find_json_dicts(text=content):
+                if not isinstance(op, dict):
+                    return None
+                op = dict(op)
+                index = op.pop("task", None)
+                if index not in tasks:
+                    return None
+                try:
+                    found[index] = TypeAdapter(DocumentOperation).validate_python(op)
+                except ValidationError:
+                    return None
+            return found
+
+        m = self._create_reasoning_session(system_prompt=self.system_prompt_for_editing_document)
+        answer = m.instruct(
+            prompt,
+            requirements=[
+                Requirement(
+                    description='Return a list of JSON objects in ```json...``` format, each with a "task" number '
+                    'and an "operation" field',
+                    validation_fn=simple_validate(lambda content: bool(_parse(content))),
+                ),
+            ],
+            retry_budget=loop_budget,
+        )
+        log_debug(f"answer: {answer}")
+
+        found = _parse(answer)
+        if not found:
+            log_warning("Could not identify the operations of the batch", tasks=list(tasks))
+            return {}
+        return found
+
+    def _propose_batch_edit(
+        self,
+        *,
+        operation: str,
+        task: str,
+        document: DoclingDocument,
+        refs: list[str],
+        loop_budget: int = 3,
+    ) -> TableData | DoclingDocument | None:
+        if operation == "rewrite_content":
+            return self._propose_rewrite(task=task, document=document, refs=refs, loop_budget=loop_budget)
+
+        item = RefItem(cref=refs[0]).resolve(document)
+        if isinstance(item, TableItem):
+            return self._propose_table_data(task=task, document=document, table=item, loop_budget=loop_budget)
+        if isinstance(item, TextItem):
+            return self._propose_textitem_update(task=task, document=document, item=item, loop_budget=loop_budget)
+
+        log_warning(f"Dont know how to update the item (of label={item.label}) for task: {task}")
+        return None
+
+    @staticmethod
+    def _ref_index(ref: str) -> int:
+        """Index of *ref* in its document array, or -1 for refs like ``#/body``."""
+        last = ref.rsplit("/", 1)[-1]
+        return int(last) if last.isdigit() else -1
+
+    @staticmethod
+    def _merge_tasks(tasks: list[str]) -> str:
+        if len(tasks) == 1:
+            return tasks[0]
+        return "Apply all of the following edits:\n" + "\n".join(f"- {task}" for task in tasks)
+
+    def _outline_for_task(self, *, task: str, document: DoclingDocument) -> str:
+        """Outline shown to identify the items for *task*, according to ``outline_mode``."""
+        if self.outline_mode != "drilldown":
+            outline = create_document_outline(doc=document, format=OutlineFormat.MARKDOWN)
+            if self.outline_mode == "full" or len(outline) <= self.drilldown_outline_chars:
+                return outline
+        return self._drilldown_outline(task=task, document=document)
+
+    @staticmethod
+    def _section_tree(document: DoclingDocument) -> tuple[list[TextItem], dict[int | None, list[int]]]:
+        """Title and section headings of *document* in reading order, and the children of each (None: roots)."""
+        headings: list[TextItem] = []
+        children: dict[int | None, list[int]] = {None: []}
+        stack: list[tuple[int, int]] = []  # (heading index, level)
+        for item, _ in document.iterate_items():
+            if isinstance(item, TitleItem):
+                level = 0
+            elif isinstance(item, SectionHeaderItem):
+                level = item.level
+            else:
+                continue
+            while stack and stack[-1][1] >= level:
+                stack.pop()
+            index = len(headings)
+            headings.append(item)
+            children[index] = []
+            children[stack[-1][0] if stack else None].append(index)
+            stack.append((index, level))
+        return headings, children
+
+    @staticmethod
+    def _render_windowed_outline(
+        headings: list[TextItem],
+        children: dict[int | None, list[int]],
+        expanded: set[int],
+    ) -> str:
+        """Indented outline of the visible headings; collapsed sections show how many subsections they hide."""
+        lines: list[str] = []
+
+        def render(index: int, depth: int) -> None:
+            item = headings[index]
+            line = f"{'  ' * depth}- {item.text} [ref={item.self_ref}]"
+            if item.meta and item.meta.summary and item.meta.summary.text:
+                line += f": {item.meta.summary.text[:200]}"
+            hidden = len(children[index])
+            if hidden and index not in expanded:
+                line += f" (+{hidden} subsections, collapsed)"
+            lines.append(line)
+            if index in expanded:
+                for child in children[index]:
+                    render(child, depth + 1)
+
+        for root in children[None]:
+            render(root, 0)
+        return "\n".join(lines)
+
+    def _drilldown_outline(self, *, task: str, document: DoclingDocument) -> str:
+        """Let the LLM expand only the sections relevant to *task*, starting from the top-level sections.
+
+        Returns the resulting windowed outline: refs are preserved, and sections that were
+        not expanded stay collapsed to a single line, so its size follows the depth of the
+        outline rather than the length of the document.
+        """
+        headings, children = self._section_tree(document)
+        # The title is open from the start: the first round shows the top-level sections
+        expanded = {index for index, item in enumerate(headings) if isinstance(item, TitleItem)}
+        for round_index in range(self.drilldown_max_rounds):
+            outline = self._render_windowed_outline(headings, children, expanded)
+            collapsed = {
+                headings[index].self_ref: index
+                for index in self._visible_sections(children, expanded)
+                if children[index] and index not in expanded
+            }
+            if not collapsed:
+                break
+            selected = self._select_sections_to_expand(task=task, outline=outline, collapsed=sorted(collapsed))
+            log_debug("Drill-down outline", round=round_index + 1, expand=selected)
+            if not selected:
+                break
+            expanded.update(collapsed[ref] for ref in selected)
+        return self._render_windowed_outline(headings, children, expanded)
+
+    @staticmethod
+    def _visible_sections(children: dict[int | None, list[int]], expanded: set[int]) -> list[int]:
+        visible: list[int] = []
+        queue = list(children[None])
+        while queue:
+            index = queue.pop(0)
+            visible.append(index)
+            if index in expanded:
+                queue.extend(children[index])
+        return visible
+
+    def _select_sections_to_expand(
+        self,
+        *,
+        task: str,
+        outline: str,
+        collapsed: list[str],
+        loop_budget: int = 3,
+    ) -> list[str]:
+        """Ask the LLM which *collapsed* sections of *outline* to open for *task*; [] when none."""
+        prompt = (
+            f"Given the following outline of a long document, where some sections are collapsed:\n\n"
+            f"```\n{outline}\n```\n\n"
+            f"To accomplish the following task:\n\n{task}\n\n"
+            "Select the collapsed sections whose subsections you need to see to find the document items "
+            "relevant to the task. Return a JSON object in a ```json...``` block with the key "
+            '"expand": a list of section refs taken from the collapsed sections '
+            f"{collapsed}. Return an empty list if the visible outline is sufficient."
+        )
+
+        def _validate(content: str) -> bool:
+            dicts = find_json_dicts(text=content)
+            if len(dicts) != 1 or not isinstance(dicts[0].get("expand"), list):
+                return False
+            return all(ref in collapsed for ref in dicts[0]["expand"])
+
+        m = self._create_reasoning_session(system_prompt=self.system_prompt_for_editing_document)
+        answer = m.instruct(
+            prompt,
+            requirements=[
+                Requirement(
+                    description=f'Return one JSON object with "expand": a list of refs from {collapsed}',
+                    validation_fn=simple_validate(_validate),
+                ),
+            ],
+            retry_budget=loop_budget,
+        )
+
+        dicts = find_json_dicts(text=answer)
+        refs = dicts[0].get("expand") if dicts else None
+        if not isinstance(refs, list):
+            log_warning("Could not parse the sections to expand; keeping the outline collapsed")
+            return []
+        return [ref for ref in refs if ref in collapsed]
+
     def _update_content(self, task: str, document: DoclingDocument, sref: str):
         log_info("_update_content_of_document_items")
 
@@ -264,6 +830,19 @@ Now, provide me with the operation to execute the task using the exact field nam
     ):
         log_info("_update_content_of_table")
 
+        data = self._propose_table_data(task=task, document=document, table=table, loop_budget=loop_budget)
+        if data is not None:
+            table.data = data
+
+    def _propose_table_data(
+        self,
+        task: str,
+        document: DoclingDocument,
+        table: TableItem,
+        loop_budget: int = 3,
+    ) -> TableData | None:
+        """New data of *table* after *task*; the document is not modified."""
+
         html_table = serialize_table_to_html(table=table, doc=document)
 
         prompt = f"""Given the following HTML table,
@@ -297,11 +876,11 @@ Execute the following task: {task}
 
         new_tables = convert_html_to_docling_table(text=answer)
 
-        if new_tables and len(new_tables) == 1:
-            table.data = new_tables[0].data
-        elif new_tables and len(new_tables) > 1:
+        if not new_tables:
+            return None
+        if len(new_tables) > 1:
             log_error("too many tables returned ...")
-            table.data = new_tables[0].data
+        return new_tables[0].data
 
     def _update_content_of_textitem(
         self,
@@ -312,8 +891,34 @@ Execute the following task: {task}
     ):
         log_info("_update_content_of_text")
 
+        updated_doc = self._propose_textitem_update(task=task, document=document, item=item, loop_budget=loop_budget)
+        if updated_doc is None:
+            log_warning("No valid document produced for updated content.")
+            return
+
+        document = insert_document(item=item, doc=document, updated_doc=updated_doc)
+
+    def _propose_textitem_update(
+        self,
+        task: str,
+        document: DoclingDocument,
+        item: TextItem,
+        loop_budget: int = 3,
+    ) -> DoclingDocument | None:
+        """Content replacing *item* after *task*; the document is not modified."""
         text = serialize_item_to_markdown(item=item, doc=document)
 
+        if self.edit_protocol == "patch":
+            patched = self._propose_patches(
+                task=task,
+                texts={item.self_ref: text},
+                system_prompt=self.system_prompt_for_editing_table,
+                loop_budget=loop_budget,
+            )
+            updated_doc = parse_markdown(patched[item.self_ref]) if patched is not None else None
+            if updated_doc is not None:
+                return updated_doc
+
         prompt = f"""Given the following {item.label},
 
 ```md
@@ -332,12 +937,72 @@ Execute the following task: {task}
         )
         log_info(f"response: {answer}")
 
-        updated_doc = convert_markdown_to_docling_document(text=answer)
-        if updated_doc is None:
-            log_warning("No valid document produced for updated content.")
-            return
+        return convert_markdown_to_docling_document(text=answer)
 
-        document = insert_document(item=item, doc=document, updated_doc=updated_doc)
+    def _propose_patches(
+        self,
+        *,
+        task: str,
+        texts: dict[str, str],
+        system_prompt: str,
+        loop_budget: int = 3,
+    ) -> dict[str, str] | None:
+        """Markdown of each ref of *texts* after *task*, edited with find/replace patches from the LLM.
+
+        Returns None when the LLM gives no patches that apply, so that the caller
+        falls back to regenerating the whole content.
+        """
+        items = "\n\n".join(f"[ref={ref}]\n```md\n{text}\n```" for ref, text in texts.items())
+        prompt = f"""Given the following document items in markdown,
+
+{items}
+
+Execute the following task: {task}
+
+Do not rewrite the items. Return a ```json...``` block with a list of patches, each a JSON object with the fields
+"ref" (the item to patch), "find" (an exact excerpt of its markdown, long enough to occur only once) and
+"replace" (the text replacing the excerpt). Return at least one patch.
+"""
+
+        def _apply(content: str) -> dict[str, str] | None:
+            # A block that does not load (e.g. truncated) or has no patch must not read as "no change"
+            found = load_json_block(content)
+            if isinstance(found, dict):
+                found = [found]
+            if not isinstance(found, list) or not found:
+                return None
+            patches: dict[str, list[tuple[str, str]]] = {ref: [] for ref in texts}
+            for patch in found:
+                if not isinstance(patch, dict) or patch.get("ref") not in texts:
+                    return None
+                find, replace = patch.get("find"), patch.get("replace")
+                if not isinstance(find, str) or not isinstance(replace, str):
+                    return None
+                patches[patch["ref"]].append((find, replace))
+
+            patched = {ref: apply_text_patches(texts[ref], ref_patches) for ref, ref_patches in patches.items()}
+            if any(text is None for text in patched.values()):
+                return None
+            return cast(dict[str, str], patched)
+
+        m = self._create_reasoning_session(system_prompt=system_prompt)
+        answer = m.instruct(
+            prompt,
+            requirements=[
+                Requirement(
+                    description='Return a list of {"ref", "find", "replace"} patches in ```json...``` format, '
+                    "each find being an exact excerpt that occurs once in its item",
+                    validation_fn=simple_validate(lambda content: _apply(content) is not None),
+                ),
+            ],
+            retry_budget=loop_budget,
+        )
+        log_info(f"response: {answer}")
+
+        patched = _apply(answer)
+        if patched is None:
+            log_info("Patches did not apply, regenerating the content", refs=list(texts))
+        return patched
 
     def _update_section_heading_level(
         self,
@@ -345,18 +1010,22 @@ Execute the following task: {task}
         document: DoclingDocument,
         changes: list[SectionHeadingLevelChange],
         insertions: list[MissingSectionHeadingInsertion],
+        index: DocumentPositionIndex | None = None,
     ):
+        # Headings are only replaced in place, so one index serves all changes and insertions
+        index = index or DocumentPositionIndex(document)
         for change in changes:
-            self._apply_section_heading_change(document=document, change=change)
+            self._apply_section_heading_change(document=document, change=change, index=index)
 
         for insertion in insertions:
-            self._insert_missing_section_header(document=document, insertion=insertion)
+            self._insert_missing_section_header(document=document, insertion=insertion, index=index)
 
     def _apply_section_heading_change(
         self,
         *,
         document: DoclingDocument,
         change: SectionHeadingLevelChange,
+        index: DocumentPositionIndex,
     ) -> None:
         item = RefItem(cref=change.ref).resolve(document)
 
@@ -365,11 +1034,11 @@ Execute the following task: {task}
             return
 
         if change.to_level == -1:
-            self._convert_section_header_to_text_item(document=document, item=item)
+            self._convert_section_header_to_text_item(document=document, item=item, index=index)
             return
 
         if change.to_level == 0:
-            self._convert_section_header_to_title_item(document=document, item=item)
+            self._convert_section_header_to_title_item(document=document, item=item, index=index)
             return
 
         item.level = change.to_level
@@ -379,6 +1048,7 @@ Execute the following task: {task}
         *,
         document: DoclingDocument,
         item: SectionHeaderItem,
+        index: DocumentPositionIndex,
     ) -> None:
         replacement = TextItem(
             self_ref=item.self_ref,
@@ -395,23 +1065,20 @@ Execute the following task: {task}
             formatting=item.formatting,
             hyperlink=item.hyperlink,
         )
-        self._replace_text_item_in_place(document=document, old_item=item, new_item=replacement)
+        self._replace_text_item_in_place(document=document, old_item=item, new_item=replacement, index=index)
 
     def _convert_section_header_to_title_item(
         self,
         *,
         document: DoclingDocument,
         item: SectionHeaderItem,
+        index: DocumentPositionIndex,
     ) -> None:
-        existing_titles = [
-            candidate
-            for candidate in document.texts
-            if isinstance(candidate, TitleItem) and candidate.self_ref != item.self_ref
-        ]
+        existing_titles = sorted(index.title_refs() - {item.self_ref})
         if existing_titles:
             raise ValueError(
                 f"Cannot convert {item.self_ref} to TitleItem because the document already contains "
-                f"{existing_titles[0].self_ref}."
+                f"{existing_titles[0]}."
             )
 
         replacement = TitleItem(
@@ -428,7 +1095,7 @@ Execute the following task: {task}
             formatting=item.formatting,
             hyperlink=item.hyperlink,
         )
-        self._replace_text_item_in_place(document=document, old_item=item, new_item=replacement)
+        self._replace_text_item_in_place(document=document, old_item=item, new_item=replacement, index=index)
 
     def _replace_text_item_in_place(
         self,
@@ -436,24 +1103,28 @@ Execute the following task: {task}
         document: DoclingDocument,
         old_item: TextItem,
         new_item: TextItem,
+        index: DocumentPositionIndex | None = None,
     ) -> None:
         try:
-            index = int(old_item.self_ref.split("/")[-1])
+            position = int(old_item.self_ref.split("/")[-1])
         except (IndexError, ValueError) as exc:
             raise ValueError(f"Cannot determine text index from ref: {old_item.self_ref}") from exc
 
-        if index < 0 or index >= len(document.texts):
+        if position < 0 or position >= len(document.texts):
             raise ValueError(f"Text index out of bounds for ref: {old_item.self_ref}")
 
-        document.texts[index] = new_item
+        document.texts[position] = new_item
+        if index is not None:
+            index.replace(old_item, new_item)
 
     def _insert_missing_section_header(
         self,
         *,
         document: DoclingDocument,
         insertion: MissingSectionHeadingInsertion,
+        index: DocumentPositionIndex,
     ) -> None:
-        candidate = self._find_matching_text_item_between_refs(document=document, insertion=insertion)
+        candidate = self._find_matching_text_item_between_refs(document=document, insertion=insertion, index=index)
         if candidate is None:
             log_warning(
                 f"No matching TextItem found between {insertion.previous_ref} and {insertion.next_ref} "
@@ -476,32 +1147,28 @@ Execute the following task: {task}
             hyperlink=candidate.hyperlink,
             level=insertion.level,
         )
-        self._replace_text_item_in_place(document=document, old_item=candidate, new_item=replacement)
+        self._replace_text_item_in_place(document=document, old_item=candidate, new_item=replacement, index=index)
 
     def _find_matching_text_item_between_refs(
         self,
         *,
         document: DoclingDocument,
         insertion: MissingSectionHeadingInsertion,
+        index: DocumentPositionIndex,
     ) -> TextItem | None:
-        ordered_items = [item for item, _ in document.iterate_items(with_groups=True)]
-        refs = [item.self_ref for item in ordered_items]
-
-        try:
-            previous_index = refs.index(insertion.previous_ref)
-            next_index = refs.index(insertion.next_ref)
-        except ValueError:
+        if insertion.previous_ref not in index or insertion.next_ref not in index:
             log_warning(f"Could not locate insertion boundaries: {insertion.previous_ref} .. {insertion.next_ref}")
             return None
 
-        if previous_index >= next_index:
+        between = index.items_between(insertion.previous_ref, insertion.next_ref)
+        if between is None:
             log_warning(f"Invalid insertion boundaries: {insertion.previous_ref} is not before {insertion.next_ref}")
             return None
 
         pattern = re.compile(insertion.regex)
         matches = [
             item
-            for item in ordered_items[previous_index + 1 : next_index]
+            for item in between
             if isinstance(item, TextItem)
             and not isinstance(item, SectionHeaderItem | TitleItem)
             and pattern.search(item.text)
@@ -524,6 +1191,24 @@ Execute the following task: {task}
     ):
         log_info("_update_content_of_text")
 
+        updated_doc = self._propose_rewrite(task=task, document=document, refs=refs, loop_budget=loop_budget)
+        if updated_doc is None:
+            log_warning("No valid document produced for rewrite.")
+            return
+
+        ref = RefItem(cref=refs[0])
+        item = ref.resolve(document)
+
+        document = insert_document(item=item, doc=document, updated_doc=updated_doc)
+
+    def _propose_rewrite(
+        self,
+        task: str,
+        document: DoclingDocument,
+        refs: list[str],
+        loop_budget: int = 3,
+    ) -> DoclingDocument | None:
+        """Content replacing the items *refs* after *task*; the document is not modified."""
         texts = []
         for sref in refs:
             ref = RefItem(cref=sref)
@@ -531,6 +1216,17 @@ Execute the following task: {task}
 
             texts.append(serialize_item_to_markdown(item=item, doc=document))
 
+        if self.edit_protocol == "patch":
+            patched = self._propose_patches(
+                task=task,
+                texts=dict(zip(refs, texts, strict=True)),
+                system_prompt=self.system_prompt_expert_writer,
+                loop_budget=loop_budget,
+            )
+            updated_doc = parse_markdown("\n\n".join(patched[sref] for sref in refs)) if patched is not None else None
+            if updated_doc is not None:
+                return updated_doc
+
         text = "\n\n".join(texts)
 
         prompt = f"""Given the following text section in markdown,
@@ -551,12 +1247,4 @@ Execute the following task: {task}
         )
         log_info(f"response: {answer}")
 
-        updated_doc = convert_markdown_to_docling_document(text=answer)
-        if updated_doc is None:
-            log_warning("No valid document produced for rewrite.")
-            return
-
-        ref = RefItem(cref=refs[0])
-        item = ref.resolve(document)
-
-        document = insert_document(item=item, doc=document, updated_doc=updated_doc)
+        return convert_markdown_to_docling_document(text=answer)
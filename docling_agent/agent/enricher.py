@@ -1,10 +1,17 @@
+import functools
+import hashlib
+import inspect
 import json
+import queue
 import re
-from collections.abc import Callable
+import threading
+import time
+from collections.abc import Callable, Generator
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, ClassVar, Literal, Protocol, cast
+from typing import Any, ClassVar, Literal, Protocol, TypeVar, cast
 
+from docling_core.experimental.serializer.outline import OutlineFormat
 from docling_core.transforms.serializer.markdown import (
     ImageRefMode,
     MarkdownDocSerializer,
@@ -15,6 +22,7 @@ from docling_core.types.doc.document import (
     BaseMeta,
     CodeLanguageLabel,
     CodeMetaField,
+    DocItem,
     DocItemLabel,
     DoclingDocument,
     EntitiesMetaField,
@@ -23,9 +31,9 @@ from docling_core.types.doc.document import (
     GroupItem,
     NodeItem,
     PictureClassificationMetaField,
-    PictureClassificationPrediction,
     PictureItem,
     PictureMeta,
+    RefItem,
     SectionHeaderItem,
     SummaryMetaField,
     TableData,
@@ -35,19 +43,24 @@ from docling_core.types.doc.document import (
     TitleItem,
 )
 from mellea.stdlib.requirements import Requirement, simple_validate
-from pydantic import Field
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
 
 from docling_agent.agent.base import BaseDoclingAgent, DoclingAgentType
 from docling_agent.agent.base_functions import (
+    classification_from_labels,
+    classify_picture_contexts,
     collect_subtree_text,
+    create_document_outline,
     find_json_dicts,
     has_json_dicts,
     make_hierarchical_document,
     serialize_table_to_html,
 )
+from docling_agent.agent.lexical import TfidfKeywordExtractor, resolve_spans, strip_html
 from docling_agent.agent_models import view_linear_context
 from docling_agent.backends.base import BaseSession
 from docling_agent.logging import (
+    bind_log_context,
     log_debug,
     log_info,
     log_stage_start,
@@ -86,6 +99,8 @@ _OP_ALIASES: dict[str, str] = {
     "entities": "_detect_key_entities",
     "classify_items": "_classify_items",
     "classify": "_classify_items",
+    "generate_picture_code": "_generate_picture_codes",
+    "code": "_generate_picture_codes",
 }
 
 _ROUTING_OPS = (
@@ -93,8 +108,251 @@ _ROUTING_OPS = (
     "find_search_keywords",
     "detect_key_entities",
     "classify_items",
+    "generate_picture_code",
 )
 
+# Operations that re-run the heading-level repair unless told otherwise
+_HEADING_FIX_METHODS = frozenset({"_summarize_items", "_find_search_keywords"})
+
+
+_R = TypeVar("_R")
+
+
+class _GenerationMemo:
+    """Run-scoped memo of generated content, keyed by operation, normalized input text and prompt variant.
+
+    Converted documents repeat a lot of text (running headers, boilerplate, identical
+    captions); the memo makes sure each distinct input is sent to the LLM only once.
+    """
+
+    def __init__(self) -> None:
+        self._results: dict[tuple[str, str, str], Any] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.lookups = 0
+
+    @staticmethod
+    def _key(operation: str, text: str, variant: str) -> tuple[str, str, str]:
+        normalized = " ".join(text.split())
+        return (
+            operation,
+            hashlib.sha256(normalized.encode("utf-8")).hexdigest(),
+            hashlib.sha256(variant.encode("utf-8")).hexdigest(),
+        )
+
+    def get_or_generate(self, *, operation: str, text: str, variant: str, generate: Callable[[], _R]) -> _R:
+        key = self._key(operation, text, variant)
+        with self._lock:
+            self.lookups += 1
+            if key in self._results:
+                self.hits += 1
+                return self._results[key]
+        result = generate()
+        # Failures are not memoized so that a later occurrence gets its own retry budget
+        if result is not None:
+            with self._lock:
+                self._results[key] = result
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results.clear()
+            self.hits = 0
+            self.lookups = 0
+
+
+def _memo_scoped(method: Callable[..., _R]) -> Callable[..., _R]:
+    """Run an enrichment entry point in its own generation memo scope, see ``_memo_scope``."""
+
+    @functools.wraps(method)
+    def wrapper(self: "DoclingEnrichingAgent", *args: Any, **kwargs: Any) -> _R:
+        with self._memo_scope():
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+class _Checkpointer:
+    """Invoke a save callback every ``every`` enriched nodes or ``interval`` seconds, whichever comes first."""
+
+    def __init__(
+        self,
+        callback: Callable[[DoclingDocument, str], None],
+        *,
+        every: int,
+        interval: float,
+    ) -> None:
+        self._callback = callback
+        self._every = max(1, every)
+        self._interval = interval
+        self._pending = 0
+        self._last_save = time.monotonic()
+        self.operation = ""
+
+    def tick(self, document: DoclingDocument) -> None:
+        self._pending += 1
+        if self._pending >= self._every or time.monotonic() - self._last_save >= self._interval:
+            self.flush(document)
+
+    def flush(self, document: DoclingDocument) -> None:
+        if self._pending == 0:
+            return
+        try:
+            self._callback(document, self.operation)
+            log_debug("Saved enrichment checkpoint", operation=self.operation, nodes=self._pending)
+        except Exception as exc:
+            log_warning("Could not save enrichment checkpoint", exception=exc)
+        self._pending = 0
+        self._last_save = time.monotonic()
+
+
+class EnrichmentBudgetExhaustedError(RuntimeError):
+    """Raised when an LLM call would exceed the ``max_calls`` / ``max_tokens`` budget of a run."""
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token count of *text*, at about 4 characters per token."""
+    return len(text) // 4 + 1
+
+
+# Item header and separators around each item of a packed entity-extraction prompt
+_PACKED_ITEM_OVERHEAD_TOKENS = 8
+
+
+class EnrichmentUsage(BaseModel):
+    """LLM usage of an enrichment run, with estimated token counts."""
+
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    exhausted: bool = Field(default=False, description="Whether the run stopped because its budget ran out.")
+    stopped_at: str | None = Field(default=None, description="Operation in progress when the budget ran out.")
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+class _CallBudget:
+    """Thread-safe LLM call and token budget; unlimited where a limit is None."""
+
+    def __init__(self, *, max_calls: int | None, max_tokens: int | None) -> None:
+        self.max_calls = max_calls
+        self.max_tokens = max_tokens
+        self.usage = EnrichmentUsage()
+        self.operation: str | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def limited(self) -> bool:
+        return self.max_calls is not None or self.max_tokens is not None
+
+    def charge(self, prompt: str) -> None:
+        """Account for one call with *prompt*, or raise if it does not fit the budget anymore."""
+        tokens = _estimate_tokens(prompt)
+        with self._lock:
+            if not self.usage.exhausted:
+                over_calls = self.max_calls is not None and self.usage.calls >= self.max_calls
+                over_tokens = self.max_tokens is not None and self.usage.total_tokens + tokens > self.max_tokens
+                if over_calls or over_tokens:
+                    self.usage.exhausted = True
+                    self.usage.stopped_at = self.operation
+                    log_warning(
+                        "Enrichment budget exhausted",
+                        calls=self.usage.calls,
+                        tokens=self.usage.total_tokens,
+                        operation=self.operation,
+                    )
+            if self.usage.exhausted:
+                raise EnrichmentBudgetExhaustedError("Enrichment budget exhausted")
+            self.usage.calls += 1
+            self.usage.prompt_tokens += tokens
+
+    def record(self, answer: str) -> None:
+        with self._lock:
+            self.usage.completion_tokens += _estimate_tokens(answer)
+
+
+class _BudgetedSession(BaseSession):
+    """Session proxy that charges every instruction to a :class:`_CallBudget`.
+
+    Validation retries inside one ``instruct`` are not visible here, so they count as one call.
+    """
+
+    def __init__(self, session: BaseSession, budget: _CallBudget) -> None:
+        self._session = session
+        self._budget = budget
+
+    def instruct(self, prompt: str, *, requirements=None, retry_budget: int = 1) -> str:
+        self._budget.charge(prompt)
+        answer = self._session.instruct(prompt, requirements=requirements, retry_budget=retry_budget)
+        self._budget.record(answer)
+        return answer
+
+    def debug_context_rows(self) -> list[tuple[int, str, str]] | None:
+        return self._session.debug_context_rows()
+
+
+class EnrichmentEvent(BaseModel):
+    """A node that received new metadata during an enrichment run, see :meth:`DoclingEnrichingAgent.run_iter`."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    operation: str = Field(description="Operation that produced the metadata, as named in the run.")
+    self_ref: str = Field(description="Reference of the enriched node in `document`.")
+    field: str = Field(description="Meta attribute that was set, e.g. 'summary' or 'entities'.")
+    meta: Any = Field(description="The value that was set.")
+    document: DoclingDocument = Field(
+        exclude=True,
+        repr=False,
+        description="Document being enriched; hierarchical operations enrich a restructured copy of the input.",
+    )
+
+
+class OperationEstimate(BaseModel):
+    """Estimated LLM work of one enrichment operation."""
+
+    operation: str
+    nodes: int = Field(description="Nodes the operation would enrich.")
+    calls: int = Field(description="Expected LLM calls; validation retries come on top.")
+    prompt_tokens: int
+    completion_tokens: int
+
+
+class EnrichmentPlan(BaseModel):
+    """Estimated LLM work of an enrichment run, per operation."""
+
+    document: str
+    operations: list[OperationEstimate] = Field(default_factory=list)
+
+    @property
+    def calls(self) -> int:
+        return sum(estimate.calls for estimate in self.operations)
+
+    @property
+    def prompt_tokens(self) -> int:
+        return sum(estimate.prompt_tokens for estimate in self.operations)
+
+    @property
+    def completion_tokens(self) -> int:
+        return sum(estimate.completion_tokens for estimate in self.operations)
+
+    def render(self) -> str:
+        """Format the plan as a fixed-width table."""
+        rows = [(e.operation, e.nodes, e.calls, e.prompt_tokens, e.completion_tokens) for e in self.operations]
+        rows.append(
+            ("total", sum(e.nodes for e in self.operations), self.calls, self.prompt_tokens, self.completion_tokens)
+        )
+        lines = [
+            f"Enrichment plan for {self.document!r} (first attempts only; validation retries add calls)",
+            f"{'operation':<24}{'nodes':>8}{'calls':>8}{'prompt tokens':>16}{'completion tokens':>20}",
+        ]
+        lines += [
+            f"{op:<24}{nodes:>8,}{calls:>8,}{prompt:>16,}{completion:>20,}"
+            for op, nodes, calls, prompt, completion in rows
+        ]
+        return "\n".join(lines)
+
 
 class DoclingEnrichingAgent(BaseDoclingAgent):
     """Agent for enriching a document with metadata like summaries, keywords,
@@ -104,7 +362,7 @@ class DoclingEnrichingAgent(BaseDoclingAgent):
 You are a precise document enrichment router. Given a natural language task description, select one or more enrichment operations to run and return only one JSON object in a ```json ...``` block, with the following schema:
 
 {
-  "operations": ["summarize_items" | "find_search_keywords" | "detect_key_entities" | "classify_items", ...],
+  "operations": ["summarize_items" | "find_search_keywords" | "detect_key_entities" | "classify_items" | "generate_picture_code", ...],
   "reason": "short explanation"
 }
 
@@ -127,13 +385,99 @@ Return no extra commentary. Include all operations that are materially requested
     _SUPPORTED_CHART_TYPES: ClassVar[frozenset[str]] = frozenset(
         {"bar-chart", "line-chart", "pie-chart", "scatter-chart", "spider-chart"}
     )
+    _KEYWORD_RERANK_CANDIDATES: ClassVar[int] = 12
+    _KEYWORD_RERANK_EXCERPT_CHARS: ClassVar[int] = 1500
+    _PAGE_BREAK_PLACEHOLDER: ClassVar[str] = "\x00docling-agent-page-break\x00"
+    # Planning estimates: instructions around the node text, and typical answer sizes per kind of call
+    _PLAN_PROMPT_OVERHEAD_TOKENS: ClassVar[int] = 80
+    _PLAN_COMPLETION_TOKENS: ClassVar[dict[str, int]] = {
+        "summary": 80,
+        "keywords": 40,
+        "entities": 150,
+        "classification": 20,
+        "code": 400,
+        "headings": 300,
+        "routing": 50,
+    }
 
     last_operation: dict[str, Any] = Field(default_factory=dict)
+    checkpoint_every: int = Field(default=50, ge=1, description="Checkpoint after this many enriched nodes.")
+    checkpoint_interval: float = Field(default=300.0, gt=0, description="Checkpoint after this many seconds.")
+    entity_packing_budget: int | None = Field(
+        default=None,
+        ge=1,
+        description="Pack consecutive leaf items into one entity prompt up to this many (estimated) tokens.",
+    )
+    picture_batch_size: int = Field(default=20, ge=1, description="Pictures classified per prompt.")
+    keyword_strategy: Literal["llm", "tfidf", "hybrid"] = Field(
+        default="llm",
+        description=(
+            "How find_search_keywords picks keywords: one LLM call per node, local TF-IDF only, "
+            "or local TF-IDF candidates reranked by the LLM."
+        ),
+    )
+    generate_picture_code: bool = Field(
+        default=False,
+        description="Also generate Python code while classifying pictures; otherwise run the 'code' operation.",
+    )
+    heading_level_strategy: Literal["llm", "heuristic", "hybrid"] = Field(
+        default="hybrid",
+        description=(
+            "How heading levels are fixed before summaries and keywords: one full-outline LLM call, "
+            "numbering/layout heuristics only, or heuristics with the LLM deciding the remaining headings."
+        ),
+    )
+    max_calls: int | None = Field(
+        default=None,
+        ge=1,
+        description="Stop a run cleanly after this many LLM calls; titles and top-level sections go first.",
+    )
+    max_tokens: int | None = Field(
+        default=None,
+        ge=1,
+        description="Stop a run cleanly once this many (estimated) prompt and completion tokens are spent.",
+    )
+    last_usage: EnrichmentUsage | None = Field(default=None, description="LLM usage of the last run.")
+
+    _checkpointer: _Checkpointer | None = PrivateAttr(default=None)
+    _budget: _CallBudget | None = PrivateAttr(default=None)
+    _operation: str | None = PrivateAttr(default=None)
+    _event_sink: Callable[[EnrichmentEvent], None] | None = PrivateAttr(default=None)
+    _cancelled: threading.Event = PrivateAttr(default_factory=threading.Event)
+    _memo: _GenerationMemo = PrivateAttr(default_factory=_GenerationMemo)
+    _memo_depth: int = PrivateAttr(default=0)
+
+    @contextmanager
+    def _memo_scope(self):
+        """Scope the generation memo to one document run.
+
+        The memo starts empty and is cleared when the outermost entry point returns,
+        so results never leak into the run of another document. Nested entry points
+        (operations of one ``run``) share the outer scope.
+        """
+        if self._memo_depth == 0:
+            self._memo.clear()
+        self._memo_depth += 1
+        try:
+            yield
+        finally:
+            self._memo_depth -= 1
+            if self._memo_depth == 0:
+                self._memo.clear()
 
     @contextmanager
     def _timed_stage(self, name: str):
-        """Context manager for timing enrichment stages."""
-        with timed_operation(name):
+        """Context manager for timing enrichment stages, reporting the dedup hit rate of the stage."""
+        start_hits, start_lookups = self._memo.hits, self._memo.lookups
+
+        def dedup_stats() -> dict[str, Any]:
+            lookups = self._memo.lookups - start_lookups
+            if not lookups:
+                return {}
+            hits = self._memo.hits - start_hits
+            return {"dedup_hits": f"{hits}/{lookups}", "dedup_rate": f"{hits / lookups:.0%}"}
+
+        with timed_operation(name, stats=dedup_stats):
             yield
 
     def __init__(
@@ -155,45 +499,329 @@ Return no extra commentary. Include all operations that are materially requested
         sources: list[DoclingDocument | Path] = [],
         **kwargs,
     ) -> DoclingDocument:
+        """Enrich *document* with the operations requested by *task*.
+
+        Keyword Args:
+            operations: Explicit operation names; bypasses LLM routing.
+            checkpoint_callback: Optional ``callback(document, operation)`` invoked every
+                ``checkpoint_every`` enriched nodes or ``checkpoint_interval`` seconds, and
+                after each operation, so a long run can be resumed after a crash.
+            resume_from: Operation that was in progress when the document was checkpointed.
+                Heading-level repair is skipped up to and including that operation, since it
+                already ran; nodes that carry metadata are skipped as usual.
+            max_calls: Call limit of this run, instead of the agent's ``max_calls``.
+            max_tokens: Token limit of this run, instead of the agent's ``max_tokens``.
+
+        With ``max_calls`` or ``max_tokens`` set, nodes are enriched shallowest first and the
+        run stops cleanly once the budget is spent; ``last_usage`` reports what was used and
+        where the run stopped. Use :meth:`plan` to estimate a run beforehand.
+        """
         if document is None:
             raise ValueError("Document must not be None")
 
-        # Explicit operations list bypasses LLM routing entirely
-        operations: list[str] | None = kwargs.get("operations")
-        if operations is not None:
-            log_info("Using explicit operations", operations=operations)
-            return self._run_operations(task=task, document=document, operations=operations)
-
-        with self._timed_stage("routing"):
-            plan = self._choose_operations(task=task)
-        self.last_operation = plan
-        inferred_operations = plan.get("operations", [])
-        log_info("Chosen enrichment operations", operations=inferred_operations)
-        return self._run_operations(
-            task=task,
-            document=document,
-            operations=inferred_operations,
+        checkpoint_callback: Callable[[DoclingDocument, str], None] | None = kwargs.get("checkpoint_callback")
+        resume_from: str | None = kwargs.get("resume_from")
+
+        self._budget = _CallBudget(
+            max_calls=kwargs.get("max_calls", self.max_calls),
+            max_tokens=kwargs.get("max_tokens", self.max_tokens),
         )
+        try:
+            # Explicit operations list bypasses LLM routing entirely
+            operations: list[str] | None = kwargs.get("operations")
+            if operations is not None:
+                log_info("Using explicit operations", operations=operations)
+            else:
+                try:
+                    with self._timed_stage("routing"):
+                        plan = self._choose_operations(task=task)
+                except EnrichmentBudgetExhaustedError:
+                    return document
+                self.last_operation = plan
+                operations = plan.get("operations", [])
+                log_info("Chosen enrichment operations", operations=operations)
+
+            return self._run_operations(
+                task=task,
+                document=document,
+                operations=operations,
+                checkpoint_callback=checkpoint_callback,
+                resume_from=resume_from,
+            )
+        finally:
+            self.last_usage = self._budget.usage
+            self._budget = None
 
+    def run_iter(
+        self,
+        task: str,
+        document: DoclingDocument | None = None,
+        sources: list[DoclingDocument | Path] = [],
+        **kwargs,
+    ) -> Generator[EnrichmentEvent, None, DoclingDocument]:
+        """Like :meth:`run`, but yield an :class:`EnrichmentEvent` as soon as each node is enriched.
+
+        The run executes on a worker thread while events are yielded on the calling thread,
+        so results can be shown or indexed before the whole document is done. The enriched
+        document is the generator's return value (``result = yield from agent.run_iter(...)``).
+        Metadata of ``event.document`` must be treated as read-only while the run is in progress.
+
+        Closing the generator early stops the run once the LLM calls in flight have returned;
+        the nodes enriched so far keep their metadata.
+        """
+        events: queue.Queue[EnrichmentEvent | object] = queue.Queue()
+        done = object()
+        outcome: dict[str, Any] = {}
+
+        def work() -> None:
+            try:
+                outcome["document"] = self.run(task, document=document, sources=sources, **kwargs)
+            except BaseException as exc:
+                outcome["error"] = exc
+            finally:
+                events.put(done)
+
+        self._event_sink = events.put
+        worker = threading.Thread(target=bind_log_context(work), name="enrich-run-iter", daemon=True)
+        worker.start()
+        try:
+            while (event := events.get()) is not done:
+                yield cast(EnrichmentEvent, event)
+        finally:
+            self._cancelled.set()
+            worker.join()
+            self._cancelled.clear()
+            self._event_sink = None
+
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["document"]
+
+    @_memo_scoped
     def _run_operations(
         self,
         *,
         task: str,
         document: DoclingDocument,
         operations: list[str],
+        checkpoint_callback: Callable[[DoclingDocument, str], None] | None = None,
+        resume_from: str | None = None,
     ) -> DoclingDocument:
+        # Operations up to the checkpointed one have already repaired the headings
+        resumed_count = operations.index(resume_from) + 1 if resume_from in operations else 0
+
+        if checkpoint_callback is not None:
+            self._checkpointer = _Checkpointer(
+                checkpoint_callback,
+                every=self.checkpoint_every,
+                interval=self.checkpoint_interval,
+            )
+
         result = document
-        for index, op_name in enumerate(operations, start=1):
+        try:
+            for index, op_name in enumerate(operations, start=1):
+                method_name = _OP_ALIASES.get(op_name)
+                if method_name is None:
+                    raise ValueError(f"Unknown operation: {op_name!r}")
+                if self._stop_requested():
+                    log_warning("Skipping remaining operations, run stopped", operations=operations[index - 1 :])
+                    break
+                method = getattr(self, method_name)
+                method_kwargs: dict[str, Any] = {"document": result}
+                if method_name == "_detect_key_entities":
+                    method_kwargs["task"] = task
+                if index <= resumed_count and method_name in _HEADING_FIX_METHODS:
+                    method_kwargs["fix_heading_levels"] = False
+                self._operation = op_name
+                if self._checkpointer is not None:
+                    self._checkpointer.operation = op_name
+                if self._budget is not None:
+                    self._budget.operation = op_name
+                try:
+                    with self._timed_stage(f"operation {index}/{len(operations)}: {op_name}"):
+                        result = method(**method_kwargs) or result
+                except EnrichmentBudgetExhaustedError:
+                    # The operations check the budget between nodes; this only catches a call cut off mid-way
+                    log_warning("Operation stopped by the enrichment budget", operation=op_name)
+                if self._checkpointer is not None:
+                    self._checkpointer.flush(result)
+        finally:
+            self._checkpointer = None
+            self._operation = None
+        return result
+
+    def _stop_requested(self) -> bool:
+        """Whether the run should stop: its budget is spent or a streaming consumer went away."""
+        return self._cancelled.is_set() or (self._budget is not None and self._budget.usage.exhausted)
+
+    def _unless_stopped(self, fn: Callable[[Any], _R]) -> Callable[[Any], _R | None]:
+        """Wrap *fn* so that it returns None instead of calling the LLM once the run should stop."""
+
+        def wrapped(item: Any) -> _R | None:
+            if self._stop_requested():
+                return None
+            try:
+                return fn(item)
+            except EnrichmentBudgetExhaustedError:
+                return None
+
+        return wrapped
+
+    def _charge_budget(self, session: BaseSession) -> BaseSession:
+        """Wrap *session* so that its calls charge the run's budget, if there is one."""
+        return _BudgetedSession(session, self._budget) if self._budget is not None else session
+
+    def _create_reasoning_session(self, *, system_prompt: str | None = None):
+        return self._charge_budget(super()._create_reasoning_session(system_prompt=system_prompt))
+
+    def _create_extraction_session(self, *, system_prompt: str | None = None):
+        return self._charge_budget(super()._create_extraction_session(system_prompt=system_prompt))
+
+    def plan(
+        self,
+        *,
+        document: DoclingDocument,
+        operations: list[str],
+        task: str | None = None,
+    ) -> EnrichmentPlan:
+        """Estimate the LLM work of running *operations* on *document*, without calling the LLM.
+
+        Nodes are enumerated with the same selection rules and ``min_text_length``
+        thresholds as the operations; identical inputs count once, since a run
+        generates them once. Heading-level repair is included where an operation
+        runs it. Chart data extraction depends on the classification outcome and is
+        not included. Token counts assume about 4 characters per token.
+        """
+        estimates: list[OperationEstimate] = []
+        hier_doc: DoclingDocument | None = None
+        # The hierarchy is built after the heading repair; the heuristic part of it is cheap to replay
+        hier_source = document
+        if self.heading_level_strategy != "llm" and any(
+            _OP_ALIASES.get(op) in _HEADING_FIX_METHODS for op in operations
+        ):
+            hier_source = self._with_heuristic_heading_levels(document)
+        for op_name in operations:
             method_name = _OP_ALIASES.get(op_name)
             if method_name is None:
                 raise ValueError(f"Unknown operation: {op_name!r}")
-            method = getattr(self, method_name)
-            method_kwargs: dict[str, Any] = {"document": result}
-            if method_name == "_detect_key_entities":
-                method_kwargs["task"] = task
-            with self._timed_stage(f"operation {index}/{len(operations)}: {op_name}"):
-                result = method(**method_kwargs) or result
-        return result
+
+            texts: list[str] = []
+            calls, prompt_tokens, completion_tokens = 0, 0, 0
+            if method_name in _HEADING_FIX_METHODS:
+                calls, prompt_tokens = self._plan_heading_fix(document)
+                completion_tokens = calls * self._PLAN_COMPLETION_TOKENS["headings"]
+
+            if method_name in ("_summarize_items", "_find_search_keywords", "_detect_key_entities"):
+                if hier_doc is None:
+                    hier_doc = make_hierarchical_document(hier_source)
+
+            if method_name in ("_summarize_items", "_find_search_keywords"):
+                kind = "summary" if method_name == "_summarize_items" else "keywords"
+                meta_attr = "summary" if kind == "summary" else "docling_agent__keywords"
+                targets = self._enrichment_targets(
+                    node=cast(DoclingDocument, hier_doc).body,
+                    doc=cast(DoclingDocument, hier_doc),
+                    min_text_length=self._default_min_text_length(method_name),
+                    meta_attr=meta_attr,
+                )
+                texts = [text for _, text, _ in targets]
+                texts += [
+                    text
+                    for _, text in self._leaf_targets(document=cast(DoclingDocument, hier_doc), meta_attr=meta_attr)
+                ]
+                nodes = len(texts)
+                if kind == "keywords" and self.keyword_strategy == "tfidf":
+                    texts = []
+                elif kind == "keywords" and self.keyword_strategy == "hybrid":
+                    texts = [text[: self._KEYWORD_RERANK_EXCERPT_CHARS] for text in texts]
+            elif method_name == "_detect_key_entities":
+                kind = "entities"
+                bins = self._entity_bins(cast(DoclingDocument, hier_doc))
+                nodes = sum(len(bin_items) for bin_items in bins)
+                texts = ["\n\n".join(text for _, text in bin_items) for bin_items in bins]
+                if task:
+                    calls += 1
+                    prompt_tokens += _estimate_tokens(task) + self._PLAN_PROMPT_OVERHEAD_TOKENS
+                    completion_tokens += self._PLAN_COMPLETION_TOKENS["routing"]
+            elif method_name == "_classify_items":
+                kind = "classification"
+                contexts, _ = self._pictures_to_classify(document)
+                nodes = len(contexts)
+                refs = list(contexts)
+                texts = [
+                    "\n\n".join(contexts[ref] for ref in refs[start : start + self.picture_batch_size])
+                    for start in range(0, len(refs), self.picture_batch_size)
+                ]
+                completion_tokens += nodes * self._PLAN_COMPLETION_TOKENS["classification"]
+                if self.generate_picture_code:
+                    calls += nodes
+                    prompt_tokens += sum(_estimate_tokens(text) for text in contexts.values())
+                    prompt_tokens += nodes * self._PLAN_PROMPT_OVERHEAD_TOKENS
+                    completion_tokens += nodes * self._PLAN_COMPLETION_TOKENS["code"]
+            else:
+                kind = "code"
+                jobs = self._picture_code_jobs(document)
+                nodes = len(jobs)
+                texts = [text for _, text in jobs.values()]
+
+            distinct = list(dict.fromkeys(" ".join(text.split()) for text in texts))
+            calls += len(distinct)
+            prompt_tokens += sum(_estimate_tokens(text) + self._PLAN_PROMPT_OVERHEAD_TOKENS for text in distinct)
+            if kind != "classification":
+                completion_tokens += len(distinct) * self._PLAN_COMPLETION_TOKENS[kind]
+            estimates.append(
+                OperationEstimate(
+                    operation=op_name,
+                    nodes=nodes,
+                    calls=calls,
+                    prompt_tokens=prompt_tokens,
+                    completion_tokens=completion_tokens,
+                )
+            )
+        return EnrichmentPlan(document=document.name, operations=estimates)
+
+    @staticmethod
+    def _with_heuristic_heading_levels(document: DoclingDocument) -> DoclingDocument:
+        """Copy of *document* with the heading levels the heuristics can decide applied."""
+        from docling_agent.agent.headings import infer_heading_levels
+
+        leveled = document.model_copy(deep=True)
+        # Heuristic changes only move headings between levels (never to text or title), so set them directly
+        for change in infer_heading_levels(leveled).changes:
+            item = RefItem(cref=change.ref).resolve(leveled)
+            if isinstance(item, SectionHeaderItem):
+                item.level = change.to_level
+        return leveled
+
+    def _plan_heading_fix(self, document: DoclingDocument) -> tuple[int, int]:
+        """Expected LLM calls and prompt tokens of one heading-level repair."""
+        from docling_agent.agent.headings import infer_heading_levels
+
+        if self.heading_level_strategy == "heuristic":
+            return 0, 0
+        if self.heading_level_strategy == "hybrid" and not infer_heading_levels(document).undecided:
+            return 0, 0
+        outline = create_document_outline(doc=document, format=OutlineFormat.MARKDOWN)
+        return 1, _estimate_tokens(outline) + 4 * self._PLAN_PROMPT_OVERHEAD_TOKENS
+
+    def _default_min_text_length(self, method_name: str) -> int:
+        """The ``min_text_length`` an operation uses when called by :meth:`run`."""
+        return inspect.signature(getattr(self, method_name)).parameters["min_text_length"].default
+
+    def _node_enriched(self, document: DoclingDocument, node: NodeItem, field: str) -> None:
+        """Hook called whenever *node* of *document* receives new metadata in its *field* meta attribute."""
+        if self._checkpointer is not None:
+            self._checkpointer.tick(document)
+        if self._event_sink is not None:
+            self._event_sink(
+                EnrichmentEvent(
+                    operation=self._operation or "",
+                    self_ref=node.self_ref,
+                    field=field,
+                    meta=getattr(node.meta, field, None),
+                    document=document,
+                )
+            )
 
     def _choose_operations(self, *, task: str, loop_budget: int = 5) -> dict[str, Any]:
         log_debug("Analyzing task for operations", task=task[:100])
@@ -244,6 +872,7 @@ Return no extra commentary. Include all operations that are materially requested
     # Summarization
     # ------------------------------------------------------------------
 
+    @_memo_scoped
     def _summarize_items(
         self,
         *,
@@ -280,15 +909,28 @@ Return no extra commentary. Include all operations that are materially requested
 
     def _fix_heading_levels(self, *, document: DoclingDocument) -> None:
         from docling_agent.agent.editor import DoclingEditingAgent
+        from docling_agent.agent.headings import infer_heading_levels
 
         editor = DoclingEditingAgent(
             backend=self.backend,
             tools=[],
+            session_wrapper=self._charge_budget,
         )
-        editor.run(
-            task=("Ensure the section headings have the correct level."),
-            document=document,
+        if self.heading_level_strategy == "llm":
+            editor.fix_section_heading_levels(document=document)
+            return
+
+        inference = infer_heading_levels(document)
+        log_info(
+            f"heading levels: {len(inference.decided)} decided by heuristics "
+            f"({len(inference.changes)} changed), {len(inference.undecided)} undecided"
         )
+        editor.apply_section_heading_level_changes(document=document, changes=inference.changes)
+        if inference.undecided and self.heading_level_strategy == "hybrid":
+            try:
+                editor.fix_section_heading_levels(document=document, refs=inference.undecided)
+            except ValueError as exc:
+                log_warning(f"LLM heading level fix failed, keeping heuristic levels: {exc}")
 
     def _walk_and_enrich(
         self,
@@ -302,7 +944,74 @@ Return no extra commentary. Include all operations that are materially requested
         generate_fn: _GenerateFn,
         set_meta_fn: _SetMetaFn,
     ) -> None:
-        """Generic method to walk document tree and enrich nodes with metadata."""
+        """Generic method to walk document tree and enrich nodes with metadata.
+
+        Nodes are enriched in document order, or by priority when the run has a budget.
+        """
+        targets = self._enrichment_targets(node=node, doc=doc, min_text_length=min_text_length, meta_attr=meta_attr)
+        for target, text in self._by_priority(targets):
+            if self._stop_requested():
+                break
+            result = generate_fn(m=m, text=text, loop_budget=loop_budget)
+            if result:
+                if target.meta is None:
+                    target.meta = BaseMeta()
+                set_meta_fn(target.meta, result)
+                self._node_enriched(doc, target, meta_attr)
+
+    def _enrichment_targets(
+        self,
+        *,
+        node: NodeItem,
+        doc: DoclingDocument,
+        min_text_length: int,
+        meta_attr: str,
+        depth: int = 0,
+    ) -> list[tuple[NodeItem, str, int]]:
+        """Nodes below (and including) *node* that need *meta_attr*, in pre-order, with their text and depth."""
+        targets: list[tuple[NodeItem, str, int]] = []
+        text = self._enrichable_text(node=node, doc=doc, min_text_length=min_text_length, meta_attr=meta_attr)
+        if text is not None:
+            targets.append((node, text, depth))
+
+        for child_ref in node.children or []:
+            try:
+                child = child_ref.resolve(doc)
+                targets.extend(
+                    self._enrichment_targets(
+                        node=child,
+                        doc=doc,
+                        min_text_length=min_text_length,
+                        meta_attr=meta_attr,
+                        depth=depth + 1,
+                    )
+                )
+            except Exception as exc:
+                log_warning("Could not resolve child", child_ref=child_ref, exception=exc)
+        return targets
+
+    def _by_priority(self, targets: list[tuple[NodeItem, str, int]]) -> list[tuple[NodeItem, str]]:
+        """Order targets for enrichment: document order, or shallowest first (titles, then sections) under a budget."""
+        order = range(len(targets))
+        if self._budget is not None and self._budget.limited:
+
+            def rank(index: int) -> tuple[int, int, int]:
+                node, _, depth = targets[index]
+                kind = 0 if isinstance(node, TitleItem) else 1 if isinstance(node, SectionHeaderItem) else 2
+                return depth, kind, index
+
+            order = sorted(order, key=rank)
+        return [(targets[index][0], targets[index][1]) for index in order]
+
+    def _enrichable_text(
+        self,
+        *,
+        node: NodeItem,
+        doc: DoclingDocument,
+        min_text_length: int,
+        meta_attr: str,
+    ) -> str | None:
+        """Subtree text of a title, section, text or group *node*, or None if it should not be enriched."""
         should_enrich = False
         threshold = min_text_length
 
@@ -315,31 +1024,10 @@ Return no extra commentary. Include all operations that are materially requested
             should_enrich = node.self_ref != "#/body"
             threshold = min(min_text_length, 40)
 
-        if should_enrich:
-            if not (node.meta and hasattr(node.meta, meta_attr) and getattr(node.meta, meta_attr)):
-                text = collect_subtree_text(node, doc)
-                if len(text) >= threshold:
-                    result = generate_fn(m=m, text=text, loop_budget=loop_budget)
-                    if result:
-                        if node.meta is None:
-                            node.meta = BaseMeta()
-                        set_meta_fn(node.meta, result)
-
-        for child_ref in node.children or []:
-            try:
-                child = child_ref.resolve(doc)
-                self._walk_and_enrich(
-                    node=child,
-                    doc=doc,
-                    m=m,
-                    loop_budget=loop_budget,
-                    min_text_length=min_text_length,
-                    meta_attr=meta_attr,
-                    generate_fn=generate_fn,
-                    set_meta_fn=set_meta_fn,
-                )
-            except Exception as exc:
-                log_warning("Could not resolve child", child_ref=child_ref, exception=exc)
+        if not should_enrich or (node.meta and hasattr(node.meta, meta_attr) and getattr(node.meta, meta_attr)):
+            return None
+        text = collect_subtree_text(node, doc)
+        return text if len(text) >= threshold else None
 
     def _enrich_leaf_items(
         self,
@@ -352,28 +1040,32 @@ Return no extra commentary. Include all operations that are materially requested
         set_meta_fn: _SetMetaFn,
     ) -> None:
         """Generic method to enrich leaf items (tables, pictures) with metadata."""
+        for item, text in self._leaf_targets(document=document, meta_attr=meta_attr):
+            if self._stop_requested():
+                break
+            result = generate_fn(m=m, text=text, loop_budget=loop_budget)
+            if result:
+                if item.meta is None:
+                    item.meta = PictureMeta() if isinstance(item, PictureItem) else FloatingMeta()
+                set_meta_fn(item.meta, result)
+                self._node_enriched(document, item, meta_attr)
+
+    @staticmethod
+    def _leaf_targets(*, document: DoclingDocument, meta_attr: str) -> list[tuple[DocItem, str]]:
+        """Tables (as HTML) and captioned pictures that do not have *meta_attr* yet."""
+        targets: list[tuple[DocItem, str]] = []
         for item, _ in document.iterate_items():
             if item.meta and hasattr(item.meta, meta_attr) and getattr(item.meta, meta_attr):
                 continue
             if isinstance(item, TableItem):
                 html = serialize_table_to_html(table=item, doc=document)
-                result = generate_fn(
-                    m=m,
-                    text=f"HTML table:\n{html}",
-                    loop_budget=loop_budget,
-                )
-                if result:
-                    if item.meta is None:
-                        item.meta = FloatingMeta()
-                    set_meta_fn(item.meta, result)
+                targets.append((item, f"HTML table:\n{html}"))
             elif isinstance(item, PictureItem):
                 captions = [c.resolve(document).text for c in item.captions if hasattr(c.resolve(document), "text")]
                 text = " ".join(captions)
-                result = generate_fn(m=m, text=text, loop_budget=loop_budget) if text else None
-                if result:
-                    if item.meta is None:
-                        item.meta = PictureMeta()
-                    set_meta_fn(item.meta, result)
+                if text:
+                    targets.append((item, text))
+        return targets
 
     def _walk_and_summarize(
         self,
@@ -421,6 +1113,7 @@ Return no extra commentary. Include all operations that are materially requested
             set_meta_fn=set_summary,
         )
 
+    @_memo_scoped
     def _summarize_pages(
         self,
         *,
@@ -435,6 +1128,8 @@ Return no extra commentary. Include all operations that are materially requested
         Creates one summary per page by serializing page content and generating
         a summary with no conversation history between pages. This is particularly
         useful for RAG applications where page-level summaries serve as retrieval units.
+        Pages are indexed and serialized in a single pass over the document, and
+        summarized concurrently (up to the backend's ``max_concurrency``).
 
         After page-level summarization, generates a document-level summary from the
         first N pages' actual content, which provides better context than concatenating
@@ -444,7 +1139,8 @@ Return no extra commentary. Include all operations that are materially requested
             document: Document to enrich with page summaries
             style: Summary style - "sentences" for readable text, "keyphrases" for RAG (default)
             loop_budget: Retry budget for each summary generation
-            save_callback: Optional callback(document, page_no) called after each page for fault tolerance
+            save_callback: Optional callback(document, page_no) called after each page for fault tolerance,
+                on the calling thread and in completion order
             document_summary_pages: Number of initial pages to use for document summary (default: 3)
 
         Returns:
@@ -469,36 +1165,42 @@ Return no extra commentary. Include all operations that are materially requested
         serializer = MarkdownDocSerializer(doc=document, table_serializer=MarkdownTableSerializer(), params=md_params)
 
         with self._timed_stage(f"summarize pages ({style} style)"):
+            first_items, page_sequence = self._index_pages(document)
+
+            pending_pages: list[int] = []
             for page_no in document.pages.keys():
-                # Get first item on page
-                try:
-                    first_item, _ = next(iter(document.iterate_items(traverse_pictures=True, page_no=page_no)))
-                except StopIteration:
+                first_item = first_items.get(page_no)
+                if first_item is None:
                     log_warning(f"Page {page_no} has no items, skipping")
                     continue
 
-                if not isinstance(first_item, NodeItem):
-                    log_warning(f"Page {page_no} has no NodeItem, skipping")
-                    continue
-
                 # Skip if already has summary
                 if first_item.meta and first_item.meta.summary:
                     log_info(f"Page {page_no} already has summary, skipping")
                     continue
+                pending_pages.append(page_no)
 
-                page_text = serializer.serialize(pages={page_no}).text
+            page_texts = self._serialize_pages(
+                document=document,
+                serializer=serializer,
+                pages=pending_pages,
+                page_sequence=page_sequence,
+            )
 
+            def summarize_page(page_no: int) -> str | None:
                 # Create fresh session for this page (no conversation history)
                 m = self._create_extraction_session()
-
-                summary = self._generate_summary(
+                return self._generate_summary(
                     m=m,
-                    text=page_text,
+                    text=page_texts[page_no],
                     loop_budget=loop_budget,
                     style=style,
                 )
 
+            # Pages are summarized concurrently; results are applied here, in completion order
+            for page_no, summary in self.backend.map_concurrently(self._unless_stopped(summarize_page), pending_pages):
                 if summary:
+                    first_item = first_items[page_no]
                     if not first_item.meta:
                         first_item.meta = BaseMeta()
                     first_item.meta.summary = SummaryMetaField(text=summary)
@@ -527,6 +1229,58 @@ Return no extra commentary. Include all operations that are materially requested
 
         return document
 
+    def _index_pages(self, document: DoclingDocument) -> tuple[dict[int, DocItem], list[int]]:
+        """Map each page to its first item and list the pages in reading order, in one traversal.
+
+        The page sequence is empty when the reading order jumps back to an earlier
+        page, since the pages can then not be cut out of a single serialization.
+        """
+        first_items: dict[int, DocItem] = {}
+        page_sequence: list[int] = []
+        in_order = True
+        for item, _ in document.iterate_items(traverse_pictures=True):
+            if not isinstance(item, DocItem) or not item.prov:
+                continue
+            for prov in item.prov:
+                first_items.setdefault(prov.page_no, item)
+            page_no = item.prov[0].page_no
+            if not page_sequence or page_no > page_sequence[-1]:
+                page_sequence.append(page_no)
+            elif page_no < page_sequence[-1]:
+                in_order = False
+        return first_items, page_sequence if in_order else []
+
+    def _serialize_pages(
+        self,
+        *,
+        document: DoclingDocument,
+        serializer: MarkdownDocSerializer,
+        pages: list[int],
+        page_sequence: list[int],
+    ) -> dict[int, str]:
+        """Serialize *pages* to markdown, using a single pass over the document when possible."""
+        if not pages:
+            return {}
+
+        if page_sequence:
+            params = serializer.params.model_copy(update={"page_break_placeholder": self._PAGE_BREAK_PLACEHOLDER})
+            single_pass = MarkdownDocSerializer(
+                doc=document,
+                table_serializer=MarkdownTableSerializer(),
+                params=params,
+            )
+            segments = single_pass.serialize().text.split(self._PAGE_BREAK_PLACEHOLDER)
+            if len(segments) == len(page_sequence):
+                page_texts = dict(zip(page_sequence, segments))
+                return {page_no: page_texts.get(page_no, "").strip() for page_no in pages}
+            log_debug(
+                "Page breaks do not match page provenance, serializing pages one by one",
+                segments=len(segments),
+                pages=len(page_sequence),
+            )
+
+        return {page_no: serializer.serialize(pages={page_no}).text for page_no in pages}
+
     def _generate_document_level_summary(
         self,
         *,
@@ -611,6 +1365,8 @@ Return no extra commentary. Include all operations that are materially requested
                 retry_budget=loop_budget,
             )
             return answer.strip() or None
+        except EnrichmentBudgetExhaustedError:
+            return None
         except Exception as exc:
             log_warning("Content generation failed", exception=exc)
             return None
@@ -664,16 +1420,21 @@ Return no extra commentary. Include all operations that are materially requested
                     "Return only the phrases, no explanations or markdown."
                 )
 
-            return self._generate_content(
-                m=m,
+            return self._memo.get_or_generate(
+                operation="summary",
                 text=text,
-                task_prompt=task_prompt,
-                requirement_description=(
-                    "Provide 3-5 key phrases separated by semicolons. "
-                    "Example: 'revenue growth 15%; market expansion Asia; new product launch; Q4 earnings $2.1B'"
+                variant=task_prompt,
+                generate=lambda: self._generate_content(
+                    m=m,
+                    text=text,
+                    task_prompt=task_prompt,
+                    requirement_description=(
+                        "Provide 3-5 key phrases separated by semicolons. "
+                        "Example: 'revenue growth 15%; market expansion Asia; new product launch; Q4 earnings $2.1B'"
+                    ),
+                    validation_fn=_validate_keyphrases,
+                    loop_budget=loop_budget,
                 ),
-                validation_fn=_validate_keyphrases,
-                loop_budget=loop_budget,
             )
         else:  # sentences (default)
 
@@ -694,13 +1455,18 @@ Return no extra commentary. Include all operations that are materially requested
                     "Return only plain text with no markdown formatting."
                 )
 
-            return self._generate_content(
-                m=m,
+            return self._memo.get_or_generate(
+                operation="summary",
                 text=text,
-                task_prompt=task_prompt,
-                requirement_description="Write 2-3 succinct sentences summarizing the content. Return plain text only.",
-                validation_fn=_validate_summary,
-                loop_budget=loop_budget,
+                variant=task_prompt,
+                generate=lambda: self._generate_content(
+                    m=m,
+                    text=text,
+                    task_prompt=task_prompt,
+                    requirement_description="Write 2-3 succinct sentences summarizing the content. Return plain text only.",
+                    validation_fn=_validate_summary,
+                    loop_budget=loop_budget,
+                ),
             )
 
     def _generate_keywords(
@@ -720,17 +1486,23 @@ Return no extra commentary. Include all operations that are materially requested
             except Exception:
                 return False
 
-        result = self._generate_content(
-            m=m,
+        task_prompt = (
+            "Extract 3 to 7 compelling and specific search keywords from the following content. "
+            "Focus on key concepts, technical terms, and important topics that would help someone find this content. "
+            "Return them as a JSON array of strings in a ```json ...``` block."
+        )
+        result = self._memo.get_or_generate(
+            operation="keywords",
             text=text,
-            task_prompt=(
-                "Extract 3 to 7 compelling and specific search keywords from the following content. "
-                "Focus on key concepts, technical terms, and important topics that would help someone find this content. "
-                "Return them as a JSON array of strings in a ```json ...``` block."
+            variant=task_prompt,
+            generate=lambda: self._generate_content(
+                m=m,
+                text=text,
+                task_prompt=task_prompt,
+                requirement_description="Return 3-7 keywords as a JSON array in a ```json ...``` block.",
+                validation_fn=_validate_keywords,
+                loop_budget=loop_budget,
             ),
-            requirement_description="Return 3-7 keywords as a JSON array in a ```json ...``` block.",
-            validation_fn=_validate_keywords,
-            loop_budget=loop_budget,
         )
 
         if result:
@@ -746,6 +1518,7 @@ Return no extra commentary. Include all operations that are materially requested
     # Keywords
     # ------------------------------------------------------------------
 
+    @_memo_scoped
     def _find_search_keywords(
         self,
         *,
@@ -763,6 +1536,16 @@ Return no extra commentary. Include all operations that are materially requested
         with self._timed_stage("keywords: build hierarchy"):
             hier_doc = make_hierarchical_document(document)
 
+        if self.keyword_strategy != "llm":
+            with self._timed_stage(f"keywords: {self.keyword_strategy} keywords"):
+                self._extract_keywords_locally(
+                    document=hier_doc,
+                    min_text_length=min_text_length,
+                    loop_budget=loop_budget,
+                    rerank=self.keyword_strategy == "hybrid",
+                )
+            return hier_doc
+
         m = self._create_reasoning_session()
 
         with self._timed_stage("keywords: section keywords"):
@@ -828,10 +1611,121 @@ Return no extra commentary. Include all operations that are materially requested
             set_meta_fn=set_keywords,
         )
 
+    def _extract_keywords_locally(
+        self,
+        *,
+        document: DoclingDocument,
+        min_text_length: int,
+        loop_budget: int,
+        rerank: bool,
+    ) -> None:
+        """Add keywords to sections and leaf items with a corpus-level TF-IDF over the document's node texts.
+
+        With *rerank*, the LLM picks the final keywords from the local candidates of each node.
+        """
+        meta_attr = "docling_agent__keywords"
+        targets: list[tuple[NodeItem, str]] = []
+        for node, _ in document.iterate_items(with_groups=True, traverse_pictures=True):
+            if isinstance(node, TableItem | PictureItem):
+                if node.meta and getattr(node.meta, meta_attr, None):
+                    continue
+                if isinstance(node, TableItem):
+                    text = strip_html(serialize_table_to_html(table=node, doc=document))
+                else:
+                    text = " ".join(
+                        c.resolve(document).text for c in node.captions if hasattr(c.resolve(document), "text")
+                    )
+                if text.strip():
+                    targets.append((node, text))
+                continue
+            text = self._enrichable_text(node=node, doc=document, min_text_length=min_text_length, meta_attr=meta_attr)
+            if text is not None:
+                targets.append((node, text))
+
+        top_k = self._KEYWORD_RERANK_CANDIDATES if rerank else 5
+        candidates = TfidfKeywordExtractor().extract([text for _, text in targets], top_k=top_k)
+        keywords: dict[int, list[str]] = dict(enumerate(candidates))
+
+        if rerank:
+
+            def rerank_node(index: int) -> list[str] | None:
+                return self._rerank_keywords(
+                    m=self._create_reasoning_session(),
+                    text=targets[index][1],
+                    candidates=candidates[index],
+                    loop_budget=loop_budget,
+                )
+
+            for index, reranked in self.backend.map_concurrently(
+                self._unless_stopped(rerank_node), [index for index, found in keywords.items() if len(found) > 3]
+            ):
+                keywords[index] = reranked or candidates[index][:5]
+
+        for index, (node, _) in enumerate(targets):
+            if not keywords[index]:
+                continue
+            if node.meta is None:
+                if isinstance(node, PictureItem):
+                    node.meta = PictureMeta()
+                elif isinstance(node, TableItem):
+                    node.meta = FloatingMeta()
+                else:
+                    node.meta = BaseMeta()
+            setattr(node.meta, meta_attr, keywords[index])
+            self._node_enriched(document, node, meta_attr)
+
+    def _rerank_keywords(
+        self,
+        *,
+        m: BaseSession,
+        text: str,
+        candidates: list[str],
+        loop_budget: int = 5,
+    ) -> list[str] | None:
+        """Let the LLM choose 3 to 7 of the locally extracted *candidates* for *text*."""
+        allowed = {candidate.lower(): candidate for candidate in candidates}
+
+        def _parse(content: str) -> list[str] | None:
+            match = re.search(r"```json\s*(.*?)\s*```", content, re.DOTALL)
+            if not match:
+                return None
+            try:
+                val = json.loads(match.group(1))
+            except Exception:
+                return None
+            if not isinstance(val, list) or not 3 <= len(val) <= 7:
+                return None
+            if not all(isinstance(keyword, str) and keyword.lower() in allowed for keyword in val):
+                return None
+            return [allowed[keyword.lower()] for keyword in dict.fromkeys(val)]
+
+        task_prompt = (
+            "Select the 3 to 7 candidate keywords that best help someone find the content below, best first. "
+            "Only choose from the candidates, copied exactly. "
+            "Return them as a JSON array of strings in a ```json ...``` block.\n\n"
+            f"Candidates: {json.dumps(candidates)}\n\nContent:"
+        )
+        excerpt = text[: self._KEYWORD_RERANK_EXCERPT_CHARS]
+        result = self._memo.get_or_generate(
+            operation="keywords_rerank",
+            text=excerpt,
+            variant=task_prompt,
+            generate=lambda: self._generate_content(
+                m=m,
+                text=excerpt,
+                task_prompt=task_prompt,
+                requirement_description="Return 3-7 of the candidate keywords as a JSON array in a ```json ...``` block.",
+                validation_fn=lambda content: _parse(content) is not None,
+                loop_budget=loop_budget,
+            ),
+        )
+        return _parse(result) if result else None
+
     # ------------------------------------------------------------------
     # Entity Detection
     # ------------------------------------------------------------------
 
+    @_memo_scoped
     def _detect_key_entities(
         self,
         *,
@@ -987,6 +1881,35 @@ Return no extra commentary. Include all operations that are materially requested
                 entity_targets=entity_targets,
             )
 
+        for bin_items in self._entity_bins(document):
+            if self._stop_requested():
+                break
+            packed: dict[str, EntitiesMetaField] | None = None
+            if len(bin_items) > 1:
+                packed = self._generate_packed_entities(
+                    m=m,
+                    task=task,
+                    items=bin_items,
+                    entity_targets=entity_targets,
+                    loop_budget=loop_budget,
+                )
+                if packed is None:
+                    log_debug("Packed entity extraction failed, falling back to single items", items=len(bin_items))
+
+            for item, text in bin_items:
+                if packed is not None:
+                    result = packed.get(item.self_ref)
+                else:
+                    result = generate_entities(m=m, text=text, loop_budget=loop_budget)
+                if result:
+                    if item.meta is None:
+                        item.meta = BaseMeta()
+                    set_entities(item.meta, result)
+                    self._node_enriched(document, item, "entities")
+
+    def _entity_bins(self, document: DoclingDocument) -> list[list[tuple[DocItem, str]]]:
+        """Leaf items without entities, with their text, grouped into one bin per prompt."""
+        candidates: list[tuple[DocItem, str]] = []
         for item, _ in document.iterate_items():
             if item.meta and getattr(item.meta, "entities", None):
                 continue
@@ -1005,12 +1928,94 @@ Return no extra commentary. Include all operations that are materially requested
 
             if not text.strip():
                 continue
+            candidates.append((item, text))
 
-            result = generate_entities(m=m, text=text, loop_budget=loop_budget)
-            if result:
-                if item.meta is None:
-                    item.meta = BaseMeta()
-                set_entities(item.meta, result)
+        if self.entity_packing_budget:
+            return self._pack_entity_items(candidates, token_budget=self.entity_packing_budget)
+        return [[candidate] for candidate in candidates]
+
+    @staticmethod
+    def _pack_entity_items(
+        items: list[tuple[DocItem, str]],
+        *,
+        token_budget: int,
+    ) -> list[list[tuple[DocItem, str]]]:
+        """Bin consecutive items so that each bin stays within *token_budget* (estimated by ``_estimate_tokens``).
+
+        An item that exceeds the budget on its own gets a bin of its own.
+        """
+        bins: list[list[tuple[DocItem, str]]] = []
+        current: list[tuple[DocItem, str]] = []
+        current_tokens = 0
+        for item, text in items:
+            tokens = _estimate_tokens(text) + _PACKED_ITEM_OVERHEAD_TOKENS
+            if current and current_tokens + tokens > token_budget:
+                bins.append(current)
+                current, current_tokens = [], 0
+            current.append((item, text))
+            current_tokens += tokens
+        if current:
+            bins.append(current)
+        return bins
+
+    def _generate_packed_entities(
+        self,
+        *,
+        m: BaseSession,
+        task: str | None,
+        items: list[tuple[DocItem, str]],
+        entity_targets: dict[str, Any] | None = None,
+        loop_budget: int = 5,
+    ) -> dict[str, EntitiesMetaField] | None:
+        """Extract entities for several items in one prompt, keyed by each item's ``self_ref``.
+
+        Returns None when the response does not cover exactly the requested items.
+        """
+        item_ids = [item.self_ref for item, _ in items]
+
+        def _validate_packed_entities(content: str) -> bool:
+            payload = self._extract_single_json_dict(content)
+            return (
+                payload is not None
+                and set(payload) == set(item_ids)
+                and all(self._is_entity_payload(value) for value in payload.values())
+            )
+
+        packed_text = "\n\n".join(f"[{item_id}]\n{text}" for item_id, (_, text) in zip(item_ids, items))
+        task_prompt = (
+            "Extract named entities from each of the items below. Every item starts with its id in square brackets. "
+            "For each entity, identify the exact mention text and its label/category. "
+            "Return one JSON object in a ```json ...``` block that maps every item id to a JSON array of objects "
+            "with keys 'text', 'label', and optional 'original'. "
+            "Use an empty JSON array for items without relevant entities. "
+            "Only include significant entities, avoid generic terms. "
+            "Do not repeat the same entity within an item even if it appears multiple times."
+            f"{self._entity_target_clause(task=task, entity_targets=entity_targets)}"
+        )
+        result = self._memo.get_or_generate(
+            operation="entities_packed",
+            text=packed_text,
+            variant=task_prompt,
+            generate=lambda: self._generate_content(
+                m=m,
+                text=packed_text,
+                task_prompt=task_prompt,
+                requirement_description=(
+                    "Return one JSON object in a ```json ...``` block whose keys are exactly the item ids "
+                    f"({', '.join(item_ids)}) and whose values are JSON arrays of entity objects."
+                ),
+                validation_fn=_validate_packed_entities,
+                loop_budget=loop_budget,
+            ),
+        )
+        if not result or not _validate_packed_entities(result):
+            return None
+
+        payload = cast(dict[str, Any], self._extract_single_json_dict(result))
+        return {
+            item.self_ref: self._mentions_from_payload(payload=payload[item.self_ref], source_text=text)
+            for item, text in items
+        }
 
     def _generate_entities(
         self,
@@ -1026,47 +2031,36 @@ Return no extra commentary. Include all operations that are materially requested
             if not match:
                 return False
             try:
-                val = json.loads(match.group(1))
-                if not isinstance(val, list):
-                    return False
-                return all(isinstance(item, dict) and "text" in item for item in val)
+                return self._is_entity_payload(json.loads(match.group(1)))
             except Exception:
                 return False
 
-        target_clause = ""
-        rewritten_task = task or ""
-        if entity_targets:
-            labels = entity_targets.get("labels", [])
-            focus_terms = entity_targets.get("focus_terms", [])
-            rewritten_task = entity_targets.get("rewritten_task", rewritten_task)
-            generic = entity_targets.get("generic", False)
-            if not generic or labels or focus_terms or rewritten_task:
-                target_clause = (
-                    "\nUse this rewritten extraction brief:\n"
-                    f"{rewritten_task}\n"
-                    "Focus on entities that match the brief, including obvious instances even if the wording differs.\n"
-                    f"- labels: {labels}\n"
-                    f"- focus_terms: {focus_terms}\n"
-                    "If an entity is not relevant to that brief, omit it."
-                )
+        target_clause = self._entity_target_clause(task=task, entity_targets=entity_targets)
 
         log_debug("Generating entities", task=task[:50] if task else "", text_length=len(text))
 
-        result = self._generate_content(
-            m=m,
+        task_prompt = (
+            "Extract named entities from the following content. "
+            "For each entity, identify the exact mention text and its label/category. "
+            "Return them as a JSON array of objects with keys 'text', 'label', and optional 'original' in a ```json ...``` block. "
+            "If there are no relevant entities, return an empty JSON array. "
+            "Only include significant entities, avoid generic terms. "
+            "Do not repeat the same entity even if it appears multiple times."
+            f"{target_clause}"
+        )
+        # The raw answer is memoized; charspans below are always computed against this node's own text
+        result = self._memo.get_or_generate(
+            operation="entities",
             text=text,
-            task_prompt=(
-                "Extract named entities from the following content. "
-                "For each entity, identify the exact mention text and its label/category. "
-                "Return them as a JSON array of objects with keys 'text', 'label', and optional 'original' in a ```json ...``` block. "
-                "If there are no relevant entities, return an empty JSON array. "
-                "Only include significant entities, avoid generic terms. "
-                "Do not repeat the same entity even if it appears multiple times."
-                f"{target_clause}"
+            variant=task_prompt,
+            generate=lambda: self._generate_content(
+                m=m,
+                text=text,
+                task_prompt=task_prompt,
+                requirement_description="Return entities as a JSON array of objects with keys 'text', 'label', and optional 'original' in a ```json ...``` block. Return an empty JSON array if none are found.",
+                validation_fn=_validate_entities,
+                loop_budget=loop_budget,
             ),
-            requirement_description="Return entities as a JSON array of objects with keys 'text', 'label', and optional 'original' in a ```json ...``` block. Return an empty JSON array if none are found.",
-            validation_fn=_validate_entities,
-            loop_budget=loop_budget,
         )
 
         log_debug("Entity generation result received", result_length=len(result) if result else 0)
@@ -1075,45 +2069,58 @@ Return no extra commentary. Include all operations that are materially requested
             match = re.search(r"```json\s*(.*?)\s*```", result, re.DOTALL)
             if match:
                 try:
-                    payload = json.loads(match.group(1))
-                    mentions: list[EntityMention] = []
-                    search_start = 0
-                    for item in payload:
-                        if not isinstance(item, dict) or not str(item.get("text", "")).strip():
-                            continue
-                        mention = self._make_entity_mention(
-                            item=item,
-                            source_text=text,
-                            search_start=search_start,
-                            created_by=self._metadata_origin(self.get_extraction_model_id()),
-                        )
-                        if mention.charspan is not None:
-                            search_start = mention.charspan[1]
-                        mentions.append(mention)
-                    log_debug("Parsed entities", count=len(mentions))
-                    if mentions:
-                        return EntitiesMetaField(mentions=mentions)
-                    return EntitiesMetaField.model_construct(mentions=[])
+                    return self._mentions_from_payload(payload=json.loads(match.group(1)), source_text=text)
                 except Exception as exc:
                     log_warning("Failed to parse entities JSON", exception=exc)
         return None
 
     @staticmethod
-    def _find_entity_span(*, source_text: str, needle: str, search_start: int = 0) -> tuple[int, int] | None:
-        if not needle.strip():
-            return None
+    def _is_entity_payload(value: Any) -> bool:
+        return isinstance(value, list) and all(isinstance(item, dict) and "text" in item for item in value)
 
-        start = source_text.find(needle, search_start)
-        if start >= 0:
-            return start, start + len(needle)
+    @staticmethod
+    def _entity_target_clause(*, task: str | None, entity_targets: dict[str, Any] | None) -> str:
+        """Prompt clause that narrows entity extraction to the inferred targets, if any."""
+        if not entity_targets:
+            return ""
+        labels = entity_targets.get("labels", [])
+        focus_terms = entity_targets.get("focus_terms", [])
+        rewritten_task = entity_targets.get("rewritten_task", task or "")
+        generic = entity_targets.get("generic", False)
+        if generic and not labels and not focus_terms and not rewritten_task:
+            return ""
+        return (
+            "\nUse this rewritten extraction brief:\n"
+            f"{rewritten_task}\n"
+            "Focus on entities that match the brief, including obvious instances even if the wording differs.\n"
+            f"- labels: {labels}\n"
+            f"- focus_terms: {focus_terms}\n"
+            "If an entity is not relevant to that brief, omit it."
+        )
 
-        lowered_source = source_text.lower()
-        lowered_needle = needle.lower()
-        start = lowered_source.find(lowered_needle, search_start)
-        if start >= 0:
-            return start, start + len(needle)
+    def _mentions_from_payload(self, *, payload: list[Any], source_text: str) -> EntitiesMetaField:
+        """Turn a parsed entity list into mentions whose charspans point into *source_text*."""
+        items = [item for item in payload if isinstance(item, dict) and str(item.get("text", "")).strip()]
+        # All mentions are located in one pass; each search continues after the previous match
+        spans = resolve_spans(source_text, [self._entity_needle(item) for item in items])
+        created_by = self._metadata_origin(self.get_extraction_model_id())
+        mentions = [
+            self._build_entity_mention(item=item, span=span, created_by=created_by) for item, span in zip(items, spans)
+        ]
+        log_debug("Parsed entities", count=len(mentions))
+        if mentions:
+            return EntitiesMetaField(mentions=mentions)
+        return EntitiesMetaField.model_construct(mentions=[])
 
-        return None
+    @staticmethod
+    def _find_entity_span(*, source_text: str, needle: str, search_start: int = 0) -> tuple[int, int] | None:
+        return resolve_spans(source_text, [needle], search_start=search_start)[0]
+
+    @staticmethod
+    def _entity_needle(item: dict[str, Any]) -> str:
+        """The text to locate for an entity: its original surface form if given, else its text."""
+        original = str(item["original"]).strip() if item.get("original") else None
+        return original or str(item["text"]).strip()
 
     def _make_entity_mention(
         self,
@@ -1122,12 +2129,22 @@ Return no extra commentary. Include all operations that are materially requested
         source_text: str,
         search_start: int = 0,
         created_by: str | None = None,
+    ) -> EntityMention:
+        span = self._find_entity_span(
+            source_text=source_text, needle=self._entity_needle(item), search_start=search_start
+        )
+        return self._build_entity_mention(item=item, span=span, created_by=created_by)
+
+    @staticmethod
+    def _build_entity_mention(
+        *,
+        item: dict[str, Any],
+        span: tuple[int, int] | None,
+        created_by: str | None = None,
     ) -> EntityMention:
         text = str(item["text"]).strip()
         original = str(item["original"]).strip() if item.get("original") else None
         label = str(item["label"]).strip() if item.get("label") else None
-        needle = original or text
-        span = self._find_entity_span(source_text=source_text, needle=needle, search_start=search_start)
         mention = EntityMention(text=text, orig=original, label=label, charspan=span, created_by=created_by)
         log_debug("Created entity mention", text=text, label=label)
         return mention
@@ -1144,39 +2161,120 @@ Return no extra commentary. Include all operations that are materially requested
     ) -> DoclingDocument:
         log_stage_start("Classifying items")
 
+        contexts, pictures = self._pictures_to_classify(document)
+        if not contexts:
+            return document
+
+        with self._timed_stage("classify: picture classes"):
+            classifications = classify_picture_contexts(
+                backend=self.backend,
+                contexts=contexts,
+                create_session=self._create_reasoning_session,
+                classify_single=self._unless_stopped(
+                    lambda ref: self._classify_picture_context(text=contexts[ref], loop_budget=loop_budget)
+                ),
+                class_names=self._PICTURE_CLASS_NAMES,
+                created_by=self._metadata_origin(),
+                batch_size=self.picture_batch_size,
+                loop_budget=loop_budget,
+                stop_requested=self._stop_requested,
+            )
+
+        # Chart extraction only runs for chart classes, concurrently
+        chart_jobs: dict[str, str] = {}
+        for ref, classification in classifications.items():
+            meta = self._ensure_picture_meta(pictures[ref])
+            if classification is not None:
+                meta.classification = classification
+            chart_type = self._primary_chart_type(classification)
+            if chart_type is not None:
+                chart_jobs[ref] = chart_type
+
+        with self._timed_stage("classify: chart data"):
+            for ref, chart_meta in self.backend.map_concurrently(
+                self._unless_stopped(
+                    lambda ref: self._extract_tabular_chart(
+                        text=contexts[ref],
+                        chart_type=chart_jobs[ref],
+                        loop_budget=loop_budget,
+                    )
+                ),
+                chart_jobs,
+            ):
+                if chart_meta is not None:
+                    self._ensure_picture_meta(pictures[ref]).tabular_chart = chart_meta
+
+        for ref, classification in classifications.items():
+            picture = pictures[ref]
+            if classification is not None:
+                self._node_enriched(document, picture, "classification")
+            if picture.meta is not None and picture.meta.tabular_chart is not None and ref in chart_jobs:
+                self._node_enriched(document, picture, "tabular_chart")
+
+        if self.generate_picture_code:
+            self._generate_picture_codes(document=document, loop_budget=loop_budget)
+
+        return document
+
+    def _pictures_to_classify(self, document: DoclingDocument) -> tuple[dict[str, str], dict[str, PictureItem]]:
+        """Textual context and item of every unclassified picture that has some context, keyed by ``self_ref``."""
+        contexts: dict[str, str] = {}
+        pictures: dict[str, PictureItem] = {}
         for item, _ in document.iterate_items():
             if not isinstance(item, PictureItem):
                 continue
+            if isinstance(item.meta, PictureMeta) and item.meta.classification:
+                continue
 
             text = self._picture_context(item=item, document=document)
             if not text:
                 log_debug("Skipping picture classification without textual context")
                 continue
+            contexts[item.self_ref] = text
+            pictures[item.self_ref] = item
+        return contexts, pictures
 
-            meta = self._ensure_picture_meta(item)
-
-            classification = self._classify_picture_context(text=text, loop_budget=loop_budget)
-            if classification is not None:
-                meta.classification = classification
+    def _generate_picture_codes(
+        self,
+        *,
+        document: DoclingDocument,
+        loop_budget: int = 5,
+    ) -> DoclingDocument:
+        """Generate Python code for every classified picture that has none yet."""
+        log_stage_start("Generating picture code")
 
-            chart_type = self._primary_chart_type(classification)
-            chart_meta: TabularChartMetaField | None = None
-            if chart_type is not None:
-                chart_meta = self._extract_tabular_chart(text=text, chart_type=chart_type, loop_budget=loop_budget)
-                if chart_meta is not None:
-                    meta.tabular_chart = chart_meta
+        jobs = self._picture_code_jobs(document)
 
-            code_meta = self._generate_picture_code(
+        def generate(ref: str) -> CodeMetaField | None:
+            item, text = jobs[ref]
+            meta = cast(PictureMeta, item.meta)
+            return self._generate_picture_code(
                 text=text,
-                classification=classification,
-                chart_meta=chart_meta,
+                classification=meta.classification,
+                chart_meta=meta.tabular_chart,
                 loop_budget=loop_budget,
             )
+
+        for ref, code_meta in self.backend.map_concurrently(self._unless_stopped(generate), jobs):
             if code_meta is not None:
-                meta.code = code_meta
+                cast(PictureMeta, jobs[ref][0].meta).code = code_meta
+                self._node_enriched(document, jobs[ref][0], "code")
 
         return document
 
+    def _picture_code_jobs(self, document: DoclingDocument) -> dict[str, tuple[PictureItem, str]]:
+        """Classified pictures without code, with their textual context, keyed by ``self_ref``."""
+        jobs: dict[str, tuple[PictureItem, str]] = {}
+        for item, _ in document.iterate_items():
+            if not isinstance(item, PictureItem) or not isinstance(item.meta, PictureMeta):
+                continue
+            if item.meta.code or not item.meta.classification:
+                continue
+            text = self._picture_context(item=item, document=document)
+            if text:
+                jobs[item.self_ref] = (item, text)
+        return jobs
+
     def _metadata_origin(self, model_id: str | None = None) -> str:
         return model_id or self.get_reasoning_model_id()
 
@@ -1237,20 +2335,7 @@ Return no extra commentary. Include all operations that are materially requested
         if payload is None:
             return None
 
-        labels = payload.get("predictions")
-        if not isinstance(labels, list):
-            return None
-
-        deduped = [label for label in dict.fromkeys(labels) if isinstance(label, str)]
-        if not deduped:
-            return None
-
-        return PictureClassificationMetaField(
-            predictions=[
-                PictureClassificationPrediction(class_name=label, created_by=self._metadata_origin())
-                for label in deduped
-            ]
-        )
+        return classification_from_labels(payload.get("predictions"), created_by=self._metadata_origin())
 
     def _primary_chart_type(self, classification: PictureClassificationMetaField | None) -> str | None:
         if classification is None:
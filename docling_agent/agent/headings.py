@@ -0,0 +1,163 @@
+"""Deterministic section-heading level inference.
+
+The normalizer decides heading levels from cues that are present in the converted
+document itself: explicit numbering (``1``, ``1.1``, ``A.2``, ``IV.``), the line
+height of the heading in its ``prov`` bounding box (a proxy for the font size)
+and consistency with neighbouring headings. Headings whose level cannot be
+decided from these cues are reported so that a caller can ask an LLM about them.
+"""
+
+import re
+from statistics import median
+
+from docling_core.types.doc.document import DoclingDocument, SectionHeaderItem
+from pydantic import BaseModel, Field
+
+from docling_agent.agent.editor import SectionHeadingLevelChange
+
+_ARABIC_NUMBERING = re.compile(r"^\s*(\d{1,2}(?:\.\d{1,2})*)\.?\)?\s+\S")
+_LETTER_NUMBERING = re.compile(r"^\s*([A-Z](?:\.\d{1,2})+)\.?\s+\S")
+_LETTER_SECTION = re.compile(r"^\s*[A-Z][.)]\s+\S")
+_ROMAN_SECTION = re.compile(r"^\s*[IVX]{1,5}[.)]\s+\S")
+
+# Unnumbered headings that sit at the top level in numbered documents
+_TOP_LEVEL_NAMES = re.compile(
+    r"^\s*(abstract|introduction|conclusions?|references|bibliography|acknowledge?ments?|"
+    r"appendix(\s+[A-Z0-9]+)?|appendices|related work|contents|table of contents|summary)\s*[:.]?\s*$",
+    re.IGNORECASE,
+)
+
+# Line heights within this relative tolerance belong to the same typographic tier
+_HEIGHT_TOLERANCE = 0.1
+# Height-to-character-width ratio above which a heading likely wraps over several lines
+_MAX_SINGLE_LINE_RATIO = 3.5
+
+
+class HeadingLevelInference(BaseModel):
+    """Outcome of :func:`infer_heading_levels`."""
+
+    changes: list[SectionHeadingLevelChange] = Field(
+        default_factory=list,
+        description="Level changes for the decided headings whose level differs from the current one.",
+    )
+    decided: dict[str, int] = Field(
+        default_factory=dict, description="Inferred level of every decided heading, keyed by self_ref."
+    )
+    undecided: list[str] = Field(
+        default_factory=list, description="References of the headings no cue could decide, in reading order."
+    )
+
+
+def numbering_depth(text: str) -> int | None:
+    """Return the nesting depth implied by the numbering prefix of *text*, if any.
+
+    ``"2 Methods"`` and ``"IV. Results"`` have depth 1, ``"2.3 Data"`` and
+    ``"A.2 Proofs"`` depth 2. Texts without a recognizable numbering return None.
+    """
+    if match := _ARABIC_NUMBERING.match(text):
+        return match.group(1).count(".") + 1
+    if match := _LETTER_NUMBERING.match(text):
+        return match.group(1).count(".") + 1
+    if _LETTER_SECTION.match(text) or _ROMAN_SECTION.match(text):
+        return 1
+    return None
+
+
+def _line_height(item: SectionHeaderItem) -> float | None:
+    """Height of a single-line heading in its first provenance box, else None."""
+    if not item.prov or not item.text.strip():
+        return None
+    bbox = item.prov[0].bbox
+    height, width = abs(bbox.height), abs(bbox.width)
+    if height <= 0 or width <= 0:
+        return None
+    char_width = width / len(item.text.strip())
+    if height / char_width > _MAX_SINGLE_LINE_RATIO:
+        return None
+    return height
+
+
+def _height_tiers(heights: list[float]) -> list[float]:
+    """Group *heights* into tiers of similar size; returns tier medians, largest first."""
+    tiers: list[list[float]] = []
+    for height in sorted(heights, reverse=True):
+        if tiers and height >= tiers[-1][0] * (1 - _HEIGHT_TOLERANCE):
+            tiers[-1].append(height)
+        else:
+            tiers.append([height])
+    return [median(tier) for tier in tiers]
+
+
+def _matching_level(height: float, level_heights: dict[int, float]) -> int | None:
+    """Return the only level whose typical height matches *height*, if exactly one does."""
+    matches = [
+        level
+        for level, typical in level_heights.items()
+        if abs(height - typical) <= _HEIGHT_TOLERANCE * max(height, typical)
+    ]
+    return matches[0] if len(matches) == 1 else None
+
+
+def infer_heading_levels(document: DoclingDocument) -> HeadingLevelInference:
+    """Infer the level of every section heading of *document* without an LLM.
+
+    Cues are applied in decreasing order of reliability:
+
+    1. numbering prefixes give the level directly (``1.2`` is level 2);
+    2. well-known top-level names (Abstract, References, ...) are level 1 in
+       numbered documents;
+    3. headings whose line height matches exactly one level of the numbered
+       headings get that level; in unnumbered documents with several height
+       tiers, the tier rank is the level;
+    4. a heading between two decided neighbours of the same level takes that level.
+
+    The document is not modified.
+    """
+    headers = [item for item, _ in document.iterate_items() if isinstance(item, SectionHeaderItem)]
+    decided: dict[str, int] = {}
+    heights: dict[str, float] = {}
+
+    for item in headers:
+        if (height := _line_height(item)) is not None:
+            heights[item.self_ref] = height
+        if (depth := numbering_depth(item.text)) is not None:
+            decided[item.self_ref] = depth
+
+    numbered = bool(decided)
+    if numbered:
+        top_level = min(decided.values())
+        for item in headers:
+            if item.self_ref not in decided and _TOP_LEVEL_NAMES.match(item.text):
+                decided[item.self_ref] = top_level
+
+    # Typical line height per level, learned from the headings decided so far
+    if numbered:
+        by_level: dict[int, list[float]] = {}
+        for ref, level in decided.items():
+            if ref in heights:
+                by_level.setdefault(level, []).append(heights[ref])
+        level_heights = {level: median(values) for level, values in by_level.items()}
+    else:
+        tiers = _height_tiers(list(heights.values()))
+        level_heights = {rank + 1: tier for rank, tier in enumerate(tiers)} if len(tiers) > 1 else {}
+
+    for item in headers:
+        if item.self_ref not in decided and item.self_ref in heights:
+            if (level := _matching_level(heights[item.self_ref], level_heights)) is not None:
+                decided[item.self_ref] = level
+
+    for index, item in enumerate(headers):
+        if item.self_ref in decided:
+            continue
+        previous = next((decided[h.self_ref] for h in reversed(headers[:index]) if h.self_ref in decided), None)
+        following = next((decided[h.self_ref] for h in headers[index + 1 :] if h.self_ref in decided), None)
+        if previous is not None and previous == following:
+            decided[item.self_ref] = previous
+
+    changes = [
+        SectionHeadingLevelChange(ref=item.self_ref, to_level=decided[item.self_ref])
+        for item in headers
+        if item.self_ref in decided and decided[item.self_ref] != item.level
+    ]
+    undecided = [item.self_ref for item in headers if item.self_ref not in decided]
+    return HeadingLevelInference(changes=changes, decided=decided, undecided=undecided)
@@ -0,0 +1,357 @@
+"""Lexical text helpers used as LLM-free fast paths.
+
+The helpers in this module work on plain strings and NumPy arrays only, so they
+can process the node texts of a whole library in seconds.
+"""
+
+import re
+from bisect import bisect_left
+from collections import deque
+from collections.abc import Iterable, Sequence
+
+import numpy as np
+
+# Compact English stopword list; candidate phrases never start, end or contain these words.
+STOPWORDS: frozenset[str] = frozenset(
+    """
+    a about above after again against all also am an and any are as at be because been before being below
+    between both but by can could did do does doing down during each either else etc few for from further
+    had has have having he her here hers herself him himself his how however i if in into is it its itself
+    just let like may me might more most much must my myself no nor not now of off on once one only or other
+    our ours ourselves out over own per same she should since so some such than that the their theirs them
+    themselves then there these they this those through thus to too under until up upon us use used using
+    very via was we were what when where whether which while who whom why will with within without would
+    yet you your yours yourself yourselves
+    e.g i.e et al fig figure table section
+    """.split()
+)
+
+_TOKEN_PATTERN = re.compile(r"[^\W_](?:[\w\-./]*[^\W_])?")
+_FRAGMENT_SPLIT = re.compile(r"[.,;:!?()\[\]{}\"\u201c\u201d\u2018\u2019|]+|\s[-\u2013\u2014]\s")
+_HTML_TAG = re.compile(r"<[^>]+>")
+
+
+def strip_html(text: str) -> str:
+    """Replace HTML tags with spaces, e.g. for tables serialized as HTML."""
+    return _HTML_TAG.sub(" ", text)
+
+
+def tokenize(text: str) -> list[str]:
+    """Split *text* into lowercase word tokens (hyphenated and dotted terms stay whole)."""
+    return [token.lower() for token in _TOKEN_PATTERN.findall(text)]
+
+
+def _is_content_word(token: str) -> bool:
+    return token not in STOPWORDS and len(token) > 1 and not token.replace(".", "").replace("-", "").isdigit()
+
+
+def _fragment_tokens(text: str) -> list[list[str]]:
+    """Tokens of *text* grouped by punctuation-delimited fragment, in their original casing."""
+    return [_TOKEN_PATTERN.findall(fragment) for fragment in _FRAGMENT_SPLIT.split(text)]
+
+
+def candidate_phrases(text: str, *, max_words: int = 3) -> list[tuple[str, str]]:
+    """Return RAKE-style candidate phrases of *text* as ``(normalized, surface)`` pairs.
+
+    Candidates are maximal runs of content words between stopwords and punctuation.
+    Runs longer than *max_words* contribute their n-grams up to *max_words* instead.
+    Single-word candidates must be at least three characters long.
+    """
+    candidates: list[tuple[str, str]] = []
+    for tokens in _fragment_tokens(text):
+        run: list[str] = []
+        for surface in [*tokens, ""]:
+            if surface and _is_content_word(surface.lower()):
+                run.append(surface)
+                continue
+            if run:
+                spans = [run] if len(run) <= max_words else _ngrams(run, max_words)
+                for words in spans:
+                    if len(words) == 1 and len(words[0]) < 3:
+                        continue
+                    candidates.append((" ".join(word.lower() for word in words), " ".join(words)))
+                run = []
+    return candidates
+
+
+def _ngrams(words: list[str], max_words: int) -> list[list[str]]:
+    return [words[start : start + size] for size in range(1, max_words + 1) for start in range(len(words) - size + 1)]
+
+
+class TfidfKeywordExtractor:
+    """Corpus-level TF-IDF scorer for candidate key phrases.
+
+    The corpus is the list of texts passed to :meth:`extract`, typically the node
+    texts of one document. Every word gets a TF-IDF weight per text; a candidate
+    phrase scores the mean weight of its words, with a mild boost for multi-word
+    phrases. Phrases that share a word with an already selected keyword are
+    skipped so that the keywords of a text stay diverse.
+    """
+
+    def __init__(self, *, max_words: int = 3, phrase_boost: float = 0.25) -> None:
+        self.max_words = max_words
+        self.phrase_boost = phrase_boost
+
+    def extract(self, texts: Sequence[str], *, top_k: int = 5) -> list[list[str]]:
+        """Return up to *top_k* keywords for every text in *texts*, best first."""
+        words: dict[str, int] = {}
+        phrases: dict[str, int] = {}
+        surfaces: list[str] = []
+        phrase_words: list[list[int]] = []
+        word_rows: list[int] = []
+        word_cols: list[int] = []
+        phrase_rows: list[int] = []
+        phrase_cols: list[int] = []
+        for row, text in enumerate(texts):
+            for tokens in _fragment_tokens(text):
+                for token in tokens:
+                    token = token.lower()
+                    if _is_content_word(token):
+                        word_rows.append(row)
+                        word_cols.append(words.setdefault(token, len(words)))
+            for normalized, surface in candidate_phrases(text, max_words=self.max_words):
+                col = phrases.get(normalized)
+                if col is None:
+                    col = phrases[normalized] = len(surfaces)
+                    surfaces.append(surface)
+                    phrase_words.append([words.setdefault(word, len(words)) for word in normalized.split(" ")])
+                phrase_rows.append(row)
+                phrase_cols.append(col)
+
+        if not phrase_rows:
+            return [[] for _ in texts]
+
+        n_texts, n_words = len(texts), len(words)
+
+        # Word TF-IDF per (text, word), kept as sorted sparse keys to stay cheap on large corpora
+        word_keys, word_counts = np.unique(
+            np.asarray(word_rows, dtype=np.int64) * n_words + np.asarray(word_cols, dtype=np.int64),
+            return_counts=True,
+        )
+        word_doc_freq = np.bincount(word_keys % n_words, minlength=n_words)
+        idf = np.log((1 + n_texts) / (1 + word_doc_freq)) + 1.0
+        row_totals = np.maximum(np.bincount(np.asarray(word_rows, dtype=np.int64), minlength=n_texts), 1)
+        word_tfidf = word_counts / row_totals[word_keys // n_words] * idf[word_keys % n_words]
+
+        # Distinct (text, phrase) pairs, expanded to one entry per phrase word
+        pair_keys = np.unique(
+            np.asarray(phrase_rows, dtype=np.int64) * len(surfaces) + np.asarray(phrase_cols, dtype=np.int64)
+        )
+        pair_rows, pair_cols = pair_keys // len(surfaces), pair_keys % len(surfaces)
+        lengths = np.asarray([len(ids) for ids in phrase_words])[pair_cols]
+        entry = np.repeat(np.arange(len(pair_keys)), lengths)
+        entry_words = np.concatenate([phrase_words[col] for col in pair_cols]).astype(np.int64)
+        # Phrase words are content words of the same text, so every lookup hits an existing key
+        weights = word_tfidf[np.searchsorted(word_keys, pair_rows[entry] * n_words + entry_words)]
+        mean_weight = np.bincount(entry, weights=weights, minlength=len(pair_keys)) / lengths
+        scores = mean_weight * (1.0 + self.phrase_boost * (lengths - 1))
+
+        # Sort by text, then by descending score
+        order = np.lexsort((-scores, pair_rows))
+        pair_rows, pair_cols = pair_rows[order], pair_cols[order]
+        starts = np.searchsorted(pair_rows, np.arange(n_texts), side="left")
+        ends = np.searchsorted(pair_rows, np.arange(n_texts), side="right")
+
+        results: list[list[str]] = []
+        for start, end in zip(starts, ends):
+            selected: list[str] = []
+            used_words: set[int] = set()
+            for col in pair_cols[start:end]:
+                if used_words.intersection(phrase_words[col]):
+                    continue
+                used_words.update(phrase_words[col])
+                selected.append(surfaces[col])
+                if len(selected) == top_k:
+                    break
+            results.append(selected)
+        return results
+
+
+class BM25Index:
+    """Okapi BM25 index over a fixed list of texts.
+
+    The index is built once; :meth:`search` then scores all texts against a query
+    with a few sparse NumPy operations. Stopwords and numbers are not indexed.
+    """
+
+    def __init__(self, texts: Sequence[str], *, k1: float = 1.5, b: float = 0.75) -> None:
+        self.size = len(texts)
+        self.k1 = k1
+        self.b = b
+        self._vocabulary: dict[str, int] = {}
+        rows: list[int] = []
+        cols: list[int] = []
+        for row, text in enumerate(texts):
+            for token in tokenize(strip_html(text)):
+                if _is_content_word(token):
+                    rows.append(row)
+                    cols.append(self._vocabulary.setdefault(token, len(self._vocabulary)))
+
+        n_words = max(len(self._vocabulary), 1)
+        keys, counts = np.unique(
+            np.asarray(rows, dtype=np.int64) * n_words + np.asarray(cols, dtype=np.int64),
+            return_counts=True,
+        )
+        lengths = np.bincount(np.asarray(rows, dtype=np.int64), minlength=self.size).astype(np.float64)
+        doc_freq = np.bincount(keys % n_words, minlength=n_words)
+        self._idf = np.log(1.0 + (self.size - doc_freq + 0.5) / (doc_freq + 0.5))
+
+        # Postings sorted by word, so the entries of one word are a contiguous slice
+        order = np.argsort(keys % n_words, kind="stable")
+        self._post_rows = (keys // n_words)[order]
+        post_cols = (keys % n_words)[order]
+        self._post_starts = np.searchsorted(post_cols, np.arange(n_words + 1))
+        norm = k1 * (1.0 - b + b * lengths / max(lengths.mean() if self.size else 0.0, 1e-9))
+        tf = counts[order].astype(np.float64)
+        self._post_weights = tf * (k1 + 1.0) / (tf + norm[self._post_rows])
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every indexed text for *query*."""
+        result = np.zeros(self.size)
+        for token in set(tokenize(strip_html(query))):
+            col = self._vocabulary.get(token)
+            if col is None:
+                continue
+            start, end = self._post_starts[col], self._post_starts[col + 1]
+            result[self._post_rows[start:end]] += self._idf[col] * self._post_weights[start:end]
+        return result
+
+    def search(self, query: str, *, top_k: int = 5) -> list[tuple[int, float]]:
+        """Return up to *top_k* ``(index, score)`` pairs of the texts matching *query*, best first."""
+        scores = self.scores(query)
+        candidates = np.flatnonzero(scores > 0)
+        best = candidates[np.argsort(-scores[candidates], kind="stable")][:top_k]
+        return [(int(index), float(scores[index])) for index in best]
+
+
+class FoldedText:
+    """Case-folded view of a text that maps folded offsets back to the original.
+
+    ``str.casefold`` can change the length of a text (``"\u00df"`` folds to
+    ``"ss"``, ``"\u0130"`` to two code points), so offsets found in the folded
+    view are translated through a per-character map instead of being reused.
+    """
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        folded: list[str] = []
+        # starts[i]: folded offset of original character i; origins[j]: original character of folded offset j
+        starts: list[int] = []
+        origins: list[int] = []
+        for index, char in enumerate(text):
+            fold = char.casefold()
+            starts.append(len(origins))
+            origins.extend([index] * len(fold))
+            folded.append(fold)
+        starts.append(len(origins))
+        self.folded = "".join(folded)
+        self._starts = starts
+        self._origins = origins
+
+    def to_folded(self, index: int) -> int:
+        """Folded offset of the original character at *index* (or of the end of the text)."""
+        return self._starts[min(max(index, 0), len(self.text))]
+
+    def to_original(self, start: int, end: int) -> tuple[int, int] | None:
+        """Original span of the folded span ``[start, end)``.
+
+        Returns None when the span starts or ends inside the folding of a single
+        character, e.g. a match of ``"s"`` against one half of a folded ``"\u00df"``.
+        """
+        if start >= end:
+            return None
+        original_start = self._origins[start]
+        original_end = self._origins[end - 1] + 1
+        if self._starts[original_start] != start or self._starts[original_end] != end:
+            return None
+        return original_start, original_end
+
+
+class PatternMatcher:
+    """Aho-Corasick automaton that finds all occurrences of many patterns in one pass."""
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self.patterns = [pattern for pattern in dict.fromkeys(patterns) if pattern]
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[int]] = [[]]
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = next_state
+            self._out[state].append(index)
+
+        # Breadth-first construction of the failure links; outputs are inherited along them
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def find_all(self, text: str) -> dict[str, list[int]]:
+        """Return the sorted start offsets of every (possibly overlapping) occurrence per pattern."""
+        found: dict[str, list[int]] = {pattern: [] for pattern in self.patterns}
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in out[state]:
+                pattern = self.patterns[index]
+                found[pattern].append(position - len(pattern) + 1)
+        for starts in found.values():
+            starts.sort()
+        return found
+
+
+def resolve_spans(text: str, needles: Sequence[str], *, search_start: int = 0) -> list[tuple[int, int] | None]:
+    """Locate *needles* in *text* in order and return their character spans.
+
+    Each needle is searched from the end of the previous needle that was found
+    (starting at *search_start*). An exact-case occurrence takes precedence over
+    a case-insensitive one; needles that are blank or absent get None. All
+    needles are matched in a single pass over the case-folded text, and spans are
+    always expressed in offsets of the original *text*.
+    """
+    view = FoldedText(text)
+    folded_needles = [needle.casefold() if needle.strip() else "" for needle in needles]
+    occurrences = PatternMatcher(folded_needles).find_all(view.folded)
+
+    # Per needle: original spans of its aligned case-insensitive and exact occurrences
+    candidates: dict[str, tuple[list[tuple[int, int]], list[tuple[int, int]]]] = {}
+    for needle, folded in zip(needles, folded_needles):
+        if not folded or needle in candidates:
+            continue
+        spans = [
+            span for start in occurrences[folded] if (span := view.to_original(start, start + len(folded))) is not None
+        ]
+        candidates[needle] = (spans, [span for span in spans if text[span[0] : span[1]] == needle])
+
+    resolved: list[tuple[int, int] | None] = []
+    for needle in needles:
+        span = None
+        if needle in candidates:
+            insensitive, exact = candidates[needle]
+            for spans in (exact, insensitive):
+                index = bisect_left(spans, (search_start, -1))
+                if index < len(spans):
+                    span = spans[index]
+                    break
+        if span is not None:
+            search_start = span[1]
+        resolved.append(span)
+    return resolved
@@ -9,6 +9,8 @@ from pathlib import Path
 from docling_core.types.doc.document import DoclingDocument
 from pydantic import BaseModel, Field
 
+from docling_agent.agent.base_functions import atomic_write_text
+from docling_agent.agent.rag_models import RAGIndex
 from docling_agent.logging import log_debug, log_error, log_warning
 
 
@@ -32,6 +34,8 @@ class DocLibraryEntry(BaseModel):
     summary: str | None = None
     keywords: list[str] = Field(default_factory=list)
     topics: list[str] = Field(default_factory=list)
+    checkpoint_operation: str | None = None  # enrichment operation in progress when the last checkpoint was saved
+    content_hash: str | None = None  # sha256 of the stored document JSON; keys the derived artifacts
 
 
 class DocLibraryIndex(BaseModel):
@@ -45,6 +49,10 @@ def _now_iso() -> str:
     return datetime.now(tz=timezone.utc).isoformat()
 
 
+def _content_hash(doc_json: str) -> str:
+    return hashlib.sha256(doc_json.encode("utf-8")).hexdigest()
+
+
 def _doc_id_for_source(source_path: str) -> str:
     return hashlib.sha256(source_path.encode()).hexdigest()[:16]
 
@@ -63,12 +71,16 @@ class DoclingLibrary:
             index.json              ← ``DocLibraryIndex`` (all entries)
             <doc_id>/
                 document.json       ← serialized ``DoclingDocument``
+                checkpoint.json     ← partially enriched document (only while an enrichment is unfinished)
+                rag_index.json      ← ``RAGIndex`` of the document, valid while its content hash matches
 
     The library is thread-unsafe by design; it is intended for single-process CLI use.
     """
 
     INDEX_FILE = "index.json"
     DOC_FILE = "document.json"
+    CHECKPOINT_FILE = "checkpoint.json"
+    RAG_INDEX_FILE = "rag_index.json"
 
     def __init__(self, path: Path) -> None:
         self.path = path
@@ -108,7 +120,7 @@ class DoclingLibrary:
 
         # Write the DoclingDocument JSON
         doc_json = doc.model_dump_json(indent=2)
-        (doc_dir / self.DOC_FILE).write_text(doc_json, encoding="utf-8")
+        atomic_write_text(doc_dir / self.DOC_FILE, doc_json)
 
         # Optionally copy the original file
         if copy_source:
@@ -132,6 +144,8 @@ class DoclingLibrary:
             summary=existing.summary if existing else None,
             keywords=existing.keywords if existing else [],
             topics=existing.topics if existing else [],
+            checkpoint_operation=existing.checkpoint_operation if existing else None,
+            content_hash=_content_hash(doc_json),
         )
         self._index.entries[doc_id] = entry
         self._index.source_to_id[source_path] = doc_id
@@ -145,7 +159,8 @@ class DoclingLibrary:
         doc_id = _doc_id_for_name(doc.name)
         doc_dir = self.path / doc_id
         doc_dir.mkdir(exist_ok=True)
-        (doc_dir / self.DOC_FILE).write_text(doc.model_dump_json(indent=2), encoding="utf-8")
+        doc_json = doc.model_dump_json(indent=2)
+        atomic_write_text(doc_dir / self.DOC_FILE, doc_json)
 
         entry = DocLibraryEntry(
             doc_id=doc_id,
@@ -153,6 +168,7 @@ class DoclingLibrary:
             source_path="in-memory",
             created_at=_now_iso(),
             updated_at=_now_iso(),
+            content_hash=_content_hash(doc_json),
         )
         self._index.entries[doc_id] = entry
         self._save_index()
@@ -207,9 +223,74 @@ class DoclingLibrary:
         """Overwrite the stored document JSON (after in-place enrichment)."""
         doc_path = self.path / doc_id / self.DOC_FILE
         if doc_path.exists():
-            doc_path.write_text(doc.model_dump_json(indent=2), encoding="utf-8")
+            doc_json = doc.model_dump_json(indent=2)
+            atomic_write_text(doc_path, doc_json)
+            entry = self._index.entries.get(doc_id)
+            if entry is not None:
+                entry.content_hash = _content_hash(doc_json)
             self.update_status(doc_id)  # just bump updated_at
 
+    def save_checkpoint(self, doc_id: str, doc: DoclingDocument, operation: str) -> None:
+        """Atomically persist a partially enriched *doc* while *operation* is still running."""
+        entry = self._index.entries.get(doc_id)
+        if entry is None:
+            log_warning(f"Library: save_checkpoint called for unknown doc_id={doc_id!r}")
+            return
+        doc_dir = self.path / doc_id
+        doc_dir.mkdir(exist_ok=True)
+        atomic_write_text(doc_dir / self.CHECKPOINT_FILE, doc.model_dump_json())
+        entry.checkpoint_operation = operation
+        entry.updated_at = _now_iso()
+        self._save_index()
+        log_debug(f"Library: checkpointed {doc_id} during {operation!r}")
+
+    def load_checkpoint(self, doc_id: str) -> tuple[DoclingDocument, str | None] | None:
+        """Return the checkpointed document and the operation it was saved in, or None."""
+        checkpoint_path = self.path / doc_id / self.CHECKPOINT_FILE
+        if not checkpoint_path.exists():
+            return None
+        try:
+            doc = DoclingDocument.model_validate_json(checkpoint_path.read_text(encoding="utf-8"))
+        except Exception as exc:
+            log_warning(f"Library: ignoring unreadable checkpoint {checkpoint_path}: {exc}")
+            return None
+        entry = self._index.entries.get(doc_id)
+        return doc, entry.checkpoint_operation if entry else None
+
+    def clear_checkpoint(self, doc_id: str) -> None:
+        """Remove the checkpoint of *doc_id* once its enrichment has completed."""
+        (self.path / doc_id / self.CHECKPOINT_FILE).unlink(missing_ok=True)
+        entry = self._index.entries.get(doc_id)
+        if entry is not None and entry.checkpoint_operation is not None:
+            entry.checkpoint_operation = None
+            self._save_index()
+
+    def save_rag_index(self, doc_id: str, index: RAGIndex) -> None:
+        """Persist the RAG *index* of *doc_id*, keyed by the content hash of the stored document."""
+        content_hash = self._current_content_hash(doc_id)
+        if content_hash is None:
+            log_warning(f"Library: save_rag_index called for unknown doc_id={doc_id!r}")
+            return
+        index.content_hash = content_hash
+        atomic_write_text(self.path / doc_id / self.RAG_INDEX_FILE, index.model_dump_json())
+        log_debug(f"Library: stored RAG index of {doc_id}")
+
+    def load_rag_index(self, doc_id: str) -> RAGIndex | None:
+        """Return the RAG index of *doc_id* if it was built from the stored document, else None."""
+        index_path = self.path / doc_id / self.RAG_INDEX_FILE
+        entry = self._index.entries.get(doc_id)
+        if entry is None or entry.content_hash is None or not index_path.exists():
+            return None
+        try:
+            index = RAGIndex.model_validate_json(index_path.read_text(encoding="utf-8"))
+        except Exception as exc:
+            log_warning(f"Library: ignoring unreadable RAG index {index_path}: {exc}")
+            return None
+        if index.content_hash != entry.content_hash:
+            log_debug(f"Library: RAG index of {doc_id} is stale")
+            return None
+        return index
+
     def all_entries(self) -> list[DocLibraryEntry]:
         return list(self._index.entries.values())
 
@@ -226,6 +307,19 @@ class DoclingLibrary:
                 log_warning(f"Library: could not load index, starting fresh: {exc}")
         return DocLibraryIndex()
 
+    def _current_content_hash(self, doc_id: str) -> str | None:
+        """Content hash of *doc_id*, computed from ``document.json`` for entries stored before hashes."""
+        entry = self._index.entries.get(doc_id)
+        if entry is None:
+            return None
+        if entry.content_hash is None:
+            doc_path = self.path / doc_id / self.DOC_FILE
+            if not doc_path.exists():
+                return None
+            entry.content_hash = _content_hash(doc_path.read_text(encoding="utf-8"))
+            self._save_index()
+        return entry.content_hash
+
     def _save_index(self) -> None:
         index_path = self.path / self.INDEX_FILE
-        index_path.write_text(self._index.model_dump_json(indent=2), encoding="utf-8")
+        atomic_write_text(index_path, self._index.model_dump_json(indent=2))
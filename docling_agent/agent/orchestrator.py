@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from functools import partial
 from pathlib import Path
 from typing import cast
 
@@ -23,6 +24,8 @@ from docling_agent.agent.enricher import DoclingEnrichingAgent
 from docling_agent.agent.extractor import DoclingExtractingAgent
 from docling_agent.agent.library import DoclingLibrary
 from docling_agent.agent.rag import DoclingRAGAgent
+from docling_agent.agent.rag_models import RAGIndex
+from docling_agent.agent.write_sink import IncrementalWritingSink
 from docling_agent.agent.writer import DoclingWritingAgent
 from docling_agent.logging import log_error, log_info, log_warning
 from docling_agent.task_model import (
@@ -37,6 +40,9 @@ from docling_agent.task_model import (
 # Internal type alias: a resolved document paired with its library id.
 _SourcePair = tuple[DoclingDocument, str]
 
+# Operations estimated by a plan-only enrich task that leaves the operations to the router
+_DEFAULT_PLAN_OPERATIONS = ("summarize", "keywords", "entities", "classify")
+
 
 class _SourcePairs(list):
     """List of ``_SourcePair`` with a compact repr to avoid polluting rich tracebacks."""
@@ -90,12 +96,22 @@ class DoclingOrchestratorAgent(BaseDoclingAgent):
     # Main entry point
     # ------------------------------------------------------------------
 
-    def run_task(self, task: AgentTask) -> DoclingDocument:
-        """Convert sources, enrich lazily, and dispatch to the right sub-agent."""
+    def run_task(self, task: AgentTask, *, writing_sink: IncrementalWritingSink | None = None) -> DoclingDocument:
+        """Convert sources, enrich lazily, and dispatch to the right sub-agent.
+
+        For write tasks, *writing_sink* streams the document to disk as it is written and
+        resumes an interrupted run it finds at its path.
+        """
         log_info(f"DoclingOrchestratorAgent.run_task: mode={task.mode!r}")
-        return self._dispatch(task, DoclingLibrary(path=self.library_path))
+        return self._dispatch(task, DoclingLibrary(path=self.library_path), writing_sink=writing_sink)
 
-    def _dispatch(self, task: AgentTask, library: DoclingLibrary) -> DoclingDocument:
+    def _dispatch(
+        self,
+        task: AgentTask,
+        library: DoclingLibrary,
+        *,
+        writing_sink: IncrementalWritingSink | None = None,
+    ) -> DoclingDocument:
         log_info(f"_dispatch: mode={task.mode!r}")
         source_pairs = self._resolve_sources(task, library)
 
@@ -108,7 +124,7 @@ class DoclingOrchestratorAgent(BaseDoclingAgent):
         elif isinstance(task, ExtractTask):
             return self._run_extract(task=task, source_pairs=source_pairs)
         elif isinstance(task, WriteTask):
-            return self._run_write(task=task, source_pairs=source_pairs)
+            return self._run_write(task=task, source_pairs=source_pairs, writing_sink=writing_sink)
         elif isinstance(task, EditingTask):
             return self._run_edit(task=task, source_pairs=source_pairs)
         elif isinstance(task, EnrichTask):
@@ -205,6 +221,7 @@ class DoclingOrchestratorAgent(BaseDoclingAgent):
         source_pairs: list[_SourcePair],
         library: DoclingLibrary,
         operations: list[str],
+        enricher: DoclingEnrichingAgent | None = None,
     ) -> list[_SourcePair]:
         """Run enrichment on documents that are missing the requested enrichments.
 
@@ -212,12 +229,15 @@ class DoclingOrchestratorAgent(BaseDoclingAgent):
         version (``_summarize_items`` returns a hierarchical document).
         """
         log_info(f"_ensure_enriched: operations={operations}, docs={len(source_pairs)}")
-        enricher = DoclingEnrichingAgent(
-            backend=self.backend,
-            tools=[],
-        )
+        if enricher is None:
+            enricher = DoclingEnrichingAgent(
+                backend=self.backend,
+                tools=[],
+            )
 
         updated: list[_SourcePair] = []
+        budget_left = True
+        remaining: dict[str, int | None] = {"max_calls": enricher.max_calls, "max_tokens": enricher.max_tokens}
         for doc, doc_id in source_pairs:
             entry = library.get_entry(doc_id)
             needed = list(operations)  # copy
@@ -227,11 +247,38 @@ class DoclingOrchestratorAgent(BaseDoclingAgent):
             if "keywords" in needed and entry and entry.status.has_keywords:
                 needed.remove("keywords")
 
-            if needed:
+            if needed and not budget_left:
+                log_warning(f"Skipping enrichment of {doc.name!r}, the enrichment budget is spent")
+                updated.append((doc, doc_id))
+            elif needed:
+                # Pick up a partially enriched document left behind by an interrupted run
+                resume_from: str | None = None
+                checkpoint = library.load_checkpoint(doc_id)
+                if checkpoint is not None:
+                    doc, resume_from = checkpoint
+                    log_info(f"Resuming enrichment of {doc.name!r} from checkpoint (operation={resume_from!r})")
                 log_info(f"Enriching {doc.name!r} with operations={needed}")
-                enriched_doc = enricher.run(task="", document=doc, operations=needed)
+                if enricher.max_calls is not None or enricher.max_tokens is not None:
+                    log_info(enricher.plan(document=doc, operations=needed).render())
+                enriched_doc = enricher.run(
+                    task="",
+                    document=doc,
+                    operations=needed,
+                    checkpoint_callback=partial(library.save_checkpoint, doc_id),
+                    resume_from=resume_from,
+                    **remaining,
+                )
+                budget_left = self._charge_enrichment_budget(enricher, remaining)
+                usage = enricher.last_usage
+                if usage is not None and usage.exhausted:
+                    # Keep the partial result as a checkpoint so that the next run resumes from it
+                    library.save_checkpoint(doc_id, enriched_doc, usage.stopped_at or needed[0])
+                    log_warning(f"Enrichment budget ran out while enriching {doc.name!r}; progress is checkpointed")
+                    updated.append((enriched_doc, doc_id))
+                    continue
                 # Persist enriched document back to library
                 library.store(enriched_doc, entry.source_path if entry else "in-memory")
+                library.clear_checkpoint(doc_id)
                 # Update status flags
                 status_updates: dict[str, bool] = {}
                 if "summarize" in needed:
@@ -249,6 +296,48 @@ class DoclingOrchestratorAgent(BaseDoclingAgent):
 
         return updated
 
+    def _make_enricher(self, task: EnrichTask) -> DoclingEnrichingAgent:
+        """Build an enricher configured with the tuning options of *task*."""
+        enricher = DoclingEnrichingAgent(backend=self.backend, tools=[])
+        enricher.entity_packing_budget = task.entity_packing_budget
+        enricher.keyword_strategy = task.keyword_strategy
+        enricher.heading_level_strategy = task.heading_level_strategy
+        enricher.max_calls = task.max_calls
+        enricher.max_tokens = task.max_tokens
+        return enricher
+
+    @staticmethod
+    def _charge_enrichment_budget(enricher: DoclingEnrichingAgent, remaining: dict[str, int | None]) -> bool:
+        """Deduct the usage of the enricher's last run from *remaining*; return whether any budget is left.
+
+        *remaining* holds the ``max_calls`` and ``max_tokens`` left for the next runs of
+        the task; the limits configured on the enricher are left untouched.
+        """
+        usage = enricher.last_usage
+        if usage is None:
+            return True
+        if usage.exhausted:
+            return False
+        for limit, used in (("max_calls", usage.calls), ("max_tokens", usage.total_tokens)):
+            left = remaining[limit]
+            if left is not None:
+                remaining[limit] = left - used
+                if left - used <= 0:
+                    return False
+        return True
+
+    def _plan_enrichment(self, *, task: EnrichTask, source_pairs: list[_SourcePair]) -> DoclingDocument:
+        """Estimate the enrichment of every source without calling the LLM, as a document of plan tables."""
+        enricher = self._make_enricher(task)
+        operations = list(task.operations or _DEFAULT_PLAN_OPERATIONS)
+        result_doc = DoclingDocument(name="enrichment_plan")
+        for doc, _ in source_pairs:
+            plan = enricher.plan(document=doc, operations=operations, task=task.query)
+            log_info(plan.render())
+            result_doc.add_heading(text=doc.name, level=1, parent=result_doc.body)
+            result_doc.add_code(text=plan.render(), parent=result_doc.body)
+        return result_doc
+
     def _update_library_meta(self, doc_id: str, doc: DoclingDocument, library: DoclingLibrary) -> None:
         """Extract document-level summary and keywords from enriched doc and persist."""
         log_info(f"_update_library_meta: doc_id={doc_id!r}")
@@ -285,8 +374,27 @@ class DoclingOrchestratorAgent(BaseDoclingAgent):
             backend=self.backend,
             tools=[],
             max_iterations=task.max_iterations,
+            selection_mode=task.selection_mode,
+            shortlist_size=task.shortlist_size,
         )
-        return rag_agent.run(task=task.query, sources=docs)
+        indexes = [self._rag_index(rag_agent, doc=doc, doc_id=doc_id, library=library) for doc, doc_id in source_pairs]
+        return rag_agent.run(task=task.query, sources=docs, indexes=indexes)
+
+    def _rag_index(
+        self,
+        rag_agent: DoclingRAGAgent,
+        *,
+        doc: DoclingDocument,
+        doc_id: str,
+        library: DoclingLibrary,
+    ) -> RAGIndex:
+        """RAG index of *doc* from the library, built and stored on the first query of the document."""
+        index = library.load_rag_index(doc_id)
+        if index is None:
+            log_info(f"Building RAG index for {doc.name!r}")
+            index = rag_agent.build_index(doc)
+            library.save_rag_index(doc_id, index)
+        return index
 
     def _run_extract(
         self,
@@ -310,14 +418,23 @@ class DoclingOrchestratorAgent(BaseDoclingAgent):
         *,
         task: WriteTask,
         source_pairs: list[_SourcePair],
+        writing_sink: IncrementalWritingSink | None = None,
     ) -> DoclingDocument:
         log_info(f"_run_write: query={task.query!r}, docs={len(source_pairs)}")
         writer = DoclingWritingAgent(
             backend=self.backend,
             tools=[],
         )
+        writer.grounding_top_k = task.grounding_top_k
         sources: list[DoclingDocument | Path] = [doc for doc, _ in source_pairs]
-        return writer.run(task=task.query, sources=sources)
+        if writing_sink is None:
+            return writer.run(task=task.query, sources=sources)
+        return writer.run(
+            task=task.query,
+            sources=sources,
+            progress_callback=writing_sink,
+            resume_from=writing_sink.load_progress(task=task.query),
+        )
 
     def _run_edit(
         self,
@@ -330,9 +447,13 @@ class DoclingOrchestratorAgent(BaseDoclingAgent):
             backend=self.backend,
             tools=[],
         )
+        editor.outline_mode = task.outline_mode
+        editor.edit_protocol = task.edit_protocol
         if not source_pairs:
             raise ValueError("Edit tasks require at least one source document")
         document = source_pairs[0][0]
+        if task.instructions:
+            return editor.run_batch(tasks=task.instructions, document=document)
         return editor.run(task=task.query, document=document)
 
     def _run_enrich(
@@ -343,28 +464,44 @@ class DoclingOrchestratorAgent(BaseDoclingAgent):
         library: DoclingLibrary,
     ) -> DoclingDocument:
         log_info(f"_run_enrich: docs={len(source_pairs)}")
+        if task.plan_only:
+            return self._plan_enrichment(task=task, source_pairs=source_pairs)
+
         if task.operations is None:
             enriched_pairs = []
-            for doc, doc_id in source_pairs:
-                enricher = DoclingEnrichingAgent(backend=self.backend, tools=[])
+            enricher = self._make_enricher(task)
+            remaining: dict[str, int | None] = {"max_calls": task.max_calls, "max_tokens": task.max_tokens}
+            for index, (doc, doc_id) in enumerate(source_pairs):
                 log_info(f"Enriching {doc.name!r} by inferred operations from query")
-                enriched_doc = enricher.run(task=task.query, document=doc)
+                enriched_doc = enricher.run(task=task.query, document=doc, **remaining)
                 entry = library.get_entry(doc_id)
                 library.store(enriched_doc, entry.source_path if entry else "in-memory")
-                inferred_ops = enricher.last_operation.get("operations", [])
-                status_updates: dict[str, bool] = {}
-                if "summarize_items" in inferred_ops:
-                    status_updates["has_summaries"] = True
-                    status_updates["is_hierarchical"] = True
-                if "find_search_keywords" in inferred_ops:
-                    status_updates["has_keywords"] = True
-                if status_updates:
-                    library.update_status(doc_id, **status_updates)
-                self._update_library_meta(doc_id, enriched_doc, library)
                 enriched_pairs.append((enriched_doc, doc_id))
+                usage = enricher.last_usage
+                # A run cut short by the budget is stored, but not flagged as summarized or keyworded
+                if usage is None or not usage.exhausted:
+                    inferred_ops = enricher.last_operation.get("operations", [])
+                    status_updates: dict[str, bool] = {}
+                    if "summarize_items" in inferred_ops:
+                        status_updates["has_summaries"] = True
+                        status_updates["is_hierarchical"] = True
+                    if "find_search_keywords" in inferred_ops:
+                        status_updates["has_keywords"] = True
+                    if status_updates:
+                        library.update_status(doc_id, **status_updates)
+                self._update_library_meta(doc_id, enriched_doc, library)
+                if not self._charge_enrichment_budget(enricher, remaining):
+                    log_warning(f"Enrichment budget spent after {doc.name!r}; remaining sources are not enriched")
+                    enriched_pairs.extend(source_pairs[index + 1 :])
+                    break
         else:
             ops: list[str] = list(task.operations)
-            enriched_pairs = self._ensure_enriched(source_pairs, library, operations=ops)
+            enriched_pairs = self._ensure_enriched(
+                source_pairs,
+                library,
+                operations=ops,
+                enricher=self._make_enricher(task),
+            )
 
         # Return: single doc → return it directly; multiple → a composite summary doc
         if len(enriched_pairs) == 1:
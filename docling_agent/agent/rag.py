@@ -1,7 +1,7 @@
 """Chunkless RAG agent using DoclingDocument tree structure and per-node summaries."""
 
 from pathlib import Path
-from typing import Any, ClassVar
+from typing import Any, ClassVar, Literal
 
 from docling_core.experimental.serializer.outline import (
     OutlineDocSerializer,
@@ -31,11 +31,14 @@ from docling_agent.agent.base_functions import (
     find_json_dicts,
     get_item_by_ref,
 )
+from docling_agent.agent.lexical import BM25Index
 from docling_agent.agent.rag_models import (
     AnswerAttempt,
+    RAGIndex,
     RAGIteration,
     RAGResult,
     SectionSelection,
+    SectionSpan,
 )
 from docling_agent.logging import log_debug, log_info, log_warning
 
@@ -59,6 +62,11 @@ class DoclingRAGAgent(BaseDoclingAgent):
 
     max_iterations: int = 5
     verbose: bool = False
+    # How the next section is chosen: the LLM over the whole outline ("llm"), the LLM over a
+    # BM25 shortlist when enough sections match the query lexically ("hybrid"), or the best
+    # BM25 match without any LLM call ("lexical")
+    selection_mode: Literal["llm", "hybrid", "lexical"] = "llm"
+    shortlist_size: int = 10
 
     def __init__(
         self,
@@ -67,6 +75,8 @@ class DoclingRAGAgent(BaseDoclingAgent):
         backend=None,
         max_iterations: int = 5,
         verbose: bool = False,
+        selection_mode: Literal["llm", "hybrid", "lexical"] = "llm",
+        shortlist_size: int = 10,
     ):
         super().__init__(
             agent_type=DoclingAgentType.DOCLING_DOCUMENT_RAG,
@@ -75,6 +85,8 @@ class DoclingRAGAgent(BaseDoclingAgent):
         )
         self.max_iterations = max_iterations
         self.verbose = verbose
+        self.selection_mode = selection_mode
+        self.shortlist_size = shortlist_size
         self._console = Console(highlight=False) if verbose else None
 
     def _rprint(self, renderable: Any) -> None:
@@ -95,11 +107,14 @@ class DoclingRAGAgent(BaseDoclingAgent):
         if not docs:
             raise ValueError("DoclingRAGAgent requires at least one DoclingDocument.")
 
+        # Prebuilt indexes (e.g. loaded from the library), aligned with the documents
+        indexes: list[RAGIndex | None] = kwargs.get("indexes") or [None] * len(docs)
+
         per_doc_answers: list[str] = []
         all_iterations: list[RAGIteration] = []
 
-        for doc in docs:
-            result = self._rag_loop(query=task, doc=doc)
+        for doc, index in zip(docs, indexes, strict=True):
+            result = self._rag_loop(query=task, doc=doc, index=index)
             per_doc_answers.append(result.answer)
             all_iterations.extend(result.iterations)
             log_info(f"RAG loop finished: converged={result.converged}, iterations={len(result.iterations)}")
@@ -118,15 +133,17 @@ class DoclingRAGAgent(BaseDoclingAgent):
     # RAG loop
     # ------------------------------------------------------------------
 
-    def _rag_loop(self, *, query: str, doc: DoclingDocument) -> RAGResult:
+    def _rag_loop(self, *, query: str, doc: DoclingDocument, index: RAGIndex | None = None) -> RAGResult:
         m = self._create_reasoning_session(system_prompt=self._RAG_SYSTEM_PROMPT)
 
         visited: set[str] = set()
         iterations: list[RAGIteration] = []
 
-        outline_text = create_document_outline(doc, format=OutlineFormat.MARKDOWN)
+        index = index or self.build_index(doc)
+        outline_text = index.outline
         log_debug(f"[RAG OUTLINE — {doc.name!r}]\n{outline_text}")
-        valid_refs = self._extract_section_refs(doc)
+        valid_refs = set(index.section_refs)
+        ranking = self._rank_sections(query=query, index=index) if self.selection_mode != "llm" else {}
 
         self._rprint(Rule(f"[bold cyan]RAG loop — {doc.name!r}[/bold cyan]"))
         self._rprint(
@@ -161,11 +178,11 @@ class DoclingRAGAgent(BaseDoclingAgent):
 
             self._rprint(Rule(f"[bold]Iteration {i + 1} / {self.max_iterations}[/bold]"))
 
-            selection = self._select_section(
+            selection = self._next_section(
                 m=m,
                 query=query,
-                outline_text=outline_text,
-                valid_refs=valid_refs,
+                index=index,
+                ranking=ranking,
                 visited=visited,
             )
             visited.add(selection.section_ref)
@@ -178,7 +195,7 @@ class DoclingRAGAgent(BaseDoclingAgent):
                 )
             )
 
-            section_text = self._get_section_content(doc, selection.section_ref)
+            section_text = index.section_text(selection.section_ref)
             preview = section_text[:300].replace("\n", " ") + (" …" if len(section_text) > 300 else "")
             self._rprint(
                 Panel(
@@ -256,6 +273,70 @@ class DoclingRAGAgent(BaseDoclingAgent):
             converged=False,
         )
 
+    # ------------------------------------------------------------------
+    # Index
+    # ------------------------------------------------------------------
+
+    def build_index(self, doc: DoclingDocument) -> RAGIndex:
+        """Precompute the outline, section refs and section spans the RAG loop reads.
+
+        The item texts and the span of every section are collected in a single
+        pass over the document instead of one scan per section.
+        """
+        texts, section_spans = self._collect_section_spans(doc)
+        return RAGIndex(
+            outline=create_document_outline(doc, format=OutlineFormat.MARKDOWN),
+            section_refs=list(section_spans),
+            texts=texts,
+            section_spans=section_spans,
+            section_labels={ref: self._section_label(doc, ref) for ref in section_spans},
+        )
+
+    def _section_label(self, doc: DoclingDocument, ref: str) -> str:
+        """One-line description of a section: its heading, summary and keywords when enriched."""
+        node = get_item_by_ref(doc, ref)
+        parts = [getattr(node, "text", "") or ""]
+        meta = getattr(node, "meta", None)
+        if meta is not None:
+            if meta.summary is not None and meta.summary.text:
+                parts.append(meta.summary.text)
+            keywords = getattr(meta, "docling_agent__keywords", None)
+            if keywords:
+                parts.append(f"keywords: {', '.join(map(str, keywords))}")
+        return " — ".join(part for part in parts if part)
+
+    def _collect_section_spans(self, doc: DoclingDocument) -> tuple[list[str], dict[str, SectionSpan]]:
+        """Item texts in reading order and the span of every section, as :meth:`_get_section_content` reads it.
+
+        A flat section runs until the next section heading at the same or a higher
+        level; a hierarchical section (one with children) covers its subtree.
+        """
+        texts: list[str] = []
+        spans: dict[str, SectionSpan] = {}
+        open_sections: list[tuple[str, int, bool]] = []  # (ref, depth, hierarchical) of the unfinished sections
+
+        for item, depth in doc.iterate_items():
+            is_section = isinstance(item, TitleItem | SectionHeaderItem)
+            still_open = []
+            for ref, section_depth, hierarchical in open_sections:
+                if depth <= section_depth and (hierarchical or is_section):
+                    spans[ref].end = len(texts)
+                else:
+                    still_open.append((ref, section_depth, hierarchical))
+            open_sections = still_open
+            if is_section:
+                hierarchical = len(item.children or []) > 0
+                spans[item.self_ref] = SectionSpan(
+                    start=len(texts), end=len(texts), separator="\n" if hierarchical else "\n\n"
+                )
+                open_sections.append((item.self_ref, depth, hierarchical))
+            if hasattr(item, "text") and item.text:
+                texts.append(item.text)
+
+        for ref, _, _ in open_sections:
+            spans[ref].end = len(texts)
+        return texts, spans
+
     # ------------------------------------------------------------------
     # Outline
     # ------------------------------------------------------------------
@@ -278,6 +359,51 @@ class DoclingRAGAgent(BaseDoclingAgent):
     # Section selection
     # ------------------------------------------------------------------
 
+    def _rank_sections(self, *, query: str, index: RAGIndex) -> dict[str, tuple[int, float]]:
+        """BM25 rank and score of every section for *query*; ties keep the reading order."""
+        refs = index.section_refs
+        lexical = BM25Index([f"{index.section_labels.get(ref, '')}\n{index.section_text(ref)}" for ref in refs])
+        scores = lexical.scores(query)
+        order = sorted(range(len(refs)), key=lambda position: -scores[position])
+        return {refs[position]: (rank, float(scores[position])) for rank, position in enumerate(order)}
+
+    def _next_section(
+        self,
+        *,
+        m: Any,
+        query: str,
+        index: RAGIndex,
+        ranking: dict[str, tuple[int, float]],
+        visited: set[str],
+    ) -> SectionSelection:
+        valid_refs = set(index.section_refs)
+        if self.selection_mode == "llm":
+            return self._select_section(
+                m=m, query=query, outline_text=index.outline, valid_refs=valid_refs, visited=visited
+            )
+
+        ranked = sorted(valid_refs - visited, key=lambda ref: ranking[ref][0])
+        if self.selection_mode == "lexical":
+            rank, score = ranking[ranked[0]]
+            return SectionSelection(reason=f"lexical rank {rank + 1} (BM25 score {score:.2f})", section_ref=ranked[0])
+
+        # Without a full shortlist of lexical matches (e.g. the query paraphrases the document),
+        # the ranking says nothing about the other sections: the LLM sees the whole outline
+        candidates = ranked[: self.shortlist_size]
+        if len(ranked) <= self.shortlist_size or any(ranking[ref][1] <= 0 for ref in candidates):
+            return self._select_section(
+                m=m, query=query, outline_text=index.outline, valid_refs=valid_refs, visited=visited
+            )
+        log_debug("Shortlisted sections", candidates=candidates)
+        return self._select_section(
+            m=m,
+            query=query,
+            outline_text="\n".join(f"- {ref}: {index.section_labels.get(ref, '')}" for ref in candidates),
+            valid_refs=set(candidates),
+            visited=set(),
+            shortlist=True,
+        )
+
     def _select_section(
         self,
         *,
@@ -286,13 +412,22 @@ class DoclingRAGAgent(BaseDoclingAgent):
         outline_text: str,
         valid_refs: set[str],
         visited: set[str],
+        shortlist: bool = False,
     ) -> SectionSelection:
         unvisited = sorted(valid_refs - visited)
 
+        if shortlist:
+            context = (
+                f"Candidate sections, best lexical matches first (ref: heading, summary, keywords):\n{outline_text}"
+            )
+        else:
+            context = (
+                f"Document outline (with summaries):\n{outline_text}\n\n"
+                f"Already consulted section refs: {sorted(visited) or 'none'}"
+            )
         prompt = (
             f"Query: {query}\n\n"
-            f"Document outline (with summaries):\n{outline_text}\n\n"
-            f"Already consulted section refs: {sorted(visited) or 'none'}\n\n"
+            f"{context}\n\n"
             f"Unvisited section refs to choose from: {unvisited}\n\n"
             "Select the single most relevant UNVISITED section ref to consult next. "
             "Return a JSON object in a ```json``` block with exactly two keys:\n"
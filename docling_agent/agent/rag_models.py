@@ -1,6 +1,6 @@
 """Pydantic data models for the chunkless RAG loop."""
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class SectionSelection(BaseModel):
@@ -34,3 +34,33 @@ class RAGResult(BaseModel):
     answer: str
     iterations: list[RAGIteration]
     converged: bool  # True if can_answer was reached; False if max_iterations hit
+
+
+class SectionSpan(BaseModel):
+    """Range of :attr:`RAGIndex.texts` that makes up the text of one section."""
+
+    start: int
+    end: int  # exclusive
+    separator: str = "\n\n"  # "\n" for the subtree of a hierarchical section
+
+
+class RAGIndex(BaseModel):
+    """Per-document artifact of the RAG loop, built once and reused across queries.
+
+    Every item text is stored once in :attr:`texts`; sections refer to it by span,
+    so nested sections do not repeat the text of their subsections.
+    """
+
+    content_hash: str | None = None  # hash of the document JSON the index was built from (set by the library)
+    outline: str  # markdown outline shown to the LLM for section selection
+    section_refs: list[str]  # refs of the title and section headings, in reading order
+    texts: list[str] = Field(default_factory=list)  # non-empty item texts in reading order
+    section_spans: dict[str, SectionSpan] = Field(default_factory=dict)  # section ref → span read when selected
+    section_labels: dict[str, str] = Field(default_factory=dict)  # section ref → heading, summary and keywords
+
+    def section_text(self, ref: str) -> str:
+        """Text read when the section *ref* is selected, or "" for an unknown ref."""
+        span = self.section_spans.get(ref)
+        if span is None:
+            return ""
+        return span.separator.join(self.texts[span.start : span.end])
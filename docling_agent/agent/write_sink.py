@@ -0,0 +1,101 @@
+"""Incremental on-disk output for long writing runs.
+
+:class:`IncrementalWritingSink` is passed as ``progress_callback`` to
+:meth:`DoclingWritingAgent.run`. While the report is written, the markdown file
+grows item by item, the JSON file holds the document written so far and a
+``.progress.json`` file next to them holds everything needed to resume the run
+after a crash. The progress file is removed once the document is finished.
+"""
+
+from collections.abc import Iterable
+from pathlib import Path
+
+from docling_core.transforms.serializer.markdown import MarkdownDocSerializer
+from docling_core.types.doc.document import DoclingDocument
+
+from docling_agent.agent.base_functions import atomic_write_text
+from docling_agent.agent.writer import WritingProgress
+from docling_agent.logging import log_debug, log_info, log_warning
+
+
+class IncrementalWritingSink:
+    """Stream the document of a writing run to ``<base>.md`` and ``<base>.json``.
+
+    Markdown is appended as items are merged (the file is rewritten only when an
+    item changes earlier output, e.g. a list continued across items); JSON is
+    replaced atomically after each item. HTML is only written at the end by the
+    caller, since it cannot be inspected partially.
+    """
+
+    PROGRESS_SUFFIX = ".progress.json"
+
+    def __init__(self, base_path: Path, formats: Iterable[str] = ("markdown", "json")) -> None:
+        self.base_path = base_path
+        self.formats = set(formats)
+        self._markdown: str | None = None
+
+    @property
+    def markdown_path(self) -> Path:
+        return self._path(".md")
+
+    @property
+    def json_path(self) -> Path:
+        return self._path(".json")
+
+    @property
+    def progress_path(self) -> Path:
+        return self._path(self.PROGRESS_SUFFIX)
+
+    def _path(self, suffix: str) -> Path:
+        return self.base_path.parent / f"{self.base_path.name}{suffix}"
+
+    @classmethod
+    def find_unfinished(cls, directory: Path, stem: str) -> Path | None:
+        """Base path of the most recent unfinished run named ``<stem>_*`` in *directory*, if any."""
+        candidates = sorted(
+            directory.glob(f"{stem}_*{cls.PROGRESS_SUFFIX}"),
+            key=lambda path: path.stat().st_mtime,
+        )
+        if not candidates:
+            return None
+        latest = candidates[-1]
+        return latest.with_name(latest.name[: -len(cls.PROGRESS_SUFFIX)])
+
+    def load_progress(self, *, task: str) -> WritingProgress | None:
+        """Progress of an interrupted run of *task* at this path, or None to start from scratch."""
+        if not self.progress_path.exists():
+            return None
+        try:
+            progress = WritingProgress.model_validate_json(self.progress_path.read_text(encoding="utf-8"))
+        except Exception as exc:
+            log_warning("Ignoring unreadable writing progress", path=str(self.progress_path), exception=exc)
+            return None
+        if progress.task != task:
+            log_warning("Ignoring writing progress of a different task", path=str(self.progress_path))
+            return None
+        log_info("Found writing progress to resume from", path=str(self.progress_path), completed=progress.completed)
+        return progress
+
+    def __call__(self, progress: WritingProgress) -> None:
+        document = progress.document
+        if "markdown" in self.formats:
+            self._write_markdown(document)
+        if "json" in self.formats:
+            atomic_write_text(self.json_path, document.model_dump_json(indent=2))
+
+        if progress.finished:
+            self.progress_path.unlink(missing_ok=True)
+            log_info("Streamed document complete", path=str(self.base_path))
+        else:
+            atomic_write_text(self.progress_path, progress.model_dump_json())
+            log_debug("Streamed writing progress", completed=progress.completed)
+
+    def _write_markdown(self, document: DoclingDocument) -> None:
+        markdown = MarkdownDocSerializer(doc=document).serialize().text
+        previous = self._markdown
+        if previous is not None and markdown.startswith(previous):
+            with self.markdown_path.open("a", encoding="utf-8") as handle:
+                handle.write(markdown[len(previous) :])
+        else:
+            atomic_write_text(self.markdown_path, markdown)
+        self._markdown = markdown
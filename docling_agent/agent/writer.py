@@ -1,12 +1,11 @@
 import json
 import re
+from collections.abc import Callable, Iterator
 from pathlib import Path
 from re import Pattern
 from typing import ClassVar, cast
 
 from docling.datamodel.base_models import InputFormat
-from docling.datamodel.document import ConversionResult
-from docling.document_converter import DocumentConverter
 from docling_core.types.doc.document import (
     BaseMeta,
     CodeLanguageLabel,
@@ -18,7 +17,6 @@ from docling_core.types.doc.document import (
     ListItem,
     NodeItem,
     PictureClassificationMetaField,
-    PictureClassificationPrediction,
     PictureItem,
     PictureMeta,
     SectionHeaderItem,
@@ -30,9 +28,13 @@ from docling_core.types.doc.document import (
     TitleItem,
 )
 from mellea.stdlib.requirements import Requirement, simple_validate
+from pydantic import BaseModel, Field, PrivateAttr
 
 from docling_agent.agent.base import BaseDoclingAgent, DoclingAgentType
 from docling_agent.agent.base_functions import (
+    classification_from_labels,
+    classify_picture_contexts,
+    collect_section_passages,
     collect_subtree_text,
     convert_html_to_docling_document,
     convert_markdown_to_docling_document,
@@ -40,16 +42,22 @@ from docling_agent.agent.base_functions import (
     has_html_code_block,
     has_markdown_code_block,
     make_hierarchical_document,
+    parse_and_cache,
+    precheck_markdown,
     serialize_table_to_html,
+    take_or_parse,
     validate_html_to_docling_document,
     validate_markdown_to_docling_document,
 )
+from docling_agent.agent.lexical import BM25Index
+from docling_agent.backends.base import BaseSession
 from docling_agent.logging import (
     agent_context,
     log_agent_end,
     log_agent_start,
     log_debug,
     log_error,
+    log_info,
     log_stage_end,
     log_stage_start,
     log_warning,
@@ -65,6 +73,20 @@ from docling_agent.resources.prompts import (
 )
 
 
+class WritingProgress(BaseModel):
+    """State of a writing run after an outline item was merged; enough to resume the run."""
+
+    task: str = Field(description="Writing task of the run.")
+    outline: DoclingDocument = Field(description="Outline being written.")
+    document: DoclingDocument = Field(description="Document written so far.")
+    completed: int = Field(
+        description="Number of outline items (in `iterate_items(with_groups=True)` order) merged into `document`."
+    )
+    finished: bool = Field(
+        default=False, description="Whether all items, table captions and picture metadata are written."
+    )
+
+
 class DoclingWritingAgent(BaseDoclingAgent):
     task_analysis: DoclingDocument = DoclingDocument(name="report")
 
@@ -104,16 +126,29 @@ class DoclingWritingAgent(BaseDoclingAgent):
         {"bar-chart", "line-chart", "pie-chart", "scatter-chart", "spider-chart"}
     )
 
+    # Pictures classified per prompt once the document content is written
+    picture_batch_size: int = 20
+    # Python code for pictures is opt-in; it can also be added later with the enricher's "code" operation
+    generate_picture_code: bool = False
+    # Source passages retrieved into the prompt of every paragraph, table and list when sources are given
+    grounding_top_k: int = 3
+    grounding_passage_chars: int = 1500
+
+    _passages: list[str] = PrivateAttr(default_factory=list)
+    _passage_index: BM25Index | None = PrivateAttr(default=None)
+
     def __init__(
         self,
         *,
         tools: list,
         backend=None,
+        session_wrapper: Callable[[BaseSession], BaseSession] | None = None,
     ):
         super().__init__(
             agent_type=DoclingAgentType.DOCLING_DOCUMENT_WRITER,
             backend=backend or self.default_backend(),
             tools=tools,
+            session_wrapper=session_wrapper,
         )
 
     def run(
@@ -123,27 +158,72 @@ class DoclingWritingAgent(BaseDoclingAgent):
         sources: list[DoclingDocument | Path] | None = None,
         **kwargs,
     ) -> DoclingDocument:
+        """Write a document for *task*, optionally grounded in *sources*.
+
+        Keyword Args:
+            progress_callback: Optional ``callback(progress)`` receiving a :class:`WritingProgress`
+                after each merged outline item and once the document is finished, e.g. to stream
+                the document to disk.
+            resume_from: :class:`WritingProgress` of an interrupted run; its outline is reused and
+                only the outline items it did not complete are written.
+        """
         # Avoid mutable default list for sources
         sources = sources or []
+        progress_callback: Callable[[WritingProgress], None] | None = kwargs.get("progress_callback")
+        resume_from: WritingProgress | None = kwargs.get("resume_from")
 
         with agent_context("WriterAgent"):
             log_agent_start("Starting document writing", task=task[:100])
 
+            # Index the source documents once; every outline item retrieves its own passages
+            self._index_sources(sources=[s for s in sources if isinstance(s, DoclingDocument)])
+
             # Plan an outline for the document
-            with operation_context("outline_generation"):
-                log_stage_start("Planning document outline")
-                outline: DoclingDocument = self._make_outline_for_writing(task=task)
-                log_stage_end("Document outline created")
+            if resume_from is not None:
+                outline: DoclingDocument = resume_from.outline
+            else:
+                with operation_context("outline_generation"):
+                    log_stage_start("Planning document outline")
+                    outline = self._make_outline_for_writing(task=task)
+                    log_stage_end("Document outline created")
 
             # Write the actual document item by item
             with operation_context("content_generation"):
                 log_stage_start("Writing document content")
-                result_document: DoclingDocument = self._populate_document_with_content(task=task, outline=outline)
+                result_document: DoclingDocument = self._populate_document_with_content(
+                    task=task,
+                    outline=outline,
+                    progress_callback=progress_callback,
+                    resume_from=resume_from,
+                )
                 log_stage_end("Document content written")
 
             log_agent_end("Document writing complete", items=len(list(result_document.iterate_items())))
             return result_document
 
+    def _index_sources(self, *, sources: list[DoclingDocument]) -> None:
+        self._passages = []
+        for source in sources:
+            for _, passage in collect_section_passages(source, max_chars=self.grounding_passage_chars):
+                self._passages.append(f"[{source.name}]\n{passage}")
+        self._passage_index = BM25Index(self._passages) if self._passages else None
+        if self._passages:
+            log_info("Indexed source passages for grounded writing", sources=len(sources), passages=len(self._passages))
+
+    def _grounding_context(self, *, summary: str, hierarchy: dict[int, str]) -> str:
+        """Prompt section with the source passages most relevant to one outline item, if sources were given."""
+        if self._passage_index is None or self.grounding_top_k <= 0:
+            return ""
+        query = " ".join([*hierarchy.values(), summary])
+        hits = self._passage_index.search(query, top_k=self.grounding_top_k)
+        if not hits:
+            return ""
+        passages = "\n\n".join(self._passages[index] for index, _ in hits)
+        return (
+            "Base the content on the following passages from the source documents "
+            f"and do not contradict them:\n\n```markdown\n{passages}\n```\n\n"
+        )
+
     def _analyse_task_for_final_destination(self, *, task: str):
         return
 
@@ -177,8 +257,12 @@ class DoclingWritingAgent(BaseDoclingAgent):
         return outline
 
     def _summarize_outline_sections(self, *, outline: DoclingDocument, loop_budget: int = 5) -> None:
-        m = self._create_reasoning_session(system_prompt=self.system_prompt_expert_writer)
+        """Summarize every title and section header of *outline* that has enough content.
 
+        Each summary gets its own session, so no prompt carries the history of the
+        other sections, and the summaries are generated concurrently.
+        """
+        sections: dict[str, tuple[NodeItem, str]] = {}
         for item, _ in outline.iterate_items(with_groups=True):
             if not isinstance(item, TitleItem | SectionHeaderItem):
                 continue
@@ -186,16 +270,21 @@ class DoclingWritingAgent(BaseDoclingAgent):
             section_text = collect_subtree_text(item, outline).strip()
             if len(section_text) < 40:
                 continue
+            sections[item.self_ref] = (item, section_text)
 
-            summary = self._generate_section_summary(
-                m=m,
-                title=item.text,
-                text=section_text,
+        for ref, summary in self.backend.map_concurrently(
+            lambda ref: self._generate_section_summary(
+                m=self._create_reasoning_session(system_prompt=self.system_prompt_expert_writer),
+                title=cast(TextItem, sections[ref][0]).text,
+                text=sections[ref][1],
                 loop_budget=loop_budget,
-            )
+            ),
+            sections,
+        ):
             if not summary:
                 continue
 
+            item = sections[ref][0]
             if item.meta is None:
                 item.meta = BaseMeta()
             item.meta.summary = self._summary_meta(summary)
@@ -246,21 +335,25 @@ class DoclingWritingAgent(BaseDoclingAgent):
         if not md:
             log_error("could not find markdown block in content")
             return False
+        if not precheck_markdown(md):
+            return False
 
-        # Parse markdown to DoclingDocument
+        # Parse markdown to DoclingDocument; `_find_outline` reuses the parse of the accepted outline
         try:
-            converter = DocumentConverter(allowed_formats=[InputFormat.MD])
-            conv: ConversionResult = converter.convert_string(content=md, format=InputFormat.MD, name="outline.md")
+            parsed = parse_and_cache(md, InputFormat.MD)
         except Exception as e:
             log_error("could not convert markdown", exception=e)
             return False
+        if parsed is None:
+            log_error("could not convert markdown")
+            return False
 
         pattern = DoclingWritingAgent._OUTLINE_LINE_PATTERN
 
         invalid_lines: list[str] = []
 
         # Validate content lines: only TextItem lines are checked
-        for item, _ in conv.document.iterate_items(with_groups=True):
+        for item, _ in parsed.iterate_items(with_groups=True):
             if isinstance(item, TitleItem) or isinstance(item, SectionHeaderItem):
                 continue
             elif isinstance(item, TextItem):
@@ -278,18 +371,18 @@ class DoclingWritingAgent(BaseDoclingAgent):
         if not md:
             return None
 
-        converter = DocumentConverter(allowed_formats=[InputFormat.MD])
-
-        conv: ConversionResult = converter.convert_string(content=md, format=InputFormat.MD, name=f"outline for {task}")
+        parsed = take_or_parse(md, InputFormat.MD)
+        if parsed is None:
+            return None
 
         # Build a fresh outline document rather than deep-copying content
-        outline = DoclingDocument(name=f"outline for: {conv.document.name}")
+        outline = DoclingDocument(name=f"outline for: {task}")
 
         invalid_lines: list[str] = []
 
         pattern = self._OUTLINE_LINE_PATTERN
 
-        for item, level in conv.document.iterate_items(with_groups=True):
+        for item, level in parsed.iterate_items(with_groups=True):
             if isinstance(item, TitleItem):
                 outline.add_title(text=item.text)
 
@@ -358,22 +451,203 @@ class DoclingWritingAgent(BaseDoclingAgent):
         return outline
 
     def _populate_document_with_content(
-        self, *, task: str, outline: DoclingDocument, loop_budget: int = 5
+        self,
+        *,
+        task: str,
+        outline: DoclingDocument,
+        loop_budget: int = 5,
+        progress_callback: Callable[[WritingProgress], None] | None = None,
+        resume_from: WritingProgress | None = None,
     ) -> DoclingDocument:
+        """Write the content of every *outline* item and merge it into a new document, in outline order.
+
+        Items are merged as soon as they and all items before them are written, and
+        *progress_callback* receives a :class:`WritingProgress` after each merged item and
+        once more when the document is finished. With *resume_from*, the outline items it
+        already completed are kept and only the remaining ones are written.
+        """
         headers: dict[int, str] = {}
+        pending_pictures: list[tuple[PictureItem, str]] = []
+        pending_captions: list[tuple[TextItem, str, str | None]] = []
+
+        items = [item for item, _ in outline.iterate_items(with_groups=True)]
+        completed = 0
+        if resume_from is not None:
+            document = resume_from.document
+            completed = min(resume_from.completed, len(items))
+            for item in items[:completed]:
+                headers = self._replay_headers(item=item, headers=headers)
+            self._requeue_deferred(
+                document=document, pending_pictures=pending_pictures, pending_captions=pending_captions
+            )
+            log_info("Resuming document writing", completed=completed, total=len(items))
+        else:
+            document = DoclingDocument(name=f"report on task: {task}")
+
+        def report(*, finished: bool = False) -> None:
+            if progress_callback is not None:
+                progress_callback(
+                    WritingProgress(
+                        task=task, outline=outline, document=document, completed=completed, finished=finished
+                    )
+                )
 
-        document = DoclingDocument(name=f"report on task: {task}")
+        # Every paragraph, table and list only depends on its own summary and header hierarchy,
+        # so they are all written concurrently; each is merged once all items before it are merged
+        written: dict[str, DoclingDocument | None] = {}
+        for ref, content in self._write_outline_contents(
+            outline=outline, loop_budget=loop_budget, skip={item.self_ref for item in items[:completed]}
+        ):
+            written[ref] = content
+            while completed < len(items) and (
+                items[completed].self_ref in written or not self._needs_content(items[completed])
+            ):
+                headers = self._process_outline_item(
+                    document=document,
+                    headers=headers,
+                    item=items[completed],
+                    loop_budget=loop_budget,
+                    pending_pictures=pending_pictures,
+                    written=written,
+                    pending_captions=pending_captions,
+                )
+                completed += 1
+                report()
 
-        for item, _ in outline.iterate_items(with_groups=True):
+        # Items without generated content (e.g. without a summary) are merged here
+        while completed < len(items):
             headers = self._process_outline_item(
                 document=document,
                 headers=headers,
-                item=item,
+                item=items[completed],
                 loop_budget=loop_budget,
+                pending_pictures=pending_pictures,
+                written=written,
+                pending_captions=pending_captions,
             )
+            completed += 1
+            report()
+
+        # Table captions are generated for all tables at once, once their content is merged
+        if pending_captions:
+            self._complete_table_captions(captions=pending_captions)
 
+        # Picture metadata is generated for all pictures at once, after the text is written
+        if pending_pictures:
+            self._complete_picture_meta(pictures=pending_pictures, loop_budget=loop_budget)
+
+        report(finished=True)
         return document
 
+    def _replay_headers(self, *, item: NodeItem, headers: dict[int, str]) -> dict[int, str]:
+        """Header hierarchy after an already written outline *item*."""
+        if isinstance(item, TitleItem):
+            headers[0] = item.text
+        elif isinstance(item, SectionHeaderItem):
+            headers = self._update_headers(item=item, headers=headers)
+        return headers
+
+    def _requeue_deferred(
+        self,
+        *,
+        document: DoclingDocument,
+        pending_pictures: list[tuple[PictureItem, str]],
+        pending_captions: list[tuple[TextItem, str, str | None]],
+    ) -> None:
+        """Queue the captions and picture metadata an interrupted run left unfinished in *document*.
+
+        Pictures get the header hierarchy they were written under, as in an uninterrupted run.
+        """
+        for table in document.tables:
+            caption = table.captions[0].resolve(document) if table.captions else None
+            if isinstance(caption, TextItem) and not caption.text:
+                summary = table.meta.summary.text if table.meta and table.meta.summary else None
+                pending_captions.append((caption, serialize_table_to_html(table=table, doc=document), summary))
+        headers: dict[int, str] = {}
+        for item, _ in document.iterate_items():
+            headers = self._replay_headers(item=item, headers=headers)
+            meta = item.meta
+            if (
+                isinstance(item, PictureItem)
+                and isinstance(meta, PictureMeta)
+                and meta.summary
+                and not meta.classification
+            ):
+                pending_pictures.append((item, self._picture_context(summary=meta.summary.text, hierarchy=headers)))
+
+    def _needs_content(self, item: NodeItem) -> bool:
+        return self._content_kind(item) is not None and bool(item.meta and item.meta.summary and item.meta.summary.text)
+
+    def _content_kind(self, item: NodeItem) -> str | None:
+        if isinstance(item, TitleItem | SectionHeaderItem):
+            return None
+        if isinstance(item, TextItem) and item.label != DocItemLabel.CAPTION:
+            return "paragraph"
+        if isinstance(item, TableItem):
+            return "table"
+        if isinstance(item, GroupItem) and item.label == GroupLabel.LIST:
+            return "list"
+        return None
+
+    def _content_jobs(
+        self, *, outline: DoclingDocument, skip: set[str] | None = None
+    ) -> dict[str, tuple[str, str, dict[int, str]]]:
+        """Kind, summary and header hierarchy of every outline item that needs generated content, keyed by ``self_ref``.
+
+        Items in *skip* (e.g. written by an interrupted run) get no job.
+        """
+        headers: dict[int, str] = {}
+        jobs: dict[str, tuple[str, str, dict[int, str]]] = {}
+        for item, _ in outline.iterate_items(with_groups=True):
+            headers = self._replay_headers(item=item, headers=headers)
+            kind = self._content_kind(item)
+            if kind is None or (skip and item.self_ref in skip):
+                continue
+
+            # Items without a summary are reported and skipped when the document is assembled
+            if item.meta and item.meta.summary and item.meta.summary.text:
+                jobs[item.self_ref] = (kind, item.meta.summary.text, self._ordered_hierarchy(headers))
+        return jobs
+
+    def _write_outline_contents(
+        self, *, outline: DoclingDocument, loop_budget: int, skip: set[str] | None = None
+    ) -> Iterator[tuple[str, DoclingDocument | None]]:
+        """Generate the content of the paragraphs, tables and lists of *outline* concurrently.
+
+        Yields ``(self_ref, content)`` pairs in completion order.
+        """
+        jobs = self._content_jobs(outline=outline, skip=skip)
+        if not jobs:
+            return
+
+        log_debug("Writing outline items concurrently", items=len(jobs), max_concurrency=self.backend.max_concurrency)
+        yield from self.backend.map_concurrently(
+            lambda ref: self._write_content(
+                kind=jobs[ref][0],
+                summary=jobs[ref][1],
+                hierarchy=jobs[ref][2],
+                loop_budget=loop_budget,
+            ),
+            jobs,
+        )
+
+    def _write_content(
+        self,
+        *,
+        kind: str,
+        summary: str,
+        hierarchy: dict[int, str],
+        loop_budget: int,
+    ) -> DoclingDocument | None:
+        if kind == "paragraph":
+            return self._write_paragraph(summary=summary, hierarchy=hierarchy, loop_budget=loop_budget)
+        if kind == "table":
+            return self._write_table(summary=summary, hierarchy=hierarchy, loop_budget=loop_budget)
+        if kind == "list":
+            return self._write_list(summary=summary, hierarchy=hierarchy, loop_budget=loop_budget)
+        log_warning("Unsupported content kind", kind=kind)
+        return None
+
     def _ordered_hierarchy(self, headers: dict[int, str]) -> dict[int, str]:
         return {lvl: headers[lvl] for lvl in sorted(headers.keys())}
 
@@ -397,16 +671,18 @@ class DoclingWritingAgent(BaseDoclingAgent):
         headers: dict[int, str],
         document: DoclingDocument,
         loop_budget: int,
+        content: DoclingDocument | None = None,
+        pending_captions: list[tuple[TextItem, str, str | None]] | None = None,
     ) -> None:
-        h = self._ordered_hierarchy(headers)
-        if kind == "paragraph":
-            content = self._write_paragraph(summary=summary, hierarchy=h, loop_budget=loop_budget)
-        elif kind == "table":
-            content = self._write_table(summary=summary, hierarchy=h, loop_budget=loop_budget)
-        elif kind == "list":
-            content = self._write_list(summary=summary, hierarchy=h, loop_budget=loop_budget)
-        else:
-            log_warning("Unsupported content kind", kind=kind)
+        """Merge *content* into *document*, writing it first when it was not generated beforehand."""
+        if content is None:
+            content = self._write_content(
+                kind=kind,
+                summary=summary,
+                hierarchy=self._ordered_hierarchy(headers),
+                loop_budget=loop_budget,
+            )
+        if content is None:
             return
 
         self._update_document_with_content(
@@ -414,6 +690,7 @@ class DoclingWritingAgent(BaseDoclingAgent):
             content=content,
             summary=summary,
             summary_scope=kind,
+            pending_captions=pending_captions,
         )
 
     def _update_headers(self, *, item: SectionHeaderItem, headers: dict[int, str]) -> dict[int, str]:
@@ -429,7 +706,18 @@ class DoclingWritingAgent(BaseDoclingAgent):
         headers: dict[int, str],
         item: NodeItem,
         loop_budget: int,
+        pending_pictures: list[tuple[PictureItem, str]] | None = None,
+        written: dict[str, DoclingDocument | None] | None = None,
+        pending_captions: list[tuple[TextItem, str, str | None]] | None = None,
     ) -> dict[int, str]:
+        """Append the content for one outline *item* to *document* and return the updated headers.
+
+        When *pending_pictures* is given, pictures only receive their summary here and are queued
+        there (with their context) for ``_complete_picture_meta``; likewise, table captions are
+        queued in *pending_captions* for ``_complete_table_captions``. Content already generated for
+        the item is taken from *written* (keyed by outline ``self_ref``) instead of being written here.
+        """
+        written = written or {}
         if isinstance(item, TitleItem):
             headers[0] = item.text
             title = document.add_title(text=item.text)
@@ -455,6 +743,8 @@ class DoclingWritingAgent(BaseDoclingAgent):
                     headers=headers,
                     document=document,
                     loop_budget=loop_budget,
+                    content=written.get(item.self_ref),
+                    pending_captions=pending_captions,
                 )
             else:
                 log_warning("Skipping paragraph without summary", text=item.text[:50])
@@ -469,6 +759,8 @@ class DoclingWritingAgent(BaseDoclingAgent):
                     headers=headers,
                     document=document,
                     loop_budget=loop_budget,
+                    content=written.get(item.self_ref),
+                    pending_captions=pending_captions,
                 )
             else:
                 log_warning("Skipping table without summary")
@@ -479,11 +771,15 @@ class DoclingWritingAgent(BaseDoclingAgent):
                 log_debug("Writing picture")
                 caption = document.add_text(label=DocItemLabel.CAPTION, text=summary)
                 picture = document.add_picture(caption=caption)
-                picture.meta = self._generate_picture_meta(
-                    summary=summary,
-                    hierarchy=headers,
-                    loop_budget=loop_budget,
-                )
+                if pending_pictures is not None:
+                    picture.meta = PictureMeta(summary=self._summary_meta(summary))
+                    pending_pictures.append((picture, self._picture_context(summary=summary, hierarchy=headers)))
+                else:
+                    picture.meta = self._generate_picture_meta(
+                        summary=summary,
+                        hierarchy=headers,
+                        loop_budget=loop_budget,
+                    )
             else:
                 log_warning("Skipping picture without summary")
 
@@ -500,6 +796,8 @@ class DoclingWritingAgent(BaseDoclingAgent):
                     headers=headers,
                     document=document,
                     loop_budget=loop_budget,
+                    content=written.get(item.self_ref),
+                    pending_captions=pending_captions,
                 )
             else:
                 log_warning("Skipping list without summary")
@@ -516,7 +814,13 @@ class DoclingWritingAgent(BaseDoclingAgent):
         content: DoclingDocument,
         summary: str | None = None,
         summary_scope: str | None = None,
+        pending_captions: list[tuple[TextItem, str, str | None]] | None = None,
     ) -> DoclingDocument:
+        """Append the items of *content* to *document*.
+
+        Tables get an LLM-written caption. With *pending_captions*, the caption is left empty
+        and queued there as ``(caption, table_html, summary)`` for ``_complete_table_captions``.
+        """
         to_item: dict[str, NodeItem] = {}
         list_summary_assigned = False
 
@@ -584,13 +888,18 @@ class DoclingWritingAgent(BaseDoclingAgent):
                     except Exception:
                         table_html = ""
 
-                    caption_text = self._generate_caption_for_table(table_html=table_html)
+                    if pending_captions is None:
+                        caption_text = self._generate_caption_for_table(table_html=table_html)
+                    else:
+                        caption_text = ""
 
                     caption = document.add_text(
                         label=DocItemLabel.CAPTION,
                         text=caption_text,
                         parent=to_item[item.parent.cref],
                     )
+                    if pending_captions is not None:
+                        pending_captions.append((caption, table_html, summary if summary_scope == "table" else None))
 
                     te = document.add_table(
                         data=item.data,
@@ -608,6 +917,27 @@ class DoclingWritingAgent(BaseDoclingAgent):
 
         return document
 
+    def _complete_table_captions(
+        self,
+        *,
+        captions: list[tuple[TextItem, str, str | None]],
+    ) -> None:
+        """Write the queued table *captions* concurrently and fill in their caption items.
+
+        A table whose caption could not be generated falls back to its summary, if any.
+        """
+        jobs = dict(enumerate(captions))
+        for index, caption_text in self.backend.map_concurrently(
+            lambda index: self._generate_caption_for_table(table_html=jobs[index][1]),
+            jobs,
+        ):
+            caption, _, summary = jobs[index]
+            if not caption_text and summary:
+                log_warning("Falling back to the table summary as caption", caption_ref=caption.self_ref)
+                caption_text = summary
+            caption.text = caption_text
+            caption.orig = caption_text
+
     def _generate_caption_for_table(self, *, table_html: str, summary: str | None = None, loop_budget: int = 3) -> str:
         """Create a concise, informative caption for a table.
 
@@ -672,16 +1002,77 @@ class DoclingWritingAgent(BaseDoclingAgent):
             if chart_meta is not None:
                 meta.tabular_chart = chart_meta
 
-        code_meta = self._generate_picture_code(
-            text=context,
-            classification=classification,
-            chart_meta=chart_meta,
+        if self.generate_picture_code:
+            code_meta = self._generate_picture_code(
+                text=context,
+                classification=classification,
+                chart_meta=chart_meta,
+                loop_budget=loop_budget,
+            )
+            if code_meta is not None:
+                meta.code = code_meta
+
+        return meta
+
+    def _complete_picture_meta(
+        self,
+        *,
+        pictures: list[tuple[PictureItem, str]],
+        loop_budget: int,
+    ) -> None:
+        """Classify all *pictures* in batches, then extract chart data (and optionally code) concurrently."""
+        items = {picture.self_ref: picture for picture, _ in pictures}
+        contexts = {picture.self_ref: context for picture, context in pictures}
+
+        def picture_meta(ref: str) -> PictureMeta:
+            picture = items[ref]
+            if not isinstance(picture.meta, PictureMeta):
+                picture.meta = PictureMeta()
+            return picture.meta
+
+        chart_jobs: dict[str, str] = {}
+        classifications = classify_picture_contexts(
+            backend=self.backend,
+            contexts=contexts,
+            create_session=lambda: self._create_writing_session(system_prompt=self.system_prompt_expert_writer),
+            classify_single=lambda ref: self._classify_picture_context(text=contexts[ref], loop_budget=loop_budget),
+            class_names=self._PICTURE_CLASS_NAMES,
+            created_by=self._metadata_origin(),
+            batch_size=self.picture_batch_size,
             loop_budget=loop_budget,
         )
-        if code_meta is not None:
-            meta.code = code_meta
+        for ref, classification in classifications.items():
+            if classification is not None:
+                picture_meta(ref).classification = classification
+            chart_type = self._primary_chart_type(classification)
+            if chart_type is not None:
+                chart_jobs[ref] = chart_type
+
+        for ref, chart_meta in self.backend.map_concurrently(
+            lambda ref: self._extract_tabular_chart(
+                text=contexts[ref],
+                chart_type=chart_jobs[ref],
+                loop_budget=loop_budget,
+            ),
+            chart_jobs,
+        ):
+            if chart_meta is not None:
+                picture_meta(ref).tabular_chart = chart_meta
 
-        return meta
+        if not self.generate_picture_code:
+            return
+
+        for ref, code_meta in self.backend.map_concurrently(
+            lambda ref: self._generate_picture_code(
+                text=contexts[ref],
+                classification=picture_meta(ref).classification,
+                chart_meta=picture_meta(ref).tabular_chart,
+                loop_budget=loop_budget,
+            ),
+            list(contexts),
+        ):
+            if code_meta is not None:
+                picture_meta(ref).code = code_meta
 
     def _picture_context(self, *, summary: str, hierarchy: dict[int, str]) -> str:
         headers = []
@@ -731,20 +1122,7 @@ class DoclingWritingAgent(BaseDoclingAgent):
         if payload is None:
             return None
 
-        labels = payload.get("predictions")
-        if not isinstance(labels, list):
-            return None
-
-        deduped = [label for label in dict.fromkeys(labels) if isinstance(label, str)]
-        if not deduped:
-            return None
-
-        return PictureClassificationMetaField(
-            predictions=[
-                PictureClassificationPrediction(class_name=label, created_by=self._metadata_origin())
-                for label in deduped
-            ]
-        )
+        return classification_from_labels(payload.get("predictions"), created_by=self._metadata_origin())
 
     def _primary_chart_type(self, classification: PictureClassificationMetaField | None) -> str | None:
         if classification is None:
@@ -931,7 +1309,8 @@ class DoclingWritingAgent(BaseDoclingAgent):
 
         m = self._create_writing_session(system_prompt=self.system_prompt_expert_writer)
 
-        prompt = f"{context}Write me a single paragraph that expands the following summary: {summary}"
+        grounding = self._grounding_context(summary=summary, hierarchy=hierarchy)
+        prompt = f"{context}{grounding}Write me a single paragraph that expands the following summary: {summary}"
         # logger.info(f"prompt: {prompt}")
 
         answer = m.instruct(
@@ -962,7 +1341,8 @@ class DoclingWritingAgent(BaseDoclingAgent):
 
         m = self._create_writing_session(system_prompt=self.system_prompt_expert_writer)
 
-        prompt = f"Given the current context in the document:\n\n```{context}```\n\nwrite me a single HTML table that expands the following summary: {summary}"
+        grounding = self._grounding_context(summary=summary, hierarchy=hierarchy)
+        prompt = f"Given the current context in the document:\n\n```{context}```\n\n{grounding}write me a single HTML table that expands the following summary: {summary}"
         # logger.info(f"prompt: {prompt}")
 
         answer = m.instruct(
@@ -998,7 +1378,8 @@ class DoclingWritingAgent(BaseDoclingAgent):
 
         m = self._create_writing_session(system_prompt=self.system_prompt_expert_writer)
 
-        prompt = f"Given the current context in the document:\n\n```{context}```\n\nwrite me a list (can be nested) in markdown that expands the following summary: {summary}"
+        grounding = self._grounding_context(summary=summary, hierarchy=hierarchy)
+        prompt = f"Given the current context in the document:\n\n```{context}```\n\n{grounding}write me a list (can be nested) in markdown that expands the following summary: {summary}"
         # logger.info(f"prompt: {prompt}")
 
         answer = m.instruct(
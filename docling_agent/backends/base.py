@@ -1,12 +1,19 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TypeVar
 
 from mellea.stdlib.requirements import Requirement
 from typing_extensions import Self
 
+from docling_agent.logging import bind_log_context
 from docling_agent.task_model import BackendConfig, ModelConfig
 
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+
 
 class BaseSession(ABC):
     """Abstract base class for stateful backend sessions.
@@ -87,6 +94,46 @@ class BaseBackend(ABC):
         """
         return self.config.models
 
+    @property
+    def max_concurrency(self) -> int:
+        """Maximum number of requests an agent may have in flight at once.
+
+        Returns:
+            The configured concurrency limit (at least 1).
+        """
+        return max(1, self.config.max_concurrency)
+
+    def map_concurrently(self, fn: Callable[[_T], _R], items: Iterable[_T]) -> Iterator[tuple[_T, _R]]:
+        """Apply *fn* to every item with at most ``max_concurrency`` calls in flight.
+
+        Each call should create its own session: sessions are stateful and not
+        shared between threads. Results are yielded on the calling thread, so
+        callers can mutate documents and persist progress without locking.
+
+        Args:
+            fn: Function to apply to each item.
+            items: Items to process.
+
+        Yields:
+            ``(item, result)`` pairs in completion order. Calls that have not started
+            when iteration ends (a call raised or the consumer stopped) are dropped.
+        """
+        pending = list(items)
+        workers = min(self.max_concurrency, len(pending))
+        if workers <= 1:
+            for item in pending:
+                yield item, fn(item)
+            return
+
+        bound_fn = bind_log_context(fn)
+        pool = ThreadPoolExecutor(max_workers=workers)
+        try:
+            futures = {pool.submit(bound_fn, item): item for item in pending}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
     @abstractmethod
     def create_session(
         self,
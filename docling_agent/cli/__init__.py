@@ -8,10 +8,11 @@ import typer
 from docling_core.transforms.serializer.markdown import MarkdownDocSerializer
 
 from docling_agent.agent.orchestrator import DoclingOrchestratorAgent
+from docling_agent.agent.write_sink import IncrementalWritingSink
 from docling_agent.agent_models import configure_linear_chat_logging, configure_llm_logging
 from docling_agent.backends import create_backend
 from docling_agent.logging import logger
-from docling_agent.task_model import AgentTask, load_task
+from docling_agent.task_model import AgentTask, WriteTask, load_task
 
 app = typer.Typer(name="docling-agent", add_completion=False, pretty_exceptions_show_locals=False)
 
@@ -34,17 +35,37 @@ sources:
 # --- RAG options (mode: rag) -------------------------------------------------
 # max_iterations: 5       # maximum section-selection iterations
 # enrich_before_rag: true # run summarization enrichment before querying
+# selection_mode: llm     # llm (whole outline) | hybrid (LLM picks from a BM25 shortlist) | lexical (no LLM pick)
+# shortlist_size: 10      # sections shown to the LLM per selection in hybrid mode
 
 # --- Extract options (mode: extract) -----------------------------------------
 # schema_path: schema.json  # optional JSON schema; inferred from query if omitted
 # glob: "*.pdf"             # glob pattern applied when sources contain directories
 
+# --- Write options (mode: write) ---------------------------------------------
+# grounding_top_k: 3  # source passages retrieved into each item's prompt when sources are given (0 = off)
+# stream: false       # write markdown/JSON output item by item; rerunning resumes an interrupted run
+
+# --- Edit options (mode: edit) -----------------------------------------------
+# instructions:  # apply many edits in one batch run instead of the single query
+#   - "Fix the typo in the introduction"
+#   - "Round the numbers in the results table to two decimals"
+# outline_mode: full  # full | drilldown (LLM expands a collapsed outline) | auto (drilldown for long outlines)
+# edit_protocol: full  # full (regenerate edited text) | patch (find/replace patches, full as fallback)
+
 # --- Enrich options (mode: enrich) -------------------------------------------
 # operations:
 #   - summarize   # attach 2-3 sentence summaries to each document node
 #   - keywords    # extract keywords per item
 #   - entities    # detect key entities per item
-#   - classify    # classify pictures and attach chart/code metadata when possible
+#   - classify    # classify pictures and attach chart metadata when possible
+#   - code        # generate Python code for classified pictures
+# entity_packing_budget: 1500  # pack items into one entity prompt up to this many tokens
+# keyword_strategy: llm  # llm | tfidf (local, no LLM calls) | hybrid (LLM reranks local candidates)
+# heading_level_strategy: hybrid  # llm | heuristic (numbering and layout only) | hybrid (LLM for undecided headings)
+# max_calls: 500        # stop cleanly after this many LLM calls (titles and top-level sections first)
+# max_tokens: 2000000   # stop cleanly after this many estimated prompt + completion tokens
+# plan_only: false      # only print the estimated nodes, calls and tokens per operation
 
 # Output configuration --------------------------------------------------------
 # output:
@@ -58,6 +79,7 @@ sources:
 #   base_url:
 #   timeout:
 #   api_key_env:
+#   max_concurrency: 1  # maximum LLM requests in flight at once (1 = sequential, raise to opt in)
 #   models:
 #     reasoning: OPENAI_GPT_OSS_20B
 #     writing: OPENAI_GPT_OSS_20B
@@ -121,11 +143,18 @@ def main(
 
     logger.info(f"Task loaded: mode={agent_task.mode}, query={agent_task.query!r}")
 
+    writing_sink: IncrementalWritingSink | None = None
+    if isinstance(agent_task, WriteTask) and agent_task.stream:
+        # The final outputs go to the streamed paths, so that a rerun finds and resumes them
+        agent_task.output.path = _streaming_base_path(agent_task.output, task)
+        writing_sink = IncrementalWritingSink(agent_task.output.path, formats=agent_task.output.formats)
+        logger.info(f"Streaming output to: {agent_task.output.path}")
+
     orchestrator = DoclingOrchestratorAgent(
         backend=create_backend(agent_task.backend),
         tools=[],
     )
-    result = orchestrator.run_task(agent_task)
+    result = orchestrator.run_task(agent_task, writing_sink=writing_sink)
 
     _write_output(result, agent_task, task)
 
@@ -167,6 +196,14 @@ def _resolve_output_base_path(output, task_path: Path) -> Path:
     return output.dir / f"{task_path.stem}_{timestamp}"
 
 
+def _streaming_base_path(output, task_path: Path) -> Path:
+    """Output base path of a streamed write; reuses the base path of an unfinished run to resume it."""
+    if output.path is not None:
+        return output.path.with_suffix("") if output.path.suffix in (".md", ".html", ".json") else output.path
+    unfinished = IncrementalWritingSink.find_unfinished(output.dir, task_path.stem)
+    return unfinished if unfinished is not None else _resolve_output_base_path(output, task_path)
+
+
 def _path_for_format(base_path: Path, fmt: str) -> Path:
     suffix_map = {
         "markdown": ".md",
@@ -1,9 +1,14 @@
 import datetime
+import functools
 import logging
 import threading
 import time
+from collections.abc import Callable
 from contextlib import contextmanager
 from enum import Enum
+from typing import TypeVar
+
+_T = TypeVar("_T")
 
 _START_TIME = time.time()
 
@@ -143,6 +148,30 @@ def operation_context(operation_name: str):
         _agent_context.depth = old_depth
 
 
+def bind_log_context(fn: Callable[..., _T]) -> Callable[..., _T]:
+    """Wrap *fn* so that it logs with the caller's agent context, e.g. from a worker thread.
+
+    Usage:
+        pool.submit(bind_log_context(summarize_page), page_no)
+    """
+    agent_name = _agent_context.agent_name
+    operation = _agent_context.operation
+    depth = _agent_context.depth
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs) -> _T:
+        saved = (_agent_context.agent_name, _agent_context.operation, _agent_context.depth)
+        _agent_context.agent_name = agent_name
+        _agent_context.operation = operation
+        _agent_context.depth = depth
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _agent_context.agent_name, _agent_context.operation, _agent_context.depth = saved
+
+    return wrapper
+
+
 def log_agent_start(message: str, **kwargs):
     """Log the start of an agent operation."""
     prefix = _format_agent_prefix()
@@ -347,9 +376,13 @@ def log_debug(message: str, **kwargs):
 
 
 @contextmanager
-def timed_operation(operation_name: str):
+def timed_operation(operation_name: str, stats: Callable[[], dict] | None = None):
     """Context manager to time an operation and log the duration.
 
+    Args:
+        operation_name: Name of the operation, used in the start and end log lines.
+        stats: Optional callable returning extra key/value pairs for the end log line.
+
     Usage:
         with timed_operation("document_conversion"):
             # ... operation ...
@@ -360,4 +393,4 @@ def timed_operation(operation_name: str):
         yield
     finally:
         duration = time.time() - start_time
-        log_stage_end(operation_name, duration=duration)
+        log_stage_end(operation_name, duration=duration, **(stats() if stats else {}))
@@ -100,6 +100,14 @@ class BackendConfig(BaseModel):
         dict[str, Any],
         Field(description="Backend-specific options passed through to the provider."),
     ] = {}
+    max_concurrency: Annotated[
+        int,
+        Field(
+            ge=1,
+            description="Maximum number of LLM requests an agent may have in flight at once. Requests are "
+            "sequential by default; raise it only for backends whose client is safe to use from several threads.",
+        ),
+    ] = 1
     models: Annotated[
         ModelConfig,
         Field(description="Model identifiers for different agent roles."),
@@ -183,6 +191,18 @@ class RAGTask(AgentTask):
         bool,
         Field(description="Run summarization enrichment before the RAG loop."),
     ] = True
+    selection_mode: Annotated[
+        Literal["llm", "hybrid", "lexical"],
+        Field(
+            description="How the next section is selected: the LLM over the whole outline, the LLM over a BM25 "
+            "shortlist when enough sections match the query (the whole outline otherwise), or the best BM25 "
+            "match without LLM selection.",
+        ),
+    ] = "llm"
+    shortlist_size: Annotated[
+        int,
+        Field(ge=1, description="Sections shown to the LLM per selection in hybrid mode."),
+    ] = 10
 
     @model_validator(mode="after")
     def sources_required(self) -> Self:
@@ -233,6 +253,21 @@ class WriteTask(AgentTask):
     """
 
     mode: Literal["write"] = "write"
+    grounding_top_k: Annotated[
+        int,
+        Field(
+            ge=0,
+            description="Source passages retrieved into the prompt of every written paragraph, table and list "
+            "(0 disables grounding).",
+        ),
+    ] = 3
+    stream: Annotated[
+        bool,
+        Field(
+            description="Append items to the markdown and JSON outputs as they are written and resume an "
+            "interrupted run from its last completed outline item.",
+        ),
+    ] = False
 
 
 class EditingTask(AgentTask):
@@ -243,6 +278,27 @@ class EditingTask(AgentTask):
     """
 
     mode: Literal["edit"] = "edit"
+    instructions: Annotated[
+        list[str],
+        Field(
+            description="Edit instructions applied together in one batch run (the outline is built once and the "
+            "edited items are identified and rewritten concurrently). If empty, the query is the only instruction.",
+        ),
+    ] = []
+    outline_mode: Annotated[
+        Literal["full", "drilldown", "auto"],
+        Field(
+            description="How the outline is shown to identify the items to edit: the whole outline, a collapsed "
+            "outline the LLM drills down into, or drill-down only for outlines too long to show whole.",
+        ),
+    ] = "full"
+    edit_protocol: Annotated[
+        Literal["full", "patch"],
+        Field(
+            description="How text edits are returned: the whole edited markdown, or find/replace patches applied "
+            "locally with full regeneration as fallback.",
+        ),
+    ] = "full"
 
 
 class EnrichTask(AgentTask):
@@ -254,9 +310,50 @@ class EnrichTask(AgentTask):
 
     mode: Literal["enrich"] = "enrich"
     operations: Annotated[
-        list[Literal["summarize", "keywords", "entities", "classify", "classify_items"]] | None,
+        list[Literal["summarize", "keywords", "entities", "classify", "classify_items", "code"]] | None,
         Field(description="Enrichment operations to apply. If None, applies all available operations."),
     ] = None
+    entity_packing_budget: Annotated[
+        int | None,
+        Field(
+            ge=1,
+            description="Pack consecutive items into one entity-extraction prompt up to this many tokens. "
+            "If None, each item gets its own prompt.",
+        ),
+    ] = None
+    keyword_strategy: Annotated[
+        Literal["llm", "tfidf", "hybrid"],
+        Field(
+            description="How search keywords are found: one LLM call per item, local TF-IDF only, "
+            "or local TF-IDF candidates reranked by the LLM.",
+        ),
+    ] = "llm"
+    heading_level_strategy: Annotated[
+        Literal["llm", "heuristic", "hybrid"],
+        Field(
+            description="How heading levels are fixed: one full-outline LLM call, numbering/layout heuristics "
+            "only, or heuristics with the LLM deciding the headings they leave open.",
+        ),
+    ] = "hybrid"
+    max_calls: Annotated[
+        int | None,
+        Field(
+            ge=1,
+            description="Stop cleanly after this many LLM calls over all sources; "
+            "titles and top-level sections are enriched first.",
+        ),
+    ] = None
+    max_tokens: Annotated[
+        int | None,
+        Field(
+            ge=1,
+            description="Stop cleanly after this many estimated prompt and completion tokens over all sources.",
+        ),
+    ] = None
+    plan_only: Annotated[
+        bool,
+        Field(description="Only estimate the nodes, LLM calls and tokens of each operation; do not enrich."),
+    ] = False
 
     @model_validator(mode="after")
     def sources_required(self) -> EnrichTask:
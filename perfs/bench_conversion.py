@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import time
+from collections.abc import Callable
+from io import BytesIO
+
+from docling.datamodel.base_models import InputFormat
+from docling.document_converter import DocumentConverter
+from docling_core.types.io import DocumentStream
+
+from docling_agent.agent import base_functions
+
+# Typical sizes of what the writer and editor validate: one paragraph, one list, one table
+_MARKDOWN_SAMPLE = """\
+The conversion pipeline parses $x^2$ inline maths, **bold** text and [links](https://example.com).
+
+- first item
+- second item
+  - nested item
+"""
+
+_HTML_SAMPLE = """\
+<table>
+  <tr><th>Model</th><th>Accuracy</th><th>Latency (ms)</th></tr>
+  <tr><td>small</td><td>0.81</td><td>12</td></tr>
+  <tr><td>large</td><td>0.89</td><td>48</td></tr>
+</table>
+"""
+
+
+def _fresh_converter(content: str, fmt: InputFormat) -> None:
+    """Per-call conversion as done before the converter pool: a new converter for every call."""
+    suffix = "md" if fmt == InputFormat.MD else "html"
+    stream = DocumentStream(name=f"tmp.{suffix}", stream=BytesIO(content.encode("utf-8")))
+    DocumentConverter(allowed_formats=[fmt]).convert(stream)
+
+
+def _pooled_converter(content: str, fmt: InputFormat) -> None:
+    base_functions._parse_string(content, fmt)
+
+
+def _latency_ms(fn: Callable[[str, InputFormat], None], content: str, fmt: InputFormat, repeat: int) -> float:
+    fn(content, fmt)  # first call pays imports and pipeline initialization
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(content, fmt)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Measure per-call markdown/HTML conversion latency.")
+    parser.add_argument("--repeat", type=int, default=100, help="Conversions per measurement.")
+    return parser
+
+
+def main() -> int:
+    args = _build_parser().parse_args()
+    logging.disable(logging.INFO)
+
+    print("format\tfresh_ms\tpooled_ms\tspeedup")
+    for fmt, content in ((InputFormat.MD, _MARKDOWN_SAMPLE), (InputFormat.HTML, _HTML_SAMPLE)):
+        fresh = _latency_ms(_fresh_converter, content, fmt, args.repeat)
+        pooled = _latency_ms(_pooled_converter, content, fmt, args.repeat)
+        print(f"{fmt.value}\t{fresh:.2f}\t{pooled:.2f}\t{fresh / pooled:.1f}x")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -44,3 +44,67 @@ def test_create_llama_server_backend_with_custom_base_url():
     backend = create_backend(BackendConfig(type="llama-server", base_url="http://example.com:9000/v1"))
     assert isinstance(backend, LlamaServerBackend)
     assert backend.base_url == "http://example.com:9000/v1"
+
+
+def test_map_concurrently_bounds_in_flight_calls():
+    import threading
+    import time
+
+    backend = create_backend(BackendConfig(type="ollama", max_concurrency=3))
+    assert backend.max_concurrency == 3
+
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+
+    def _work(value: int) -> int:
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight -= 1
+        return value * value
+
+    results = dict(backend.map_concurrently(_work, range(12)))
+    assert results == {value: value * value for value in range(12)}
+    assert 1 < peak <= 3
+
+
+def test_map_concurrently_drops_queued_calls_after_a_failure():
+    import threading
+    import time
+
+    import pytest
+
+    backend = create_backend(BackendConfig(type="ollama", max_concurrency=2))
+    lock = threading.Lock()
+    started: list[int] = []
+
+    def _work(value: int) -> int:
+        with lock:
+            started.append(value)
+        if value == 0:
+            raise RuntimeError("call failed")
+        time.sleep(0.05)
+        return value
+
+    with pytest.raises(RuntimeError):
+        for _ in backend.map_concurrently(_work, range(20)):
+            pass
+    # Only the calls already in flight when the failure surfaced ran
+    assert len(started) <= 4
+
+    stopped: list[int] = []
+
+    def _record(value: int) -> int:
+        with lock:
+            stopped.append(value)
+        time.sleep(0.05)
+        return value
+
+    results = backend.map_concurrently(_record, range(20))
+    next(results)
+    results.close()
+    assert len(stopped) < 20
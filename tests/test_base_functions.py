@@ -1,10 +1,26 @@
 import json
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
 from pathlib import Path
 
+from docling.datamodel.base_models import InputFormat
 from docling_core.experimental.serializer.outline import OutlineMode
 from docling_core.types.doc.document import DoclingDocument, SectionHeaderItem
-
-from docling_agent.agent.base_functions import create_document_outline, find_json_dicts, make_hierarchical_document
+from docling_core.types.io import DocumentStream
+
+from docling_agent.agent import base_functions
+from docling_agent.agent.base_functions import (
+    apply_text_patches,
+    convert_markdown_to_docling_document,
+    create_document_outline,
+    find_json_dicts,
+    make_hierarchical_document,
+    precheck_html,
+    precheck_markdown,
+    validate_html_to_docling_document,
+    validate_html_to_docling_table,
+    validate_markdown_to_docling_document,
+)
 
 from .test_data_gen_flag import GEN_TEST_DATA
 
@@ -261,3 +277,95 @@ def test_create_document_outline():
     pictures = [item for item in outline_data if item.get("item") == "picture"]
     assert len(tables) > 0, "Outline should contain at least one table"
     assert len(pictures) > 0, "Outline should contain at least one picture"
+
+
+def test_validated_markdown_is_parsed_once(monkeypatch):
+    """A validator's parse is handed to the next conversion of the same answer, then dropped."""
+    calls: list[str] = []
+    parse = base_functions._parse_string
+
+    def counting_parse(content, fmt):
+        calls.append(content)
+        return parse(content, fmt)
+
+    monkeypatch.setattr(base_functions, "_parse_string", counting_parse)
+    base_functions._parse_cache.clear()
+
+    answer = "```markdown\n# Title\n\nA paragraph about parsing.\n```"
+    assert validate_markdown_to_docling_document(answer)
+    assert validate_markdown_to_docling_document(answer)
+    document = convert_markdown_to_docling_document(answer)
+
+    assert len(calls) == 1
+    assert document is not None and document.texts[-1].text == "A paragraph about parsing."
+
+    # The entry was consumed: converting again parses a fresh document
+    assert convert_markdown_to_docling_document(answer) is not document
+    assert len(calls) == 2
+
+
+def test_converter_pool_reuses_converters_across_threads():
+    pool = base_functions._ConverterPool(max_idle=2)
+    with pool.converter(InputFormat.MD) as first:
+        # A converter is never handed to two callers at once
+        with pool.converter(InputFormat.MD) as second:
+            assert second is not first
+    with pool.converter(InputFormat.MD) as again:
+        assert again in (first, second)
+
+    def convert(index: int) -> DoclingDocument | None:
+        with pool.converter(InputFormat.MD) as converter:
+            stream = DocumentStream(name="tmp.md", stream=BytesIO(f"Paragraph {index}.".encode()))
+            return converter.convert(stream).document
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        documents = list(executor.map(convert, range(8)))
+    assert [document.texts[0].text for document in documents] == [f"Paragraph {index}." for index in range(8)]
+    assert len(pool._idle[InputFormat.MD]) <= 2
+
+
+def test_converter_pool_drops_converters_borrowed_before_clear():
+    pool = base_functions._ConverterPool(max_idle=2)
+    with pool.converter(InputFormat.MD) as stale:
+        pool.clear()
+    assert pool._idle[InputFormat.MD] == []
+    with pool.converter(InputFormat.MD) as fresh:
+        assert fresh is not stale
+    assert pool._idle[InputFormat.MD] == [fresh]
+
+
+def test_prechecks_reject_broken_answers_without_converting(monkeypatch):
+    def fail(content, fmt):
+        raise AssertionError("full conversion should not run")
+
+    monkeypatch.setattr(base_functions, "_parse_string", fail)
+
+    assert not validate_markdown_to_docling_document("```markdown\n   \n```")
+    assert not validate_markdown_to_docling_document("Some code:\n```python\nprint(1)\n")
+    assert not validate_markdown_to_docling_document("- first\n-\n- third")
+    assert not validate_html_to_docling_document("no markup at all")
+    assert not validate_html_to_docling_document("```html\n<table><tr><td>1</td></tr>\n```")
+    assert not validate_html_to_docling_document("<td>1</td></tr></table>")
+    assert not validate_html_to_docling_table("```html\n<p>No table here</p>\n```")
+
+
+def test_prechecks_accept_well_formed_answers():
+    assert precheck_markdown("Text with code:\n```python\nprint(1)\n```\n\n- a\n  - b\n1. c")
+    assert precheck_markdown("````\n```\nnested fence\n```\n````")
+    # A lone "-" or "1." in a code block is code, not an empty list item
+    assert precheck_markdown("Diff:\n```diff\n-\n+ added\n```\n\nSteps:\n```\n1.\n```")
+    assert precheck_html("<table><thead><tr><th>a<th>b</thead><tbody><tr><td>1<td>2<tr><td>3<td>4</tbody></table>")
+    assert precheck_html("<p>Intro</p><ul><li>item</li></ul>")
+    assert validate_html_to_docling_table("```html\n<table><tr><th>a</th></tr><tr><td>1</td></tr></table>\n```")
+
+
+def test_apply_text_patches_requires_unique_matches():
+    text = "The quick brwon fox jumps over the lazy dog."
+
+    assert apply_text_patches(text, [("brwon", "brown"), ("lazy dog", "sleepy cat")]) == (
+        "The quick brown fox jumps over the sleepy cat."
+    )
+    assert apply_text_patches(text, []) == text
+    assert apply_text_patches(text, [("missing", "x")]) is None
+    assert apply_text_patches(text, [("o", "0")]) is None  # ambiguous
+    assert apply_text_patches(text, [("", "x")]) is None
@@ -0,0 +1,59 @@
+from docling_core.types.doc.document import DocItemLabel, DoclingDocument, SectionHeaderItem, TitleItem
+
+from docling_agent.agent.base import DoclingAgentType
+from docling_agent.agent.document_index import DocumentPositionIndex
+from docling_agent.agent.editor import DoclingEditingAgent, MissingSectionHeadingInsertion
+
+
+def _document() -> DoclingDocument:
+    doc = DoclingDocument(name="test")
+    doc.add_title(text="Report")
+    for section in range(3):
+        doc.add_heading(text=f"{section + 1} Section", level=1)
+        group = doc.add_group(name=f"group {section}")
+        for paragraph in range(2):
+            doc.add_text(label=DocItemLabel.TEXT, text=f"{section + 1}.{paragraph + 1} Paragraph", parent=group)
+    return doc
+
+
+def test_index_follows_reading_order_with_groups():
+    doc = _document()
+    index = DocumentPositionIndex(doc)
+
+    ordered = [item.self_ref for item, _ in doc.iterate_items(with_groups=True)]
+    assert len(index) == len(ordered)
+    assert [index.ordinal(ref) for ref in ordered] == list(range(len(ordered)))
+
+    paragraph = next(item for item in doc.texts if item.text == "2.2 Paragraph")
+    assert index.parent(paragraph.self_ref) == doc.groups[1].self_ref
+    assert index.depth(paragraph.self_ref) == index.depth(doc.groups[1].self_ref) + 1
+    assert index.ordinal("#/texts/999") is None
+    assert index.title_refs() == {doc.texts[0].self_ref}
+
+    between = index.items_between(doc.texts[1].self_ref, doc.texts[4].self_ref)
+    assert [item.self_ref for item in between] == ordered[3:6]
+    assert index.items_between(doc.texts[4].self_ref, doc.texts[1].self_ref) is None
+
+
+def test_heading_insertions_share_one_index_updated_in_place():
+    doc = _document()
+    headings = [item.self_ref for item in doc.texts if isinstance(item, SectionHeaderItem)]
+    insertions = [
+        MissingSectionHeadingInsertion(
+            previous_ref=headings[section], next_ref=headings[section + 1], regex=rf"^{section + 1}\.2 ", level=2
+        )
+        for section in range(2)
+    ]
+    index = DocumentPositionIndex(doc)
+    agent = DoclingEditingAgent.model_construct(
+        agent_type=DoclingAgentType.DOCLING_DOCUMENT_EDITOR, backend=None, tools=[]
+    )
+
+    agent._update_section_heading_level(task="", document=doc, changes=[], insertions=insertions, index=index)
+
+    inserted = [item for item in doc.texts if isinstance(item, SectionHeaderItem) and item.level == 2]
+    assert [item.text for item in inserted] == ["1.2 Paragraph", "2.2 Paragraph"]
+    assert all(index.item(item.self_ref) is item for item in inserted)
+
+    index.replace(doc.texts[0], TitleItem(self_ref=doc.texts[0].self_ref, text="Report", orig="Report"))
+    assert index.title_refs() == {doc.texts[0].self_ref}
@@ -1,5 +1,8 @@
 """Tests for the DoclingEditingAgent."""
 
+import json
+import re
+
 import pytest
 from docling_core.types.doc.document import DocItemLabel, DoclingDocument, SectionHeaderItem, TextItem, TitleItem
 from pydantic import ValidationError
@@ -14,6 +17,8 @@ from docling_agent.agent.editor import (
     UpdateSectionHeadingLevelOperation,
 )
 
+from .test_utils import ScriptedBackend
+
 
 class TestUpdateContentOperation:
     """Test UpdateContentOperation validation."""
@@ -253,3 +258,180 @@ class TestSectionHeadingFixHelpers:
         assert isinstance(updated, SectionHeaderItem)
         assert updated.level == 2
         assert updated.text == "9.3 Gamma"
+
+
+def test_drilldown_outline_only_expands_the_selected_sections():
+    doc = DoclingDocument(name="long report")
+    doc.add_title(text="Report")
+    refs: dict[str, str] = {}
+    for section in (1, 2, 3):
+        refs[f"{section}"] = doc.add_heading(text=f"Section {section}", level=1).self_ref
+        for subsection in (1, 2):
+            name = f"{section}.{subsection}"
+            refs[name] = doc.add_heading(text=f"Subsection {name}", level=2).self_ref
+            doc.add_text(label=DocItemLabel.TEXT, text=f"Body of {name}")
+
+    def respond(prompt: str) -> str:
+        if "Select the collapsed sections" in prompt:
+            expand = [refs["2"]] if "Subsection 2.1" not in prompt else []
+            return f'```json\n{{"expand": {json.dumps(expand)}}}\n```'
+        return f'```json\n{{"operation": "update_content", "ref": "{refs["2.1"]}"}}\n```'
+
+    backend = ScriptedBackend(respond)
+    agent = DoclingEditingAgent(backend=backend, tools=[])
+    agent.outline_mode = "drilldown"
+
+    op = agent._identify_document_items(task="Fix the typo in subsection 2.1", document=doc)
+
+    assert op == UpdateContentOperation(operation="update_content", ref=refs["2.1"])
+    assert len(backend.prompts) == 3
+    identification = backend.prompts[-1]
+    assert "Subsection 2.1" in identification and "Subsection 2.2" in identification
+    assert "Subsection 1.1" not in identification and "Subsection 3.2" not in identification
+    assert f"- Section 1 [ref={refs['1']}] (+2 subsections, collapsed)" in identification
+
+
+def test_run_batch_identifies_once_and_merges_edits_from_the_last_item():
+    doc = DoclingDocument(name="report")
+    doc.add_title(text="Report")
+    paragraphs = [doc.add_text(label=DocItemLabel.TEXT, text=f"Paragraph {index}") for index in range(3)]
+    refs = [paragraph.self_ref for paragraph in paragraphs]
+    tasks = [
+        "Fix the typo in paragraph 0",
+        "Make paragraph 0 more formal",
+        "Shorten paragraph 2",
+        "Merge paragraphs 1 and 2",
+    ]
+
+    def respond(prompt: str) -> str:
+        if "numbered tasks" in prompt:
+            operations = [
+                {"task": 0, "operation": "update_content", "ref": refs[0]},
+                {"task": 1, "operation": "update_content", "ref": refs[0]},
+                {"task": 2, "operation": "update_content", "ref": refs[2]},
+                {"task": 3, "operation": "rewrite_content", "refs": [refs[1], refs[2]]},
+            ]
+            return f"```json\n{json.dumps(operations)}\n```"
+        if "Given the current outline" in prompt:
+            current = [item.self_ref for item in doc.texts if item.text == "Paragraph 1"]
+            return f'```json\n{{"operation": "update_content", "ref": "{current[0]}"}}\n```'
+        original = re.search(r"Paragraph \d", prompt).group(0)
+        return f"```md\n{original} edited\n```"
+
+    backend = ScriptedBackend(respond)
+    DoclingEditingAgent(backend=backend, tools=[]).run_batch(tasks=tasks, document=doc)
+
+    # One identification for the batch, two concurrent edits, then the overlapping task on its own
+    assert sum("numbered tasks" in prompt for prompt in backend.prompts) == 1
+    assert len(backend.prompts) == 5
+    assert any("- Fix the typo in paragraph 0\n- Make paragraph 0 more formal" in p for p in backend.prompts)
+    texts = [item.text for item, _ in doc.iterate_items() if isinstance(item, TextItem)]
+    assert texts == ["Report", "Paragraph 0 edited", "Paragraph 1 edited", "Paragraph 2 edited"]
+
+
+def test_heading_levels_of_long_outlines_are_fixed_in_reconciled_windows():
+    doc = DoclingDocument(name="manual")
+    for text in ["1 Intro", "1.1 a", "1.2 b", "2 Methods", "2.1 c", "2.2 d", "3 Results", "3.1 e", "3.2 f"]:
+        doc.add_heading(text=text, level=1)
+
+    def respond(prompt: str) -> str:
+        headings = re.findall(r"^#+ ([\d.]+) .*\[ref=(\S+)\]", prompt, re.MULTILINE)
+        # The window around "2.1 c" and "3.1 e" answers one level too deep throughout
+        shift = 1 if "2.1 c" in prompt and "3.1 e" in prompt else 0
+        changes = [{"ref": ref, "to_level": number.count(".") + 1 + shift} for number, ref in headings]
+        return f"```json\n{json.dumps(changes)}\n```"
+
+    backend = ScriptedBackend(respond)
+    agent = DoclingEditingAgent(backend=backend, tools=[])
+    agent.heading_window_size = 4
+    agent.heading_window_overlap = 2
+
+    agent.fix_section_heading_levels(document=doc)
+
+    assert len(backend.prompts) == 4
+    assert [(item.text, item.level) for item in doc.texts] == [
+        ("1 Intro", 1),
+        ("1.1 a", 2),
+        ("1.2 b", 2),
+        ("2 Methods", 1),
+        ("2.1 c", 2),
+        ("2.2 d", 2),
+        ("3 Results", 1),
+        ("3.1 e", 2),
+        ("3.2 f", 2),
+    ]
+
+
+def test_truncated_heading_window_answers_are_retried():
+    doc = DoclingDocument(name="manual")
+    for text in ["1 Intro", "1.1 a", "2 Methods", "2.1 b"]:
+        doc.add_heading(text=text, level=1)
+    asked: set[str] = set()
+
+    def respond(prompt: str) -> str:
+        ref = re.findall(r"\[ref=(\S+)\]", prompt)[1]  # the subsection of the window
+        if prompt not in asked:
+            asked.add(prompt)
+            return f'```json\n[{{"ref": "{ref}", "to_lev\n```'
+        return f'```json\n[{{"ref": "{ref}", "to_level": 2}}]\n```'
+
+    backend = ScriptedBackend(respond, validate=True)
+    agent = DoclingEditingAgent(backend=backend, tools=[])
+    agent.heading_window_size = 2
+    agent.heading_window_overlap = 0
+
+    agent.fix_section_heading_levels(document=doc)
+
+    # Each window was asked twice: the truncated answer failed validation instead of reading as "no change"
+    assert len(backend.prompts) == 4
+    assert [item.level for item in doc.texts] == [1, 2, 1, 2]
+
+
+def test_patch_protocol_applies_patches_and_falls_back_to_full_regeneration():
+    doc = DoclingDocument(name="report")
+    first = doc.add_text(label=DocItemLabel.TEXT, text="The resluts are significant.")
+    second = doc.add_text(label=DocItemLabel.TEXT, text="We thank the reviewers.")
+
+    def respond(prompt: str) -> str:
+        if "list of patches" not in prompt:
+            return "```md\nWe thank the anonymous reviewers.\n```"
+        if "resluts" in prompt:
+            return f'```json\n[{{"ref": "{first.self_ref}", "find": "resluts", "replace": "results"}}]\n```'
+        return f'```json\n[{{"ref": "{second.self_ref}", "find": "editors", "replace": "anonymous editors"}}]\n```'
+
+    backend = ScriptedBackend(respond)
+    agent = DoclingEditingAgent(backend=backend, tools=[])
+    agent.edit_protocol = "patch"
+
+    agent._update_content(task="Fix the typo", document=doc, sref=first.self_ref)
+    assert len(backend.prompts) == 1
+    assert doc.texts[-1].text == "The results are significant."
+
+    # The patch does not apply, so the item is regenerated in full
+    agent._update_content(task="Thank the anonymous reviewers", document=doc, sref=second.self_ref)
+    assert len(backend.prompts) == 3
+    assert doc.texts[-1].text == "We thank the anonymous reviewers."
+
+
+@pytest.mark.parametrize(
+    "patch_answer",
+    ['```json\n[{"ref": "#/texts/0", "find": "resl\n```', "```json\n[]\n```"],
+    ids=["truncated", "empty"],
+)
+def test_patch_protocol_regenerates_when_the_patch_answer_is_unusable(patch_answer):
+    doc = DoclingDocument(name="report")
+    item = doc.add_text(label=DocItemLabel.TEXT, text="The resluts are significant.")
+
+    def respond(prompt: str) -> str:
+        if "list of patches" in prompt:
+            return patch_answer
+        return "```md\nThe results are significant.\n```"
+
+    backend = ScriptedBackend(respond)
+    agent = DoclingEditingAgent(backend=backend, tools=[])
+    agent.edit_protocol = "patch"
+
+    agent._update_content(task="Fix the typo", document=doc, sref=item.self_ref)
+
+    assert len(backend.prompts) == 2
+    assert doc.texts[-1].text == "The results are significant."
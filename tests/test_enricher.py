@@ -9,12 +9,12 @@ from docling_core.transforms.serializer.markdown import (
     MarkdownParams,
     MarkdownTableSerializer,
 )
-from docling_core.types.doc.document import DoclingDocument, EntityMention
+from docling_core.types.doc.document import DocItemLabel, DoclingDocument, EntityMention, RefItem
 
 from docling_agent.agent.editor import DoclingEditingAgent
 from docling_agent.agent.enricher import DoclingEnrichingAgent
 
-from .test_utils import MockBackend
+from .test_utils import MockBackend, ScriptedBackend, picture_answers
 
 
 @pytest.fixture(scope="module")
@@ -209,6 +209,35 @@ def test_fix_heading_levels(monkeypatch, test_document, enricher):
     print("=" * 70)
 
 
+def test_fix_heading_levels_asks_llm_only_for_undecided_headings():
+    """The hybrid strategy applies heuristic levels and sends only the undecided headings to the LLM."""
+    document = DoclingDocument(name="headings")
+    title = document.add_heading(text="Docling Technical Report", level=1)
+    intro = document.add_heading(text="1 Introduction", level=1)
+    subsection = document.add_heading(text="1.1 Motivation", level=1)
+
+    answer = {
+        "operation": "update_section_heading_level",
+        "changes": [{"ref": title.self_ref, "to_level": 0}, {"ref": intro.self_ref, "to_level": 3}],
+    }
+    backend = ScriptedBackend(lambda prompt: f"```json\n{json.dumps(answer)}\n```")
+    enricher = DoclingEnrichingAgent(backend=backend, tools=[])
+
+    enricher._fix_heading_levels(document=document)
+
+    assert len(backend.prompts) == 1
+    assert f"only decide the levels of: {title.self_ref}" in backend.prompts[0]
+    assert document.texts[0].label == DocItemLabel.TITLE
+    # The LLM change for a heading decided by numbering is ignored
+    assert (intro.level, subsection.level) == (1, 2)
+
+    backend.prompts.clear()
+    enricher.heading_level_strategy = "heuristic"
+    document.add_heading(text="Unnumbered", level=1)
+    enricher._fix_heading_levels(document=document)
+    assert backend.prompts == []
+
+
 def test_make_entity_mention(enricher):
     """Regression test for _make_entity_mention function."""
     source_text = "International Business Machines is a technology company based in Armonk."
@@ -276,6 +305,176 @@ def test_generate_summary(monkeypatch, enricher):
     assert summary == "concept A; concept B; concept C"
 
 
+def test_identical_inputs_are_generated_once(monkeypatch, mock_backend):
+    """Repeated texts share one LLM call; entity charspans still match each node's own text."""
+    calls: list[str] = []
+
+    def _fake_generate_content(self, *, m, text, task_prompt, requirement_description, validation_fn, loop_budget=5):
+        calls.append(text)
+        return '```json\n[{"text": "ACME Corp", "label": "organization"}]\n```'
+
+    monkeypatch.setattr(DoclingEnrichingAgent, "_generate_content", _fake_generate_content)
+
+    document = DoclingDocument(name="repeated")
+    for text in ("Confidential - ACME Corp", "Confidential -  ACME Corp ", "Confidential - ACME Corp"):
+        document.add_text(label=DocItemLabel.TEXT, text=text)
+
+    enricher = DoclingEnrichingAgent(backend=mock_backend, tools=[])
+    enricher.run(task="", document=document, operations=["entities"])
+
+    assert len(calls) == 1
+    for item in document.texts:
+        (mention,) = item.meta.entities.mentions
+        start, end = mention.charspan
+        assert item.text[start:end] == "ACME Corp"
+
+
+def test_packed_entity_extraction(monkeypatch, mock_backend):
+    """Packing bins items into few prompts and falls back to single items for bins that fail validation."""
+    calls: list[str] = []
+
+    def _fake_generate_content(self, *, m, text, task_prompt, requirement_description, validation_fn, loop_budget=5):
+        calls.append(text)
+        item_ids = re.findall(r"^\[(#/texts/\d+)\]$", text, re.MULTILINE)
+        if not item_ids:
+            return '```json\n[{"text": "Zurich", "label": "location"}]\n```'
+        if "#/texts/4" in item_ids:
+            return "```json\n{}\n```"  # invalid: does not cover the requested items
+        payload = {item_id: [{"text": "Zurich", "label": "location"}] for item_id in item_ids}
+        return f"```json\n{json.dumps(payload)}\n```"
+
+    monkeypatch.setattr(DoclingEnrichingAgent, "_generate_content", _fake_generate_content)
+
+    document = DoclingDocument(name="packed")
+    for index in range(6):
+        document.add_text(label=DocItemLabel.TEXT, text=f"Paragraph {index} was written in Zurich.")
+
+    enricher = DoclingEnrichingAgent(backend=mock_backend, tools=[])
+    enricher.entity_packing_budget = 40
+    enricher.run(task="", document=document, operations=["entities"])
+
+    # Three bins of two items; the bin holding #/texts/4 falls back to two single-item calls
+    assert len(calls) == 5
+    for item in document.texts:
+        (mention,) = item.meta.entities.mentions
+        start, end = mention.charspan
+        assert item.text[start:end] == "Zurich"
+
+
+def _picture_document(captions: list[str]) -> DoclingDocument:
+    document = DoclingDocument(name="pictures")
+    for text in captions:
+        caption = document.add_text(label=DocItemLabel.CAPTION, text=text)
+        document.add_picture(caption=caption)
+    return document
+
+
+def _picture_labels(ref: str) -> list[str]:
+    return ["bar-chart"] if ref == "#/pictures/0" else ["photo"]
+
+
+def test_classify_items_batches_pictures_and_defers_code():
+    """Pictures are classified in batches, charts extracted only for chart classes, code only on request."""
+    backend = ScriptedBackend(picture_answers(_picture_labels))
+    enricher = DoclingEnrichingAgent(backend=backend, tools=[])
+    enricher.picture_batch_size = 2
+
+    document = _picture_document(["Sales per year", "Team photo", "System overview"])
+    enricher.run(task="", document=document, operations=["classify"])
+
+    # One batch of two pictures, one single-picture prompt, one chart extraction
+    assert len(backend.prompts) == 3
+    labels = [picture.meta.classification.predictions[0].class_name for picture in document.pictures]
+    assert labels == ["bar-chart", "photo", "diagram"]
+    assert document.pictures[0].meta.tabular_chart.title == "Sales"
+    assert all(picture.meta.code is None for picture in document.pictures)
+
+    enricher.run(task="", document=document, operations=["code"])
+    assert len(backend.prompts) == 6
+    assert all(picture.meta.code.text == "print('picture')" for picture in document.pictures)
+
+
+def test_failed_picture_batch_falls_back_to_single_pictures():
+    """A batch call that raises does not fail the run: its pictures are classified one by one."""
+    answers = picture_answers(_picture_labels)
+
+    def respond(prompt: str) -> str:
+        if prompt.startswith("Classify each of the pictures"):
+            raise RuntimeError("backend unavailable")
+        return answers(prompt)
+
+    backend = ScriptedBackend(respond)
+    enricher = DoclingEnrichingAgent(backend=backend, tools=[])
+    document = _picture_document(["Sales per year", "Team photo"])
+    enricher.run(task="", document=document, operations=["classify"])
+
+    assert len(backend.prompts) == 3
+    assert all(picture.meta.classification.predictions[0].class_name == "diagram" for picture in document.pictures)
+
+
+def test_unclassified_pictures_emit_no_classification_event():
+    backend = ScriptedBackend(lambda prompt: "I cannot tell.")
+    enricher = DoclingEnrichingAgent(backend=backend, tools=[])
+    document = _picture_document(["Sales per year", "Team photo"])
+
+    events = list(enricher.run_iter(task="", document=document, operations=["classify"]))
+
+    assert all(picture.meta.classification is None for picture in document.pictures)
+    assert not [event for event in events if event.field == "classification"]
+
+
+def test_find_search_keywords_tfidf_strategy(monkeypatch, test_document, mock_backend):
+    """The TF-IDF strategy fills the keyword meta field without any LLM call."""
+
+    def _fail_generate_content(self, **kwargs):
+        raise AssertionError("the tfidf strategy must not call the LLM")
+
+    monkeypatch.setattr(DoclingEnrichingAgent, "_generate_content", _fail_generate_content)
+
+    enricher = DoclingEnrichingAgent(backend=mock_backend, tools=[])
+    enricher.keyword_strategy = "tfidf"
+    document = test_document.model_copy(deep=True)
+    result = enricher._find_search_keywords(document=document, fix_heading_levels=False)
+
+    keyworded = [
+        item
+        for item, _ in result.iterate_items(with_groups=True, traverse_pictures=True)
+        if item.meta and getattr(item.meta, "docling_agent__keywords", None)
+    ]
+    assert len(keyworded) > 50
+    for item in keyworded:
+        keywords = item.meta.docling_agent__keywords
+        assert 1 <= len(keywords) <= 5
+        assert all(isinstance(keyword, str) and keyword for keyword in keywords)
+
+
+def test_find_search_keywords_hybrid_strategy():
+    """The hybrid strategy lets the LLM pick among the local candidates."""
+
+    def _pick_first_three(prompt: str) -> str:
+        candidates = json.loads(re.search(r"Candidates: (\[.*?\])\n", prompt).group(1))
+        return f"```json\n{json.dumps(candidates[:3])}\n```"
+
+    backend = ScriptedBackend(_pick_first_three)
+    enricher = DoclingEnrichingAgent(backend=backend, tools=[])
+    enricher.keyword_strategy = "hybrid"
+
+    document = DoclingDocument(name="hybrid")
+    document.add_text(
+        label=DocItemLabel.TEXT,
+        text=(
+            "Docling converts scanned PDF documents with layout analysis models, table structure recognition "
+            "and optical character recognition into structured JSON exports for retrieval pipelines."
+        ),
+    )
+    enricher._find_search_keywords(document=document, fix_heading_levels=False)
+
+    assert len(backend.prompts) == 1
+    keywords = document.texts[0].meta.docling_agent__keywords
+    assert len(keywords) == 3
+    assert all(keyword in document.texts[0].text for keyword in keywords)
+
+
 def test_generate_document_level_summary(monkeypatch, test_document, enricher, markdown_serializer):
     """Regression test for _generate_document_level_summary function."""
 
@@ -300,6 +499,31 @@ def test_generate_document_level_summary(monkeypatch, test_document, enricher, m
     assert summary == "Document-level summary from first pages."
 
 
+def test_direct_operation_calls_do_not_share_the_memo(monkeypatch, mock_backend):
+    """The memo is scoped to one document: a second direct call generates its keywords again."""
+    calls: list[str] = []
+
+    def _fake_generate_content(self, *, m, text, task_prompt, requirement_description, validation_fn, loop_budget=5):
+        calls.append(text)
+        return '```json\n["layout analysis", "table structure", "OCR"]\n```'
+
+    monkeypatch.setattr(DoclingEnrichingAgent, "_generate_content", _fake_generate_content)
+
+    enricher = DoclingEnrichingAgent(backend=mock_backend, tools=[])
+    text = (
+        "Docling converts scanned PDF documents with layout analysis models, table structure recognition "
+        "and optical character recognition into structured JSON exports for retrieval pipelines."
+    )
+
+    for name in ("first", "second"):
+        document = DoclingDocument(name=name)
+        document.add_text(label=DocItemLabel.TEXT, text=text)
+        enricher._find_search_keywords(document=document, fix_heading_levels=False)
+
+    assert len(calls) == 2
+    assert enricher._memo.lookups == 0
+
+
 def test_summarize_pages(monkeypatch, test_document, enricher):
     """Regression test for _summarize_pages function."""
 
@@ -335,6 +559,220 @@ def test_summarize_pages(monkeypatch, test_document, enricher):
     assert pages_with_summaries > 0
 
 
+def test_page_index_matches_per_page_serialization(test_document, enricher):
+    """The single-pass page index and serialization agree with the per-page lookups."""
+    document = test_document.model_copy(deep=True)
+    for item, _ in document.iterate_items(with_groups=True, traverse_pictures=True):
+        item.meta = None
+    markdown_serializer = MarkdownDocSerializer(
+        doc=document,
+        table_serializer=MarkdownTableSerializer(),
+        params=MarkdownParams(
+            image_mode=ImageRefMode.PLACEHOLDER,
+            image_placeholder="",
+            escape_underscores=False,
+            escape_html=False,
+            compact_tables=True,
+            traverse_pictures=True,
+        ),
+    )
+
+    first_items, page_sequence = enricher._index_pages(document)
+    assert page_sequence == sorted(first_items)
+
+    for page_no in document.pages.keys():
+        expected, _ = next(iter(document.iterate_items(traverse_pictures=True, page_no=page_no)))
+        assert first_items[page_no] is expected
+
+    pages = list(document.pages.keys())
+    page_texts = enricher._serialize_pages(
+        document=document,
+        serializer=markdown_serializer,
+        pages=pages,
+        page_sequence=page_sequence,
+    )
+    for page_no in pages:
+        assert page_texts[page_no] == markdown_serializer.serialize(pages={page_no}).text.strip()
+
+
+def test_summarize_pages_save_callback(monkeypatch, test_document, enricher):
+    """The save callback fires once per summarized page."""
+
+    def _fake_generate_summary(self, *, m, text, loop_budget=5, style="sentences", scope="section"):
+        return f"Summary of {len(text)} characters."
+
+    monkeypatch.setattr(DoclingEnrichingAgent, "_generate_summary", _fake_generate_summary)
+
+    document = test_document.model_copy(deep=True)
+    for item, _ in document.iterate_items(with_groups=True, traverse_pictures=True):
+        item.meta = None
+
+    saved_pages: list[int] = []
+    enricher._summarize_pages(document=document, save_callback=lambda doc, page_no: saved_pages.append(page_no))
+
+    assert sorted(saved_pages) == sorted(document.pages.keys())
+
+
+def test_run_operations_checkpoints_and_resumes(monkeypatch, test_document, mock_backend):
+    """Checkpoints fire every N enriched nodes, and resuming skips the heading repair."""
+
+    def _fake_generate_summary(self, *, m, text, loop_budget=5, style="sentences", scope="section"):
+        return "Section summary."
+
+    def _fail_fix_heading_levels(self, *, document):
+        raise AssertionError("heading levels must not be repaired again on resume")
+
+    monkeypatch.setattr(DoclingEnrichingAgent, "_generate_summary", _fake_generate_summary)
+    monkeypatch.setattr(DoclingEnrichingAgent, "_fix_heading_levels", _fail_fix_heading_levels)
+
+    enricher = DoclingEnrichingAgent(backend=mock_backend, tools=[])
+    enricher.checkpoint_every = 5
+    checkpoints: list[str] = []
+
+    def _count_summarized(doc):
+        return sum(
+            1
+            for item, _ in doc.iterate_items(with_groups=True, traverse_pictures=True)
+            if item.meta and item.meta.summary
+        )
+
+    document = test_document.model_copy(deep=True)
+    already_summarized = _count_summarized(document)
+    result = enricher.run(
+        task="",
+        document=document,
+        operations=["summarize"],
+        checkpoint_callback=lambda doc, operation: checkpoints.append(operation),
+        resume_from="summarize",
+    )
+
+    summarized = _count_summarized(result) - already_summarized
+    assert summarized > 5
+    assert checkpoints and set(checkpoints) == {"summarize"}
+    assert len(checkpoints) == -(-summarized // 5)  # one per full batch plus the final flush
+
+    # A second pass over the checkpointed document has nothing left to enrich
+    checkpoints.clear()
+    enricher.run(
+        task="",
+        document=result,
+        operations=["summarize"],
+        checkpoint_callback=lambda doc, operation: checkpoints.append(operation),
+        resume_from="summarize",
+    )
+    assert checkpoints == []
+
+
+def _fresh_document(test_document: DoclingDocument) -> DoclingDocument:
+    document = test_document.model_copy(deep=True)
+    for item, _ in document.iterate_items(with_groups=True, traverse_pictures=True):
+        item.meta = None
+    return document
+
+
+def test_plan_matches_the_calls_of_a_run(test_document):
+    """The plan counts the same nodes and deduplicated calls as the run makes."""
+    backend = ScriptedBackend(lambda prompt: "A short summary.")
+    enricher = DoclingEnrichingAgent(backend=backend, tools=[])
+    enricher.heading_level_strategy = "heuristic"
+    document = _fresh_document(test_document)
+
+    plan = enricher.plan(document=document, operations=["summarize", "keywords"])
+    enricher.run(task="", document=document, operations=["summarize"])
+
+    summarize, keywords = plan.operations
+    assert summarize.calls == len(backend.prompts) == enricher.last_usage.calls
+    assert summarize.nodes >= summarize.calls > 0
+    assert summarize.prompt_tokens > 0 and summarize.completion_tokens > 0
+    assert plan.calls == summarize.calls + keywords.calls
+    assert "summarize" in plan.render() and "total" in plan.render()
+
+    enricher.keyword_strategy = "tfidf"
+    assert enricher.plan(document=document, operations=["keywords"]).calls == 0
+
+
+def test_budget_stops_cleanly_and_enriches_top_level_sections_first(test_document):
+    backend = ScriptedBackend(lambda prompt: "A short summary.")
+    enricher = DoclingEnrichingAgent(backend=backend, tools=[])
+    enricher.heading_level_strategy = "heuristic"
+    enricher.max_calls = 5
+
+    result = enricher.run(
+        task="",
+        document=_fresh_document(test_document),
+        operations=["summarize", "keywords"],
+    )
+
+    assert len(backend.prompts) == 5
+    usage = enricher.last_usage
+    assert usage.calls == 5 and usage.exhausted and usage.stopped_at == "summarize"
+    summarized = [item for item, _ in result.iterate_items(with_groups=True) if item.meta and item.meta.summary]
+    assert len(summarized) == 5
+    # The walk goes shallowest first: the top-level sections, not the first paragraphs
+    assert all(item.parent.cref == "#/body" for item in summarized)
+    assert not any(getattr(item.meta, "docling_agent__keywords", None) for item, _ in result.iterate_items())
+
+
+def test_budget_meters_the_delegated_heading_editor(test_document):
+    answer = '```json\n{"operation": "update_section_heading_level", "changes": []}\n```'
+    backend = ScriptedBackend(lambda prompt: answer)
+    enricher = DoclingEnrichingAgent(backend=backend, tools=[])
+    enricher.heading_level_strategy = "llm"
+    enricher.max_calls = 1
+
+    enricher.run(task="", document=_fresh_document(test_document), operations=["summarize"])
+
+    # The heading repair runs in the editor, on sessions charged to the enricher's budget
+    usage = enricher.last_usage
+    assert len(backend.prompts) == usage.calls == 1
+    assert usage.exhausted
+
+
+def test_run_iter_streams_each_enriched_node(test_document):
+    backend = ScriptedBackend(lambda prompt: "A short summary.")
+    enricher = DoclingEnrichingAgent(backend=backend, tools=[])
+    enricher.heading_level_strategy = "heuristic"
+
+    events = []
+
+    def consume():
+        result = yield from enricher.run_iter(
+            task="", document=_fresh_document(test_document), operations=["summarize"]
+        )
+        return result
+
+    stream = consume()
+    try:
+        while True:
+            events.append(next(stream))
+    except StopIteration as stop:
+        result = stop.value
+
+    summarized = [item for item, _ in result.iterate_items(with_groups=True) if item.meta and item.meta.summary]
+    refs = [event.self_ref for event in events]
+    assert summarized and len(refs) == len(set(refs))
+    assert {item.self_ref for item in summarized} <= set(refs)
+    assert all(RefItem(cref=ref).resolve(result).meta.summary == event.meta for ref, event in zip(refs, events))
+    assert all(event.operation == "summarize" and event.field == "summary" for event in events)
+    assert events[0].meta.text == "A short summary."
+    assert "document" not in events[0].model_dump()
+
+
+def test_closing_run_iter_stops_the_run(test_document):
+    backend = ScriptedBackend(lambda prompt: "A short summary.")
+    enricher = DoclingEnrichingAgent(backend=backend, tools=[])
+    enricher.heading_level_strategy = "heuristic"
+    document = _fresh_document(test_document)
+    total = enricher.plan(document=document, operations=["summarize"]).calls
+
+    stream = enricher.run_iter(task="", document=document, operations=["summarize"])
+    next(stream)
+    stream.close()
+
+    assert len(backend.prompts) < total
+    assert not enricher._cancelled.is_set()
+
+
 if __name__ == "__main__":
     print("=" * 70)
     print("TEST 1: Demonstrating the heading levels problem")
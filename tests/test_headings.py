@@ -0,0 +1,87 @@
+from docling_core.types.doc.base import BoundingBox, CoordOrigin
+from docling_core.types.doc.document import DoclingDocument, ProvenanceItem
+
+from docling_agent.agent.headings import infer_heading_levels, numbering_depth
+
+
+def _add_heading(doc: DoclingDocument, text: str, height: float) -> str:
+    # Roughly 0.5 * height per character, i.e. a single line of text at that font size
+    width = 0.5 * height * len(text)
+    prov = ProvenanceItem(
+        page_no=1,
+        bbox=BoundingBox(l=50, t=700, r=50 + width, b=700 - height, coord_origin=CoordOrigin.BOTTOMLEFT),
+        charspan=(0, len(text)),
+    )
+    return doc.add_heading(text=text, level=1, prov=prov).self_ref
+
+
+def test_numbering_depth():
+    assert numbering_depth("2 Methods") == 1
+    assert numbering_depth("2.3 Data sets") == 2
+    assert numbering_depth("1.2.1. Details") == 3
+    assert numbering_depth("A.2 Proofs") == 2
+    assert numbering_depth("IV. Results") == 1
+    assert numbering_depth("B) Ablations") == 1
+    assert numbering_depth("A Study of Layouts") is None
+    assert numbering_depth("2024 Annual report") is None
+    assert numbering_depth("Introduction") is None
+
+
+def test_numbered_document_uses_numbering_names_heights_and_siblings():
+    doc = DoclingDocument(name="numbered")
+    refs = {
+        text: _add_heading(doc, text, height)
+        for text, height in [
+            ("Abstract", 12),
+            ("1 Introduction", 12),
+            ("1.1 Motivation", 10),
+            ("Key Observations", 10),
+            ("1.2 Outline", 10),
+            ("Run-in heading", 7),
+            ("1.3 Scope", 10),
+            ("Unplaceable", 7),
+            ("2 Method", 12),
+            ("References", 12),
+        ]
+    }
+
+    inference = infer_heading_levels(doc)
+
+    assert inference.decided[refs["Abstract"]] == 1
+    assert inference.decided[refs["1 Introduction"]] == 1
+    assert inference.decided[refs["1.1 Motivation"]] == 2
+    # Height matches the numbered level-2 headings
+    assert inference.decided[refs["Key Observations"]] == 2
+    # No height match, but both neighbours are level 2
+    assert inference.decided[refs["Run-in heading"]] == 2
+    assert inference.decided[refs["References"]] == 1
+    # Neighbours disagree (1.3 vs 2) and the height matches no level
+    assert inference.undecided == [refs["Unplaceable"]]
+    assert {change.ref for change in inference.changes} == {
+        refs["1.1 Motivation"],
+        refs["Key Observations"],
+        refs["Run-in heading"],
+        refs["1.2 Outline"],
+        refs["1.3 Scope"],
+    }
+    # The document itself is left untouched
+    assert all(item.level == 1 for item in doc.texts)
+
+
+def test_unnumbered_document_uses_height_tiers():
+    doc = DoclingDocument(name="unnumbered")
+    chapter = _add_heading(doc, "Overview", 14)
+    section = _add_heading(doc, "Background", 11)
+    other_section = _add_heading(doc, "Setup", 11.5)
+
+    inference = infer_heading_levels(doc)
+
+    assert inference.decided == {chapter: 1, section: 2, other_section: 2}
+    assert inference.undecided == []
+
+
+def test_single_tier_unnumbered_document_is_undecided():
+    doc = DoclingDocument(name="flat")
+    refs = [_add_heading(doc, text, 11) for text in ["Overview", "Background", "Setup"]]
+
+    assert infer_heading_levels(doc).undecided == refs
@@ -0,0 +1,86 @@
+from docling_agent.agent.lexical import (
+    BM25Index,
+    FoldedText,
+    PatternMatcher,
+    TfidfKeywordExtractor,
+    candidate_phrases,
+    resolve_spans,
+    strip_html,
+    tokenize,
+)
+
+
+def test_tokenize_keeps_compound_terms():
+    assert tokenize("State-of-the-art OCR, e.g. docling.io v2.5!") == [
+        "state-of-the-art",
+        "ocr",
+        "e.g",
+        "docling.io",
+        "v2.5",
+    ]
+
+
+def test_candidate_phrases_split_on_stopwords_and_punctuation():
+    phrases = [normalized for normalized, _ in candidate_phrases("The layout model of Docling, and the OCR engine.")]
+    assert phrases == ["layout model", "docling", "ocr engine"]
+
+
+def test_tfidf_prefers_distinctive_phrases():
+    texts = [
+        "Docling parses PDF documents. Layout analysis finds the reading order of PDF documents.",
+        "Docling parses Word documents. Table structure recognition rebuilds complex tables.",
+        "Docling parses HTML documents. Optical character recognition handles scanned pages.",
+    ]
+    keywords = TfidfKeywordExtractor().extract(texts, top_k=3)
+
+    assert len(keywords) == 3
+    assert all(len(found) == 3 for found in keywords)
+    assert keywords[0][0] == "PDF"
+    assert "structure recognition" in keywords[1]
+    # Words shared by every text never make the top keyword
+    assert all("docling" not in found[0].lower() for found in keywords)
+
+
+def test_tfidf_handles_empty_texts():
+    assert TfidfKeywordExtractor().extract(["", "the and of"], top_k=3) == [[], []]
+    assert strip_html("<table><tr><td>Revenue</td></tr></table>").split() == ["Revenue"]
+
+
+def test_pattern_matcher_finds_overlapping_occurrences():
+    matcher = PatternMatcher(["he", "she", "his", "hers", ""])
+    assert matcher.find_all("ushers") == {"he": [2], "she": [1], "his": [], "hers": [2]}
+
+
+def test_folded_text_maps_offsets_back_to_the_original():
+    view = FoldedText("Stra\u00dfe")
+    assert view.folded == "strasse"
+    assert view.to_original(0, 7) == (0, 6)
+    assert view.to_folded(5) == 6
+    # Half of the folded sharp s is not a character of the original
+    assert view.to_original(4, 5) is None
+
+
+def test_resolve_spans_prefers_exact_case_and_chains_search_start():
+    text = "ibm and IBM; \u0130stanbul and STRASSE and Stra\u00dfe"
+    spans = resolve_spans(text, ["IBM", "ibm", "\u0069\u0307stanbul", "stra\u00dfe", "Stra\u00dfe", "Red Hat", " "])
+
+    assert spans == [(8, 11), None, (13, 21), (26, 33), (38, 44), None, None]
+    assert text[13:21] == "\u0130stanbul"
+    # The search restarts after the last match, so an earlier occurrence is not reused
+    assert resolve_spans(text, ["ibm", "ibm"]) == [(0, 3), (8, 11)]
+
+
+def test_bm25_ranks_matching_texts_and_skips_the_rest():
+    index = BM25Index(
+        [
+            "Table structure recognition with TableFormer.",
+            "Layout analysis finds tables, figures and text blocks.",
+            "OCR engines for scanned pages.",
+        ]
+    )
+
+    hits = index.search("TableFormer table structure", top_k=5)
+    positions = [position for position, _ in hits]
+    assert positions[0] == 0 and 2 not in positions
+    assert index.search("unrelated query words") == []
+    assert BM25Index([]).search("anything") == []
@@ -0,0 +1,86 @@
+from docling_core.types.doc.document import DocItemLabel, DoclingDocument
+
+from docling_agent.agent.enricher import DoclingEnrichingAgent
+from docling_agent.agent.library import DoclingLibrary
+from docling_agent.agent.orchestrator import DoclingOrchestratorAgent
+from docling_agent.agent.rag_models import RAGIndex
+
+from .test_utils import ScriptedBackend
+
+
+def _make_document(text: str) -> DoclingDocument:
+    doc = DoclingDocument(name="sample")
+    doc.add_text(label=DocItemLabel.TEXT, text=text)
+    return doc
+
+
+def test_checkpoint_roundtrip(tmp_path):
+    """A checkpoint is stored next to the document and removed once cleared."""
+    library = DoclingLibrary(tmp_path)
+    entry = library.store(_make_document("original"), "sample.pdf")
+
+    assert library.load_checkpoint(entry.doc_id) is None
+
+    library.save_checkpoint(entry.doc_id, _make_document("partially enriched"), operation="summarize")
+    checkpoint = library.load_checkpoint(entry.doc_id)
+    assert checkpoint is not None
+    doc, operation = checkpoint
+    assert doc.texts[0].text == "partially enriched"
+    assert operation == "summarize"
+
+    # The operation survives a reload of the index and a re-store of the document
+    reloaded = DoclingLibrary(tmp_path)
+    assert reloaded.get_entry(entry.doc_id).checkpoint_operation == "summarize"
+    reloaded.store(doc, "sample.pdf")
+    assert reloaded.get_entry(entry.doc_id).checkpoint_operation == "summarize"
+
+    reloaded.clear_checkpoint(entry.doc_id)
+    assert reloaded.load_checkpoint(entry.doc_id) is None
+    assert reloaded.get_entry(entry.doc_id).checkpoint_operation is None
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+def test_save_checkpoint_unknown_doc_is_ignored(tmp_path):
+    """Checkpointing a document the library does not know about is a no-op."""
+    library = DoclingLibrary(tmp_path)
+    library.save_checkpoint("missing", _make_document("text"), operation="summarize")
+    assert library.load_checkpoint("missing") is None
+
+
+def test_rag_index_is_reused_until_the_document_changes(tmp_path):
+    library = DoclingLibrary(tmp_path)
+    entry = library.store(_make_document("original"), "sample.pdf")
+    assert library.load_rag_index(entry.doc_id) is None
+
+    library.save_rag_index(entry.doc_id, RAGIndex(outline="# sample", section_refs=[]))
+    reloaded = DoclingLibrary(tmp_path)
+    index = reloaded.load_rag_index(entry.doc_id)
+    assert index is not None and index.outline == "# sample"
+    assert index.content_hash == reloaded.get_entry(entry.doc_id).content_hash
+
+    # Storing the same content keeps the index; new content makes it stale
+    reloaded.store(_make_document("original"), "sample.pdf")
+    assert reloaded.load_rag_index(entry.doc_id) is not None
+    reloaded.resync(entry.doc_id, _make_document("enriched"))
+    assert reloaded.load_rag_index(entry.doc_id) is None
+
+
+def test_enrichment_budget_is_shared_across_documents_without_touching_the_enricher(tmp_path):
+    backend = ScriptedBackend(lambda prompt: "A short summary.")
+    library = DoclingLibrary(tmp_path)
+    pairs = []
+    for name in ("first", "second", "third"):
+        doc = DoclingDocument(name=name)
+        for index in range(2):
+            doc.add_text(label=DocItemLabel.TEXT, text=f"Paragraph {index} of the {name} document. " * 5)
+        pairs.append((doc, library.store(doc, f"{name}.pdf").doc_id))
+    enricher = DoclingEnrichingAgent(backend=backend, tools=[])
+    enricher.heading_level_strategy = "heuristic"
+    enricher.max_calls = 3
+    orchestrator = DoclingOrchestratorAgent(backend=backend, tools=[], library_path=tmp_path)
+
+    orchestrator._ensure_enriched(pairs, library, operations=["summarize"], enricher=enricher)
+
+    # One budget of three calls for the whole task; the configured limit stays as it was
+    assert len(backend.prompts) == 3
+    assert enricher.max_calls == 3
@@ -0,0 +1,87 @@
+import json
+import re
+from pathlib import Path
+
+import pytest
+from docling_core.types.doc.document import DocItemLabel, DoclingDocument
+
+from docling_agent.agent.rag import DoclingRAGAgent
+
+from .test_utils import ScriptedBackend
+
+
+@pytest.mark.parametrize("name", ["2408.09869v5.json", "2408.09869v5-hierarchical-with-summaries.json"])
+def test_index_holds_the_section_texts_the_loop_used_to_rebuild(name):
+    doc = DoclingDocument.model_validate_json(Path("tests/data", name).read_text(encoding="utf-8"))
+    agent = DoclingRAGAgent(backend=ScriptedBackend(lambda prompt: ""), tools=[])
+
+    index = agent.build_index(doc)
+
+    assert set(index.section_refs) == agent._extract_section_refs(doc)
+    for ref in index.section_refs:
+        assert index.section_text(ref) == agent._get_section_content(doc, ref)
+    # Each item text is stored once, however deeply its section is nested
+    assert len(index.texts) == sum(1 for item, _ in doc.iterate_items() if getattr(item, "text", None))
+
+
+def _long_document() -> tuple[DoclingDocument, str]:
+    doc = DoclingDocument(name="notes")
+    target = ""
+    for index in range(30):
+        heading = doc.add_heading(text=f"Chapter {index}", level=1)
+        if index == 17:
+            target = heading.self_ref
+            doc.add_text(label=DocItemLabel.TEXT, text="Plants use chlorophyll for photosynthesis.")
+        else:
+            doc.add_text(label=DocItemLabel.TEXT, text=f"Routine maintenance log number {index}.")
+    return doc, target
+
+
+def _answer_when_found(prompt: str) -> str:
+    found = "chlorophyll" in prompt
+    return f'```json\n{{"can_answer": {json.dumps(found)}, "response": "found" }}\n```'
+
+
+def test_lexical_selection_reads_the_best_match_without_selection_calls():
+    doc, target = _long_document()
+    backend = ScriptedBackend(_answer_when_found)
+    agent = DoclingRAGAgent(backend=backend, tools=[], selection_mode="lexical")
+
+    result = agent._rag_loop(query="How does photosynthesis work?", doc=doc)
+
+    assert result.converged and [iteration.section_ref for iteration in result.iterations] == [target]
+    assert len(backend.prompts) == 1
+
+
+def test_hybrid_selection_shows_the_llm_a_bm25_shortlist():
+    doc, target = _long_document()
+
+    def respond(prompt: str) -> str:
+        if prompt.startswith("Query:"):
+            candidates = re.findall(r"^- (#/texts/\d+):", prompt, re.MULTILINE)
+            return f'```json\n{{"reason": "best match", "section_ref": "{candidates[0]}"}}\n```'
+        return _answer_when_found(prompt)
+
+    backend = ScriptedBackend(respond)
+    agent = DoclingRAGAgent(backend=backend, tools=[], selection_mode="hybrid", shortlist_size=3)
+
+    # Every chapter matches "maintenance log", the target ranks first on the rarer terms
+    result = agent._rag_loop(query="photosynthesis, chlorophyll or maintenance log", doc=doc)
+
+    assert result.converged and result.iterations[0].section_ref == target
+    selection = backend.prompts[0]
+    assert len(re.findall(r"^- #/texts/\d+:", selection, re.MULTILINE)) == 3
+    assert f"- {target}: Chapter 17" in selection
+    assert "Document outline" not in selection
+
+
+def test_hybrid_selection_falls_back_to_the_outline_without_lexical_matches():
+    doc, _ = _long_document()
+    backend = ScriptedBackend(_answer_when_found)
+    agent = DoclingRAGAgent(backend=backend, tools=[], selection_mode="hybrid", shortlist_size=3)
+
+    agent._rag_loop(query="Which car is mentioned?", doc=doc)
+
+    selection = backend.prompts[0]
+    assert "Document outline" in selection
+    assert "Chapter 29" in selection
@@ -1,6 +1,6 @@
 from pathlib import Path
 
-from docling_agent.task_model import AgentTask, load_task
+from docling_agent.task_model import AgentTask, EditingTask, load_task
 
 
 def test_load_task_with_top_level_backend_block(tmp_path: Path):
@@ -24,3 +24,18 @@ backend:
     assert task.backend.type == "lmstudio"
     assert task.backend.base_url == "http://localhost:1234/v1"
     assert task.backend.models.reasoning == "granite-3.3-8b-instruct"
+    # Concurrency is opt-in: not every backend client is known to be thread-safe
+    assert task.backend.max_concurrency == 1
+
+
+def test_edit_task_options_default_to_the_full_outline_and_protocol(tmp_path: Path):
+    task_path = tmp_path / "task.yaml"
+    task_path.write_text('mode: edit\nquery: "Fix the typo"\n', encoding="utf-8")
+    task = load_task(task_path)
+    assert task.outline_mode == "full" and task.edit_protocol == "full"
+
+    task_path.write_text(
+        'mode: edit\nquery: "Fix the typo"\noutline_mode: drilldown\nedit_protocol: patch\n', encoding="utf-8"
+    )
+    task = load_task(task_path)
+    assert isinstance(task, EditingTask) and task.outline_mode == "drilldown" and task.edit_protocol == "patch"
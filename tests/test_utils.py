@@ -4,6 +4,11 @@ This module provides mock implementations and helper functions
 that can be reused across different test modules.
 """
 
+import json
+import re
+import threading
+from collections.abc import Callable
+from types import SimpleNamespace
 from unittest.mock import MagicMock
 
 from docling_agent.backends.base import BaseBackend, BaseSession
@@ -39,6 +44,7 @@ class MockBackend(BaseBackend):
             reasoning="mock-model",
             writing="mock-model",
         )
+        self.config.max_concurrency = 4
 
     @classmethod
     def from_config(cls, config):
@@ -48,3 +54,71 @@ class MockBackend(BaseBackend):
     def create_session(self, *, model: str, system_prompt: str | None = None) -> BaseSession:
         """Create a mock session."""
         return MockSession()
+
+
+class ScriptedSession(BaseSession):
+    """Session that answers every prompt with a caller-supplied function."""
+
+    def __init__(self, backend: "ScriptedBackend"):
+        self._backend = backend
+
+    def instruct(self, prompt: str, *, requirements=None, retry_budget: int = 1) -> str:
+        """Record the prompt and return the scripted answer.
+
+        With ``validate=True`` on the backend, the prompt is asked again until the
+        answer meets every requirement or the retry budget is spent, as Mellea does.
+        """
+        attempts = max(1, retry_budget) if self._backend.validate and requirements else 1
+        for _ in range(attempts):
+            with self._backend.lock:
+                self._backend.prompts.append(prompt)
+            answer = self._backend.respond(prompt)
+            context = SimpleNamespace(last_output=lambda answer=answer: SimpleNamespace(value=answer))
+            if not self._backend.validate or all(req.validation_fn(context) for req in requirements or []):
+                break
+        return answer
+
+
+class ScriptedBackend(MockBackend):
+    """Mock backend whose sessions answer prompts with ``respond(prompt)``.
+
+    All prompts are recorded in ``prompts`` so tests can assert on the number
+    and content of LLM calls.
+
+    Example:
+        >>> backend = ScriptedBackend(lambda prompt: "```json\\n{}\\n```")
+        >>> enricher = DoclingEnrichingAgent(backend=backend, tools=[])
+    """
+
+    def __init__(self, respond: Callable[[str], str], *, validate: bool = False):
+        super().__init__()
+        self.respond = respond
+        self.validate = validate
+        self.prompts: list[str] = []
+        self.lock = threading.Lock()
+
+    def create_session(self, *, model: str, system_prompt: str | None = None) -> BaseSession:
+        """Create a scripted session."""
+        return ScriptedSession(self)
+
+
+def picture_answers(labels: Callable[[str], list[str]]) -> Callable[[str], str]:
+    """Scripted answers for the picture classification, chart and code prompts.
+
+    Batched classification labels every picture ref with ``labels(ref)``; single
+    pictures are classified as diagrams.
+    """
+
+    def respond(prompt: str) -> str:
+        if prompt.startswith("Classify each of the pictures"):
+            refs = re.findall(r"^\[(#/pictures/\d+)\]$", prompt, re.MULTILINE)
+            return f"```json\n{json.dumps({ref: labels(ref) for ref in refs})}\n```"
+        if prompt.startswith("Classify"):
+            return '```json\n{"predictions": ["diagram"]}\n```'
+        if "Extract its chart data" in prompt:
+            return (
+                '```json\n{"title": "Sales", "columns": ["year", "sales"], "rows": [["2023", 10], ["2024", 12]]}\n```'
+            )
+        return "```python\nprint('picture')\n```"
+
+    return respond
@@ -0,0 +1,78 @@
+import pytest
+from docling_core.types.doc.document import BaseMeta, DocItemLabel, DoclingDocument, SummaryMetaField
+
+from docling_agent.agent.write_sink import IncrementalWritingSink
+from docling_agent.agent.writer import DoclingWritingAgent, WritingProgress
+
+from .test_utils import ScriptedBackend
+
+
+class _Crash(Exception):
+    pass
+
+
+def _outline(count: int) -> DoclingDocument:
+    outline = DoclingDocument(name="outline")
+    outline.add_title(text="Report")
+    for index in range(count):
+        summary = f"Point number {index}"
+        paragraph = outline.add_text(label=DocItemLabel.TEXT, text=summary)
+        paragraph.meta = BaseMeta(summary=SummaryMetaField(text=summary))
+    return outline
+
+
+def _paragraph(prompt: str) -> str:
+    return f"Paragraph {prompt.rsplit('Point number ', 1)[1]}."
+
+
+def test_sink_streams_items_and_resumes_an_interrupted_run(tmp_path):
+    outline = _outline(5)
+    sink = IncrementalWritingSink(tmp_path / "report", formats=["markdown", "json"])
+    streamed: list[str] = []
+
+    def crash_after_three_paragraphs(progress: WritingProgress) -> None:
+        sink(progress)
+        streamed.append(sink.markdown_path.read_text(encoding="utf-8"))
+        if progress.completed == 5:
+            raise _Crash
+
+    writer = DoclingWritingAgent(backend=ScriptedBackend(_paragraph), tools=[])
+    with pytest.raises(_Crash):
+        writer._populate_document_with_content(
+            task="report", outline=outline, progress_callback=crash_after_three_paragraphs
+        )
+
+    # The markdown grew item by item, in outline order (the body and title come first)
+    assert [text.count("Paragraph") for text in streamed] == [0, 0, 1, 2, 3]
+    assert "Paragraph 2." in streamed[-1] and "Paragraph 3." not in streamed[-1]
+    assert sink.progress_path.exists()
+    assert DoclingDocument.model_validate_json(sink.json_path.read_text(encoding="utf-8")).texts[-1].text == (
+        "Paragraph 2."
+    )
+
+    # A new run only writes the two remaining items and finishes the files
+    backend = ScriptedBackend(_paragraph)
+    resumed_sink = IncrementalWritingSink(tmp_path / "report", formats=["markdown", "json"])
+    progress = resumed_sink.load_progress(task="report")
+    assert progress is not None and progress.completed == 5
+    assert resumed_sink.load_progress(task="another report") is None
+
+    document = DoclingWritingAgent(backend=backend, tools=[])._populate_document_with_content(
+        task="report", outline=progress.outline, progress_callback=resumed_sink, resume_from=progress
+    )
+
+    assert len(backend.prompts) == 2
+    assert [item.text for item in document.texts] == ["Report"] + [f"Paragraph {index}." for index in range(5)]
+    assert not resumed_sink.progress_path.exists()
+    markdown = resumed_sink.markdown_path.read_text(encoding="utf-8")
+    assert [line for line in markdown.splitlines() if line.startswith("Paragraph")] == [
+        f"Paragraph {index}." for index in range(5)
+    ]
+
+
+def test_find_unfinished_returns_the_latest_interrupted_run(tmp_path):
+    assert IncrementalWritingSink.find_unfinished(tmp_path, "task") is None
+    (tmp_path / "task_2026_01_01_10_00.progress.json").write_text("{}", encoding="utf-8")
+    (tmp_path / "other_2026_01_01_11_00.progress.json").write_text("{}", encoding="utf-8")
+
+    assert IncrementalWritingSink.find_unfinished(tmp_path, "task") == tmp_path / "task_2026_01_01_10_00"
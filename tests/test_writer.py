@@ -0,0 +1,184 @@
+import re
+import threading
+import time
+
+from docling_core.types.doc.document import (
+    BaseMeta,
+    DocItemLabel,
+    DoclingDocument,
+    PictureMeta,
+    SummaryMetaField,
+    TableData,
+)
+
+from docling_agent.agent.writer import DoclingWritingAgent
+
+from .test_utils import ScriptedBackend, picture_answers
+
+
+def test_populate_document_defers_picture_meta():
+    """Pictures of the outline are classified in one batch after the text is written."""
+    outline = DoclingDocument(name="outline")
+    outline.add_title(text="Report")
+    for summary in ("Growth of revenue over time", "Growth of headcount over time"):
+        picture = outline.add_picture()
+        picture.meta = PictureMeta(summary=SummaryMetaField(text=summary))
+
+    backend = ScriptedBackend(picture_answers(lambda ref: ["line-chart"]))
+    writer = DoclingWritingAgent(backend=backend, tools=[])
+    document = writer._populate_document_with_content(task="report", outline=outline)
+
+    # One classification batch and two concurrent chart extractions; no code generation by default
+    assert len(backend.prompts) == 3
+    assert len(document.pictures) == 2
+    for picture in document.pictures:
+        assert picture.meta.summary.text.startswith("Growth of")
+        assert picture.meta.classification.predictions[0].class_name == "line-chart"
+        assert picture.meta.tabular_chart.title == "Sales"
+        assert picture.meta.code is None
+
+
+def test_resumed_pictures_keep_their_document_context():
+    document = DoclingDocument(name="report")
+    document.add_title(text="Report")
+    document.add_heading(text="Revenue", level=1)
+    picture = document.add_picture()
+    picture.meta = PictureMeta(summary=SummaryMetaField(text="Growth of revenue over time"))
+    document.add_heading(text="Headcount", level=1)
+
+    writer = DoclingWritingAgent(backend=ScriptedBackend(lambda prompt: ""), tools=[])
+    pending_pictures: list = []
+    writer._requeue_deferred(document=document, pending_pictures=pending_pictures, pending_captions=[])
+
+    assert [(item.self_ref, context) for item, context in pending_pictures] == [
+        (
+            picture.self_ref,
+            writer._picture_context(summary="Growth of revenue over time", hierarchy={0: "Report", 1: "Revenue"}),
+        )
+    ]
+
+
+def test_populate_document_writes_items_concurrently_in_outline_order():
+    """Paragraphs are generated in parallel but merged in the order of the outline."""
+    outline = DoclingDocument(name="outline")
+    outline.add_title(text="Report")
+    outline.add_heading(text="Findings", level=1)
+    summaries = [f"Finding number {index}" for index in range(6)]
+    for summary in summaries:
+        paragraph = outline.add_text(label=DocItemLabel.TEXT, text=summary)
+        paragraph.meta = BaseMeta(summary=SummaryMetaField(text=summary))
+
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def answer(prompt: str) -> str:
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        # Later items finish first, so completion order differs from outline order
+        index = int(re.search(r"Finding number (\d+)", prompt).group(1))
+        time.sleep(0.05 * (len(summaries) - index))
+        with lock:
+            in_flight -= 1
+        assert "##Findings" in prompt
+        return f"Paragraph about finding {index}."
+
+    writer = DoclingWritingAgent(backend=ScriptedBackend(answer), tools=[])
+    document = writer._populate_document_with_content(task="report", outline=outline)
+
+    assert peak > 1
+    paragraphs = [item for item in document.texts if item.label == DocItemLabel.TEXT]
+    assert [item.text for item in paragraphs] == [f"Paragraph about finding {index}." for index in range(6)]
+    assert [item.meta.summary.text for item in paragraphs] == summaries
+    assert [item.text for item in document.texts[:2]] == ["Report", "Findings"]
+
+
+def test_table_captions_are_written_after_merging_with_summary_fallback():
+    outline = DoclingDocument(name="outline")
+    outline.add_title(text="Report")
+    summaries = ["Revenue per region", "Headcount per team"]
+    for summary in summaries:
+        table = outline.add_table(data=TableData(table_cells=[], num_rows=0, num_cols=0))
+        table.meta = BaseMeta(summary=SummaryMetaField(text=summary))
+
+    def answer(prompt: str) -> str:
+        if prompt.startswith("Given the current context"):
+            name = "region" if "Revenue" in prompt else "team"
+            return f"```html\n<table><tr><th>{name}</th><th>value</th></tr><tr><td>a</td><td>1</td></tr></table>\n```"
+        if "Write a clear, specific caption" in prompt:
+            # The second caption fails and falls back to the table summary
+            if "team" in prompt:
+                raise RuntimeError("caption failed")
+            return "Revenue by region."
+        raise AssertionError(f"unexpected prompt: {prompt[:80]}")
+
+    backend = ScriptedBackend(answer)
+    writer = DoclingWritingAgent(backend=backend, tools=[])
+    document = writer._populate_document_with_content(task="report", outline=outline)
+
+    captions = [table.caption_text(document) for table in document.tables]
+    assert captions == ["Revenue by region.", "Headcount per team"]
+    # Two tables and two captions, each one LLM call
+    assert len(backend.prompts) == 4
+
+
+def test_writer_grounds_each_item_in_its_most_relevant_source_passages():
+    source = DoclingDocument(name="handbook")
+    source.add_heading(text="Solar panels", level=1)
+    source.add_text(label=DocItemLabel.TEXT, text="Photovoltaic solar panels convert sunlight into electricity.")
+    source.add_heading(text="Wind turbines", level=1)
+    source.add_text(label=DocItemLabel.TEXT, text="Wind turbines convert the kinetic energy of wind into power.")
+
+    outline = DoclingDocument(name="outline")
+    outline.add_title(text="Energy report")
+    for summary in ("How solar panels produce electricity", "How wind turbines produce power"):
+        paragraph = outline.add_text(label=DocItemLabel.TEXT, text=summary)
+        paragraph.meta = BaseMeta(summary=SummaryMetaField(text=summary))
+
+    backend = ScriptedBackend(lambda prompt: "A grounded paragraph.")
+    writer = DoclingWritingAgent(backend=backend, tools=[])
+    writer.grounding_top_k = 1
+    writer._index_sources(sources=[source])
+    writer._populate_document_with_content(task="report", outline=outline)
+
+    solar = next(prompt for prompt in backend.prompts if "How solar panels" in prompt)
+    wind = next(prompt for prompt in backend.prompts if "How wind turbines" in prompt)
+    assert "Photovoltaic" in solar and "kinetic energy" not in solar
+    assert "kinetic energy" in wind and "Photovoltaic" not in wind
+
+    writer._index_sources(sources=[])
+    assert writer._grounding_context(summary="solar panels", hierarchy={}) == ""
+
+
+def test_section_summaries_use_one_fresh_session_each():
+    outline = DoclingDocument(name="outline")
+    outline.add_title(text="Report")
+    sections = ["Revenue", "Costs", "Outlook"]
+    for name in sections:
+        heading = outline.add_heading(text=name, level=1)
+        outline.add_text(
+            label=DocItemLabel.TEXT,
+            text=f"paragraph: The {name.lower()} section explains the {name.lower()} in detail.",
+            parent=heading,
+        )
+
+    class CountingBackend(ScriptedBackend):
+        sessions = 0
+
+        def create_session(self, *, model, system_prompt=None):
+            with self.lock:
+                self.sessions += 1
+            return super().create_session(model=model, system_prompt=system_prompt)
+
+    backend = CountingBackend(lambda prompt: "First sentence. Second sentence. Third sentence.")
+    writer = DoclingWritingAgent(backend=backend, tools=[])
+    writer._summarize_outline_sections(outline=outline)
+
+    assert backend.sessions == len(backend.prompts) == len(sections)
+    for name in sections:
+        prompt = next(prompt for prompt in backend.prompts if prompt.startswith(f"Section title: {name}"))
+        assert all(other.lower() not in prompt for other in sections if other != name)
+    headings = [item for item in outline.texts if item.label == DocItemLabel.SECTION_HEADER]
+    assert all(item.meta.summary.text.startswith("First sentence.") for item in headings)